@@ -0,0 +1,301 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# benchmark.py
+# Copyright (C) 2024 Fracpete (fracpete at waikato dot ac dot nz)
+
+"""
+Benchmarks the hot paths of pymeka on a synthetic multi-label dataset, recording timings and
+peak memory (Python via tracemalloc, JVM via the memory pool beans) as JSON.
+
+Examples:
+
+    python benchmarks/benchmark.py --rows 5000 --features 50 --labels 10 --output current.json
+    python benchmarks/benchmark.py --rows 5000 --features 50 --labels 10 --compare baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+import meka.core.jvm as jvm
+
+logger = logging.getLogger("meka.benchmark")
+
+CLASSIFIERS = {
+    "BR": "meka.classifiers.multilabel.BR",
+    "CC": "meka.classifiers.multilabel.CC",
+    "LC": "meka.classifiers.multilabel.LC",
+}
+""" the classifiers to benchmark. """
+
+UPDATEABLE = "meka.classifiers.multilabel.incremental.BRUpdateable"
+""" the updateable classifier for the prequential evaluation. """
+
+
+def synthetic_data(num_rows, num_features, num_labels, seed=1):
+    """
+    Generates the feature and label matrices of a synthetic multi-label problem, with the
+    labels depending on random linear combinations of the features.
+
+    :param num_rows: the number of rows
+    :type num_rows: int
+    :param num_features: the number of features
+    :type num_features: int
+    :param num_labels: the number of labels
+    :type num_labels: int
+    :param seed: the seed for the random number generator
+    :type seed: int
+    :return: the tuple of feature and label matrix
+    :rtype: tuple
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((num_rows, num_features))
+    weights = rng.standard_normal((num_features, num_labels))
+    scores = x @ weights + rng.standard_normal((num_rows, num_labels))
+    y = (scores > np.quantile(scores, 0.7, axis=0)).astype(np.float64)
+    return x, y
+
+
+def _heap_peak():
+    """
+    Returns the sum of the peak usages of the JVM's heap memory pools.
+
+    :return: the peak in bytes
+    :rtype: int
+    """
+    from jpype import JClass
+    result = 0
+    for pool in JClass("java.lang.management.ManagementFactory").getMemoryPoolMXBeans():
+        if str(pool.getType().name()) == "HEAP":
+            result += pool.getPeakUsage().getUsed()
+    return int(result)
+
+
+def _reset_heap_peak():
+    """
+    Resets the peak usages of the JVM's memory pools.
+    """
+    from jpype import JClass
+    for pool in JClass("java.lang.management.ManagementFactory").getMemoryPoolMXBeans():
+        pool.resetPeakUsage()
+
+
+def measure(name, func, repeats, results):
+    """
+    Executes the function the specified number of times and records the timings and the peak memory.
+
+    :param name: the name of the benchmark
+    :type name: str
+    :param func: the function to execute (no arguments)
+    :param repeats: how often to execute the function
+    :type repeats: int
+    :param results: the dictionary to add the measurements to
+    :type results: dict
+    :return: the return value of the last execution
+    """
+    timings = []
+    py_peak = 0
+    jvm_peak = 0
+    value = None
+    for i in range(repeats):
+        _reset_heap_peak()
+        tracemalloc.start()
+        start = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - start)
+        py_peak = max(py_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        jvm_peak = max(jvm_peak, _heap_peak())
+    results[name] = {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "runs": timings,
+        "python_peak_bytes": py_peak,
+        "jvm_heap_peak_bytes": jvm_peak,
+    }
+    logger.info("%s: %.4f sec (median of %d)" % (name, results[name]["median"], repeats))
+    return value
+
+
+def run(args):
+    """
+    Runs the benchmarks.
+
+    :param args: the parsed command-line arguments
+    :type args: argparse.Namespace
+    :return: the measurements
+    :rtype: dict
+    """
+    results = {
+        "config": {
+            "rows": args.rows,
+            "features": args.features,
+            "labels": args.labels,
+            "folds": args.folds,
+            "repeats": args.repeats,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "benchmarks": {},
+    }
+    bench = results["benchmarks"]
+
+    # JVM start up: separate processes, as a JVM can only be started once per process
+    if args.startup_runs > 0:
+        bench["jvm.start (subprocess)"] = jvm.benchmark_startup(runs=args.startup_runs, cds=args.cds,
+                                                                 max_heap_size=args.max_heap_size)
+    start = time.perf_counter()
+    jvm.start(max_heap_size=args.max_heap_size, logging_level=logging.WARNING, cds=args.cds)
+    bench["jvm.start"] = {"total": time.perf_counter() - start, "steps": dict(jvm.startup_timings)}
+
+    from weka.core.converters import save_any_file
+    from weka.core.dataset import Instances
+    from meka.core.mlutils import label_matrix, prepare_data, to_instances
+    from meka.core.folds import stratified_folds
+    from meka.classifiers import MultiLabelClassifier, Evaluation, IncrementalEvaluation
+    from meka.experiment import Experiment, Evaluator, EvaluationStatisticsHandler, LocalDatasetProvider
+    from jpype import JClass
+
+    x, y = synthetic_data(args.rows, args.features, args.labels, seed=args.seed)
+    data = measure("mlutils.to_instances", lambda: to_instances(x, y, relation="synthetic"), args.repeats, bench)
+    measure("mlutils.prepare_data", lambda: prepare_data(Instances.copy_instances(data)), args.repeats, bench)
+    measure("folds.stratified_folds",
+            lambda: stratified_folds(label_matrix(data, dtype=bool, order="F"), args.folds, seed=args.seed),
+            args.repeats, bench)
+    num_train = int(data.num_instances * 2 / 3)
+    train = Instances.copy_instances(data, 0, num_train)
+    test = Instances.copy_instances(data, num_train, data.num_instances - num_train)
+
+    result = None
+    for name, classname in CLASSIFIERS.items():
+        result = measure("Evaluation.evaluate_model[%s]" % name,
+                         lambda: Evaluation.evaluate_model(MultiLabelClassifier(classname=classname), train, test,
+                                                           top="PCut1", vop="3"),
+                         args.repeats, bench)
+        measure("Evaluation.cv_model[%s]" % name,
+                lambda: Evaluation.cv_model(MultiLabelClassifier(classname=classname), data, num_folds=args.folds,
+                                            top="PCut1", vop="3"),
+                args.repeats, bench)
+
+    measure("Result.all_predictions", lambda: result.all_predictions(), args.repeats, bench)
+    measure("Result.confidence_matrix", lambda: result.confidence_matrix(), args.repeats, bench)
+    measure("IncrementalEvaluation.evaluate_prequential",
+            lambda: IncrementalEvaluation.evaluate_prequential(MultiLabelClassifier(classname=UPDATEABLE), data,
+                                                               window_size=max(1, data.num_instances // 20)),
+            args.repeats, bench)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.arff")
+        save_any_file(data, path)
+
+        def experiment():
+            exp = Experiment()
+            exp.classifiers = [MultiLabelClassifier(classname=CLASSIFIERS["BR"])]
+            provider = LocalDatasetProvider()
+            provider.datasets = [path]
+            exp.datasetprovider = provider
+            evaluator = Evaluator(classname="meka.experiment.evaluators.CrossValidation")
+            evaluator.jobject.setNumFolds(args.folds)
+            exp.evaluator = evaluator
+            handler = JClass("meka.experiment.evaluationstatistics.KeyValuePairs")()
+            handler.setFile(JClass("java.io.File")(os.path.join(tmp, "results.txt")))
+            exp.statisticshandler = EvaluationStatisticsHandler(handler)
+            msg = exp.initialize()
+            if msg is None:
+                msg = exp.run()
+            if msg is None:
+                msg = exp.finish()
+            if msg is not None:
+                raise Exception(msg)
+
+        measure("Experiment.run", experiment, args.repeats, bench)
+
+    jvm.stop()
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """
+    Compares the median timings with the ones of a previous run and outputs the ratios.
+
+    :param current: the current measurements
+    :type current: dict
+    :param baseline: the previous measurements
+    :type baseline: dict
+    :param tolerance: the ratio above which a benchmark gets flagged as regression
+    :type tolerance: float
+    :return: the names of the benchmarks that regressed
+    :rtype: list
+    """
+    result = []
+    for name, values in current["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if (old is None) or ("median" not in values) or ("median" not in old) or (old["median"] == 0):
+            continue
+        ratio = values["median"] / old["median"]
+        flag = ""
+        if ratio > tolerance:
+            flag = "  <-- regression"
+            result.append(name)
+        print("%-50s %10.4f %10.4f %6.2fx%s" % (name, old["median"], values["median"], ratio, flag))
+    return result
+
+
+def main(args=None):
+    """
+    Runs the benchmarks from the command-line.
+
+    :param args: the command-line arguments, uses sys.argv if None
+    :type args: list
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths of pymeka.")
+    parser.add_argument("--rows", type=int, default=2000, help="the number of rows of the synthetic dataset")
+    parser.add_argument("--features", type=int, default=50, help="the number of features")
+    parser.add_argument("--labels", type=int, default=10, help="the number of labels")
+    parser.add_argument("--folds", type=int, default=3, help="the number of cross-validation folds")
+    parser.add_argument("--repeats", type=int, default=3, help="how often to execute each benchmark")
+    parser.add_argument("--seed", type=int, default=1, help="the seed for generating the dataset")
+    parser.add_argument("--max_heap_size", default="2g", help="the maximum heap size of the JVM")
+    parser.add_argument("--startup_runs", type=int, default=3, help="the number of JVM start ups to measure in separate processes, 0 to skip")
+    parser.add_argument("--cds", action="store_true", help="whether to use class-data-sharing for the JVM")
+    parser.add_argument("--output", default=None, help="the JSON file to store the measurements in, stdout if not supplied")
+    parser.add_argument("--compare", default=None, help="the JSON file with previous measurements to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.2, help="the ratio of median timings considered a regression")
+    parsed = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    results = run(parsed)
+    if parsed.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(parsed.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    if parsed.compare is not None:
+        with open(parsed.compare, "r") as fp:
+            baseline = json.load(fp)
+        if len(compare(results, baseline, parsed.tolerance)) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,38 @@
-from ._multix import MultiXClassifier
-from ._multilabel import MultiLabelClassifier
-from ._multitarget import MultiTargetClassifier
-from ._evaluation import Evaluation
-from ._incrementalevaluation import IncrementalEvaluation
+import importlib
+
+_classes = {
+    "MultiXClassifier": "._multix",
+    "MultiLabelClassifier": "._multilabel",
+    "MultiTargetClassifier": "._multitarget",
+    "ModelCache": "._modelcache",
+    "Evaluation": "._evaluation",
+    "IncrementalEvaluation": "._incrementalevaluation",
+}
+""" the classes and the submodules they get imported from on first use. """
+
+__all__ = list(_classes)
+
+
+def __getattr__(name: str):
+    """
+    Imports the class from its submodule on first access (PEP 562).
+
+    :param name: the name of the class
+    :type name: str
+    :return: the class
+    """
+    if name not in _classes:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    result = getattr(importlib.import_module(_classes[name], __name__), name)
+    globals()[name] = result
+    return result
+
+
+def __dir__():
+    """
+    Returns the names of the module, including the lazily imported classes.
+
+    :return: the names
+    :rtype: list
+    """
+    return sorted(set(globals()) | set(__all__))
@@ -1,10 +1,21 @@
-from typing import List
-from jpype import JClass
-from weka.core.classes import is_instance_of
+import logging
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+from jpype import JArray
+from weka.core.classes import is_instance_of, Random
 from weka.core.dataset import Instances
+from meka.core.jclasses import jclass
 from meka.core import Result
+from meka.core.folds import FoldManager
 from ._multix import MultiXClassifier
 from ._multilabel import MultiLabelClassifier
+from ._multitarget import MultiTargetClassifier
+from ._modelcache import ModelCache
+
+logger = logging.getLogger(__name__)
 
 
 class Evaluation:
@@ -14,9 +25,11 @@ class Evaluation:
 
     @classmethod
     def evaluate_model(cls, classifier: MultiXClassifier, train: Instances, test: Instances,
-                       top: str = "PCut1", vop: str = "1") -> Result:
+                       top: str = "PCut1", vop: str = "1", cache: ModelCache = None) -> Result:
         """
         Builds the classifier on the training data and evaluates it on the test set.
+        With a model cache, a previously trained model for the same setup and training data
+        gets used instead of building the classifier again.
 
         :param classifier: the classifier to train
         :type classifier: MultiXClassifier
@@ -28,18 +41,72 @@ class Evaluation:
         :type top: str
         :param vop: Verbosity OPtion (which measures do we want to calculate/output)
         :type vop: str
+        :param cache: the optional cache for trained models
+        :type cache: ModelCache
         :return: raw prediction data with evaluation statistics included.
         :rtype: Result
         """
-        jobj = JClass("meka.classifiers.multilabel.Evaluation").evaluateModel(
-            classifier.jobject, train.jobject, test.jobject, top, vop)
+        if cache is None:
+            jobj = jclass("meka.classifiers.multilabel.Evaluation").evaluateModel(
+                classifier.jobject, train.jobject, test.jobject, top, vop)
+            return Result(jobject=jobj)
+
+        jobj = cls._evaluate_cached(classifier, train, test, cache)
+        if is_instance_of(classifier.jobject, "meka.classifiers.multitarget.MultiTargetClassifier") \
+                or cls.is_multi_target(test):
+            jobj.setInfo("Type", "MT")
+        else:
+            jobj.setInfo("Type", "ML")
+            jobj.setInfo("Threshold", jclass("meka.core.MLEvalUtils").getThreshold(jobj.predictions, train.jobject, top))
+        jobj.output = jclass("meka.core.Result").getStats(jobj, vop)
         return Result(jobject=jobj)
 
+    @classmethod
+    def _evaluate_cached(cls, classifier: MultiXClassifier, train: Instances, test: Instances, cache: ModelCache):
+        """
+        Obtains the trained model from the cache (building it if necessary) and evaluates it on the test set,
+        recording the same values and infos as Meka's raw evaluation.
+
+        :param classifier: the classifier to train
+        :type classifier: MultiXClassifier
+        :param train: the training set
+        :type train: Instances
+        :param test: the test set
+        :type test: Instances
+        :param cache: the cache for trained models
+        :type cache: ModelCache
+        :return: the raw JPype result object
+        """
+        start = time.time()
+        model = cache.train(classifier, train)
+        built = time.time()
+        jobj = jclass("meka.classifiers.multilabel.Evaluation").testClassifier(model.jobject, test.jobject)
+        end = time.time()
+        mlutils = jclass("meka.core.MLUtils")
+        jobj.setValue("N_train", float(train.num_instances))
+        jobj.setValue("N_test", float(test.num_instances))
+        jobj.setValue("LCard_train", mlutils.labelCardinality(train.jobject))
+        jobj.setValue("LCard_test", mlutils.labelCardinality(test.jobject))
+        jobj.setValue("Build_time", built - start)
+        jobj.setValue("Test_time", end - built)
+        jobj.setValue("Total_time", end - start)
+        jobj.setInfo("Classifier", model.classname)
+        jobj.setInfo("Options", jclass("java.util.Arrays").toString(model.jobject.getOptions()))
+        jobj.setInfo("Additional Info", model.jobject.toString())
+        jobj.setInfo("Dataset", mlutils.getDatasetName(train.jobject))
+        return jobj
+
     @classmethod
     def cv_model(cls, classifier: MultiXClassifier, data: Instances, num_folds: int = 10,
-                 top: str = "PCut1", vop: str = "1") -> Result:
+                 top: str = "PCut1", vop: str = "1", num_threads: int = 1, seed: int = None,
+                 cache: ModelCache = None, folds: Union[FoldManager, np.ndarray] = None) -> Result:
         """
         Cross-validate the specified classifier on the supplied dataset and with the specified number of folds.
+        With more than one thread or a seed, the folds get evaluated in parallel on copies of the classifier
+        and their predictions get combined just like Meka's cross-validation does (the same applies when
+        using a model cache or a fold source). A fold source, i.e., a fold manager or the fold per row
+        (e.g., from meka.core.folds.stratified_folds), supplies the train/test splits, in which case its
+        number of folds is used and the seed ignored.
 
         :param classifier: the classifier to train
         :type classifier: MultiXClassifier
@@ -51,17 +118,91 @@ class Evaluation:
         :type top: str
         :param vop: Verbosity OPtion (which measures do we want to calculate/output)
         :type vop: str
+        :param num_threads: the number of folds to evaluate in parallel, -1 for one per CPU core
+        :type num_threads: int
+        :param seed: the seed for randomizing the data before splitting it into folds, no randomization if None
+        :type seed: int
+        :param cache: the optional cache for the models trained on the folds
+        :type cache: ModelCache
+        :param folds: the optional fold source, e.g., FoldManager.get(data, seed=1, stratify=True) or the array of folds
+        :type folds: FoldManager or np.ndarray
         :return: raw prediction data with evaluation statistics included.
         :rtype: Result
         """
-        jobj = JClass("meka.classifiers.multilabel.Evaluation").cvModel(
-            classifier.jobject, data.jobject, num_folds, top, vop)
+        if (num_threads == 1) and (seed is None) and (cache is None) and (folds is None):
+            jobj = jclass("meka.classifiers.multilabel.Evaluation").cvModel(
+                classifier.jobject, data.jobject, num_folds, top, vop)
+            return Result(jobject=jobj)
+
+        if isinstance(folds, np.ndarray):
+            folds = FoldManager(data, assignments=folds)
+        if folds is not None:
+            num_folds = folds.num_folds
+        elif seed is not None:
+            data = Instances.copy_instances(data)
+            data.randomize(Random(seed))
+        copies = MultiLabelClassifier.make_copies(classifier, num_folds)
+
+        def evaluate_fold(fold):
+            if folds is not None:
+                train, test = folds.split(fold)
+            else:
+                train = data.train_cv(num_folds, fold)
+                test = data.test_cv(num_folds, fold)
+            if cache is not None:
+                return cls._evaluate_cached(copies[fold], train, test, cache)
+            return jclass("meka.classifiers.multilabel.Evaluation").evaluateModel(
+                copies[fold].jobject, train.jobject, test.jobject)
+
+        if num_threads < 1:
+            num_threads = os.cpu_count()
+        with ThreadPoolExecutor(max_workers=min(num_threads, num_folds)) as executor:
+            folds = list(executor.map(evaluate_fold, range(num_folds)))
+        return cls.combine_folds(classifier, data, folds, top=top, vop=vop)
+
+    @classmethod
+    def combine_folds(cls, classifier: MultiXClassifier, data: Instances, folds: list,
+                      top: str = "PCut1", vop: str = "1") -> Result:
+        """
+        Combines the (raw) results of the cross-validation folds into a single result, like Meka's
+        cross-validation does.
+
+        :param classifier: the classifier that was evaluated
+        :type classifier: MultiXClassifier
+        :param data: the full dataset
+        :type data: Instances
+        :param folds: the results of the folds (Result or JPype objects)
+        :type folds: list
+        :param top: Threshold OPtion (pertains to multi-label data only)
+        :type top: str
+        :param vop: Verbosity OPtion (which measures do we want to calculate/output)
+        :type vop: str
+        :return: the combined prediction data with evaluation statistics included.
+        :rtype: Result
+        """
+        items = [x.jobject if isinstance(x, Result) else x for x in folds]
+        jobj = jclass("meka.core.MLEvalUtils").combinePredictions(JArray(jclass("meka.core.Result"))(items))
+        if is_instance_of(classifier.jobject, "meka.classifiers.multitarget.MultiTargetClassifier") \
+                or cls.is_multi_target(data):
+            jobj.setInfo("Type", "MT-CV")
+        else:
+            jobj.setInfo("Type", "ML-CV")
+            try:
+                jobj.setInfo("Threshold", str(float(top)))
+            except ValueError:
+                logger.warning("Automatic threshold calibration not available for cross-validation, "
+                               "setting threshold = 0.5")
+                jobj.setInfo("Threshold", "0.5")
+        jobj.output = jclass("meka.core.Result").getStats(jobj, vop)
         return Result(jobject=jobj)
 
     @classmethod
-    def test_classifier(cls, classifier: MultiXClassifier, test: Instances, multi_threaded: bool = False) -> Result:
+    def test_classifier(cls, classifier: MultiXClassifier, test: Instances, multi_threaded: bool = False,
+                        num_threads: int = 1, copies: List[MultiXClassifier] = None) -> Result:
         """
-        Evaluates the trained classifier on the specified test set.
+        Evaluates the trained classifier on the specified test set. With more than one thread, the test set
+        gets split into contiguous chunks that are predicted concurrently by copies of the trained classifier
+        (one per thread), with the predictions combined in the original order.
 
         :param classifier: the classifier to evaluate
         :type classifier: MultiXClassifier
@@ -69,15 +210,47 @@ class Evaluation:
         :type test: Instances
         :param multi_threaded: if the classifier implements MultiLabelClassifierThreaded, then evaluates it using multi-threading
         :type multi_threaded: bool
+        :param num_threads: the number of threads to predict the test set with, -1 for one per CPU core
+        :type num_threads: int
+        :param copies: the copies of the trained classifier to use (one per thread), generated with make_copies if None
+        :type copies: list
         :return: raw prediction data with evaluation statistics included.
         :rtype: Result
         """
         if multi_threaded and is_instance_of(
                 classifier.jobject, "meka.classifiers.multilabel.MultiLabelClassifierThreaded"):
-            jobj = JClass("meka.classifiers.multilabel.Evaluation").testClassifierM(classifier.jobject, test.jobject)
-        else:
-            jobj = JClass("meka.classifiers.multilabel.Evaluation").testClassifier(classifier.jobject, test.jobject)
-        return Result(jobject=jobj)
+            jobj = jclass("meka.classifiers.multilabel.Evaluation").testClassifierM(classifier.jobject, test.jobject)
+            return Result(jobject=jobj)
+
+        if num_threads < 1:
+            num_threads = os.cpu_count()
+        if copies is not None:
+            num_threads = len(copies)
+        num_rows = test.num_instances
+        num_threads = max(1, min(num_threads, num_rows))
+        if num_threads == 1:
+            jobj = jclass("meka.classifiers.multilabel.Evaluation").testClassifier(classifier.jobject, test.jobject)
+            return Result(jobject=jobj)
+
+        if copies is None:
+            if is_instance_of(classifier.jobject, "meka.classifiers.multitarget.MultiTargetClassifier"):
+                copies = MultiTargetClassifier.make_copies(classifier, num_threads)
+            else:
+                copies = MultiLabelClassifier.make_copies(classifier, num_threads)
+        bounds = [num_rows * i // num_threads for i in range(num_threads + 1)]
+        chunks = [jclass("weka.core.Instances")(test.jobject, bounds[i], bounds[i + 1] - bounds[i])
+                  for i in range(num_threads)]
+
+        def test_chunk(i):
+            return jclass("meka.classifiers.multilabel.Evaluation").testClassifier(copies[i].jobject, chunks[i])
+
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            results = list(executor.map(test_chunk, range(num_threads)))
+        result = Result(N=num_rows, L=test.class_index)
+        for r in results:
+            result.jobject.predictions.addAll(r.predictions)
+            result.jobject.actuals.addAll(r.actuals)
+        return result
 
     @classmethod
     def run_experiment(cls, classifier: MultiLabelClassifier, options: List[str]):
@@ -89,7 +262,7 @@ class Evaluation:
         :param options: the commandline options to use
         :type options: list
         """
-        JClass("meka.classifiers.multilabel.Evaluation").runExperiment(classifier.jobject, options)
+        jclass("meka.classifiers.multilabel.Evaluation").runExperiment(classifier.jobject, options)
 
     @classmethod
     def is_multi_target(cls, data: Instances) -> bool:
@@ -101,4 +274,4 @@ class Evaluation:
         :return: True if multi-target
         :rtype: bool
         """
-        return JClass("meka.classifiers.multilabel.Evaluation").isMT(data.jobject)
+        return jclass("meka.classifiers.multilabel.Evaluation").isMT(data.jobject)
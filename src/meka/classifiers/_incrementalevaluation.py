@@ -1,9 +1,17 @@
-from typing import List
-from jpype import JClass
+import time
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, List, Union
 from weka.core.dataset import Instances
+from meka.core.jclasses import jclass
 from meka.core import Result
+from meka.core.metrics import evaluate, threshold_predictions
+from meka.core.mlutils import label_matrix
+from meka.core.thresholds import pcut1
 from meka.classifiers import MultiXClassifier
 
+CUMULATIVE_METRICS = ["Accuracy", "Hamming loss", "Exact match", "F1 (macro averaged by example)"]
+""" the example-based metrics that get also reported as averages since the start of the stream. """
+
 
 class IncrementalEvaluation:
     """
@@ -20,7 +28,7 @@ class IncrementalEvaluation:
         :param options: the commandline options to use
         :type options: list
         """
-        JClass("meka.classifiers.incremental.IncrementalEvaluation").runExperiment(classifier.jobject, options)
+        jclass("meka.classifiers.incremental.IncrementalEvaluation").runExperiment(classifier.jobject, options)
 
     @classmethod
     def evaluate_model(cls, classifier: MultiXClassifier, options: List[str]) -> Result:
@@ -34,7 +42,7 @@ class IncrementalEvaluation:
         :return: the generated results
         :rtype: Result
         """
-        jobj = JClass("meka.classifiers.incremental.IncrementalEvaluation").runExperiment(
+        jobj = jclass("meka.classifiers.incremental.IncrementalEvaluation").runExperiment(
             classifier.jobject, options)
         return Result(jobject=jobj)
 
@@ -59,7 +67,7 @@ class IncrementalEvaluation:
         :return: The Result on the final window (but it contains samples of all the other evaluated windows). The window is sampled every N/numWindows instances, for a total of numWindows windows.
         :rtype: Result
         """
-        jobj = JClass("meka.classifiers.incremental.IncrementalEvaluation").evaluateModelBatchWindow(
+        jobj = jclass("meka.classifiers.incremental.IncrementalEvaluation").evaluateModelBatchWindow(
             classifier.jobject, data.jobject, num_windows, r_labeled, top, vop)
         return Result(jobject=jobj)
 
@@ -84,6 +92,84 @@ class IncrementalEvaluation:
         :return: the evaluation results
         :rtype: Result
         """
-        jobj = JClass("meka.classifiers.incremental.IncrementalEvaluation").evaluateModelPrequentialBasic(
+        jobj = jclass("meka.classifiers.incremental.IncrementalEvaluation").evaluateModelPrequentialBasic(
             classifier.jobject, data.jobject, window_size, r_labeled, top, vop)
         return Result(jobject=jobj)
+
+    @classmethod
+    def evaluate_stream(cls, classifier: MultiXClassifier, batches: Iterable[Instances],
+                        threshold: Union[float, str] = "PCut1", build: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Prequential (test-then-train) evaluation of an updateable classifier on a stream of batches, e.g.,
+        obtained via meka.core.mlutils.load_batches. Each batch gets predicted first, then the classifier gets
+        updated with it. The metrics of each batch (= window) are returned as soon as they are available, along
+        with averages since the start of the stream. Only the current batch is kept in memory.
+
+        :param classifier: the updateable classifier to evaluate
+        :type classifier: MultiXClassifier
+        :param batches: the prepared batches of the stream
+        :type batches: Iterable
+        :param threshold: the fixed threshold or "PCut1" (calibrated with the label cardinality seen so far)
+        :type threshold: float or str
+        :param build: whether to build the classifier on the first batch (not evaluated), otherwise it must be trained already
+        :type build: bool
+        :return: the metrics per window (plus "Window", "Instances", "Threshold", "Test time", "Update time"
+                 and the "Cumulative ..." metrics)
+        :rtype: Iterator
+        """
+        if not classifier.is_updateable:
+            raise ValueError("Classifier is not updateable: %s" % classifier.classname)
+        testing = jclass("meka.classifiers.multilabel.Evaluation")
+        window = 0
+        num_seen = 0
+        num_labels_seen = 0.0
+        num_evaluated = 0
+        sums = dict()
+        tp = fp = fn = 0
+        for batch in batches:
+            y_true = label_matrix(batch)
+            if build and (window == 0) and (num_seen == 0):
+                classifier.build_classifier(batch)
+                num_seen += batch.num_instances
+                num_labels_seen += float(np.sum(y_true))
+                continue
+
+            start = time.time()
+            confidences = Result(jobject=testing.testClassifier(classifier.jobject, batch.jobject)).confidence_matrix()
+            test_time = time.time() - start
+            if threshold == "PCut1":
+                cardinality = num_labels_seen / num_seen if num_seen > 0 else float(np.mean(np.sum(y_true, axis=1)))
+                t = pcut1(confidences, cardinality)
+            else:
+                t = float(threshold)
+            stats = evaluate(y_true, confidences, threshold=t)
+
+            start = time.time()
+            jbatch = batch.jobject
+            jclassifier = classifier.jobject
+            for i in range(batch.num_instances):
+                jclassifier.updateClassifier(jbatch.instance(i))
+            update_time = time.time() - start
+
+            num_rows = len(y_true)
+            num_seen += num_rows
+            num_labels_seen += float(np.sum(y_true))
+            num_evaluated += num_rows
+            y_pred = threshold_predictions(confidences, t).astype(bool)
+            y_bool = y_true.astype(bool)
+            tp += int(np.sum(y_bool & y_pred))
+            fp += int(np.sum(~y_bool & y_pred))
+            fn += int(np.sum(y_bool & ~y_pred))
+            for metric in CUMULATIVE_METRICS:
+                sums[metric] = sums.get(metric, 0.0) + stats[metric] * num_rows
+
+            window += 1
+            stats["Window"] = window
+            stats["Instances"] = num_seen
+            stats["Threshold"] = t
+            stats["Test time"] = test_time
+            stats["Update time"] = update_time
+            for metric in CUMULATIVE_METRICS:
+                stats["Cumulative " + metric] = sums[metric] / num_evaluated
+            stats["Cumulative F1 (micro averaged)"] = 2.0 * tp / (2 * tp + fp + fn) if (tp + fp + fn) > 0 else 0.0
+            yield stats
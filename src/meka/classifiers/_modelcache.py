@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+from weka.core.dataset import Instances
+from weka.core.serialization import read, write
+from meka.core.mlutils import fingerprint
+from ._multix import MultiXClassifier
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = ".model"
+""" the file extension of the cached models. """
+
+
+class ModelCache:
+    """
+    On-disk cache of trained models, keyed by the command-line of the classifier and the content
+    hash of the training data. When exceeding the maximum size, the least recently used models get
+    removed.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = None):
+        """
+        Initializes the cache.
+
+        :param cache_dir: the directory to store the serialized models in (gets created if necessary)
+        :type cache_dir: str
+        :param max_size: the maximum size in bytes of all the models, unlimited if None
+        :type max_size: int
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, classifier: MultiXClassifier, data: Instances) -> str:
+        """
+        Generates the key for the classifier setup and the training data (values and weights, see mlutils.fingerprint).
+
+        :param classifier: the (untrained) classifier
+        :type classifier: MultiXClassifier
+        :param data: the training data
+        :type data: Instances
+        :return: the key
+        :rtype: str
+        """
+        h = hashlib.sha256()
+        h.update(classifier.to_commandline().encode("utf-8"))
+        h.update(b"\n")
+        h.update(fingerprint(data).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """
+        Returns the file for the key.
+
+        :param key: the key of the model
+        :type key: str
+        :return: the file
+        :rtype: str
+        """
+        return os.path.join(self.cache_dir, key + EXTENSION)
+
+    def get(self, classifier: MultiXClassifier, data: Instances, key: str = None) -> Optional[MultiXClassifier]:
+        """
+        Returns the cached model for the classifier setup and training data.
+
+        :param classifier: the (untrained) classifier
+        :type classifier: MultiXClassifier
+        :param data: the training data
+        :type data: Instances
+        :param key: the pre-computed key, computed if None
+        :type key: str
+        :return: the trained model (same wrapper class as the classifier), None if not cached
+        :rtype: MultiXClassifier
+        """
+        path = self._path(self.key(classifier, data) if key is None else key)
+        if not os.path.exists(path):
+            return None
+        try:
+            jobject = read(path)
+        except Exception as e:
+            logger.warning("Failed to read cached model %s: %s" % (path, str(e)))
+            return None
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return type(classifier)(jobject=jobject)
+
+    def put(self, classifier: MultiXClassifier, data: Instances, model: MultiXClassifier, key: str = None):
+        """
+        Stores the trained model for the classifier setup and training data.
+
+        :param classifier: the (untrained) classifier
+        :type classifier: MultiXClassifier
+        :param data: the training data
+        :type data: Instances
+        :param model: the trained model to store
+        :type model: MultiXClassifier
+        :param key: the pre-computed key, computed if None
+        :type key: str
+        """
+        path = self._path(self.key(classifier, data) if key is None else key)
+        tmp = path + "." + uuid.uuid4().hex + ".tmp"
+        write(tmp, model)
+        os.replace(tmp, path)
+        self.evict()
+
+    def train(self, classifier: MultiXClassifier, data: Instances) -> MultiXClassifier:
+        """
+        Returns the cached model if available, otherwise builds the classifier on the data
+        and caches the model.
+
+        :param classifier: the classifier to train (only gets trained if no model cached)
+        :type classifier: MultiXClassifier
+        :param data: the training data
+        :type data: Instances
+        :return: the trained model
+        :rtype: MultiXClassifier
+        """
+        key = self.key(classifier, data)
+        model = self.get(classifier, data, key=key)
+        with self._lock:
+            if model is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if model is None:
+            classifier.build_classifier(data)
+            self.put(classifier, data, classifier, key=key)
+            model = classifier
+        return model
+
+    def size(self) -> int:
+        """
+        Returns the size of all the cached models.
+
+        :return: the size in bytes
+        :rtype: int
+        """
+        return sum(os.path.getsize(os.path.join(self.cache_dir, x))
+                   for x in os.listdir(self.cache_dir) if x.endswith(EXTENSION))
+
+    def evict(self):
+        """
+        Removes the least recently used models until the cache no longer exceeds the maximum size.
+        """
+        if self.max_size is None:
+            return
+        with self._lock:
+            files = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(EXTENSION):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+            total = sum(x[1] for x in files)
+            for mtime, size, name in sorted(files):
+                if total <= self.max_size:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        """
+        Removes all the cached models.
+        """
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(EXTENSION):
+                    os.remove(os.path.join(self.cache_dir, name))
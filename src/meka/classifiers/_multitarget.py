@@ -1,6 +1,6 @@
 from typing import List
-from jpype import JClass
 from weka.core.classes import JavaArray
+from meka.core.jclasses import jclass
 from ._multix import MultiXClassifier
 
 
@@ -35,7 +35,7 @@ class MultiTargetClassifier(MultiXClassifier):
         :param num: the number of copies to create
         :type num: int
         """
-        obj = JClass("meka.classifiers.multilabel.AbstractMultiLabelClassifier").makeCopies(classifier.jobject, num)
+        obj = jclass("meka.classifiers.multilabel.AbstractMultiLabelClassifier").makeCopies(classifier.jobject, num)
         jarray = JavaArray(obj)
         result = []
         for item in jarray:
@@ -52,4 +52,4 @@ class MultiTargetClassifier(MultiXClassifier):
         :param args: the command-line options to use
         :type args: list
         """
-        JClass("meka.classifiers.multilabel.AbstractMultiLabelClassifier").runClassifier(classifier.jobject, args)
+        jclass("meka.classifiers.multilabel.AbstractMultiLabelClassifier").runClassifier(classifier.jobject, args)
@@ -1,5 +1,10 @@
-from jpype import JClass
+import numpy as np
 from weka.classifiers import Classifier
+from weka.core.dataset import Instances
+from meka.core.jclasses import jclass
+from meka.core import Result
+from meka.core._arrays import java_matrix_to_numpy
+from meka.core.mlutils import to_instances
 
 
 class MultiXClassifier(Classifier):
@@ -20,13 +25,13 @@ class MultiXClassifier(Classifier):
         """
         super().__init__(classname=classname, jobject=jobject, options=options)
         if not self.is_updateable:
-            self.is_updateable = isinstance(self.jobject, JClass("weka.classifiers.UpdateableClassifier"))
+            self.is_updateable = isinstance(self.jobject, jclass("weka.classifiers.UpdateableClassifier"))
         if not self.is_drawable:
-            self.is_drawable = isinstance(self.jobject, JClass("weka.core.Drawable"))
+            self.is_drawable = isinstance(self.jobject, jclass("weka.core.Drawable"))
         if not self.is_additional_measure_producer:
-            self.is_additional_measure_producer = isinstance(self.jobject, JClass("weka.core.AdditionalMeasureProducer"))
+            self.is_additional_measure_producer = isinstance(self.jobject, jclass("weka.core.AdditionalMeasureProducer"))
         if not self.is_batchpredictor:
-            self.is_batchpredictor = isinstance(self.jobject, JClass("weka.core.BatchPredictor"))
+            self.is_batchpredictor = isinstance(self.jobject, jclass("weka.core.BatchPredictor"))
 
     @property
     def model(self) -> str:
@@ -37,3 +42,53 @@ class MultiXClassifier(Classifier):
         :rtype: str
         """
         return self.jobject.getModel()
+
+    def _distributions_for_chunk(self, data: Instances) -> np.ndarray:
+        """
+        Predicts all the rows of the prepared dataset, using a single call to the JVM.
+
+        :param data: the data to predict
+        :type data: Instances
+        :return: the N x L matrix
+        :rtype: np.ndarray
+        """
+        num_labels = data.class_index
+        if self.is_batchpredictor:
+            return java_matrix_to_numpy(self.jobject.distributionsForInstances(data.jobject), num_labels)
+        jobj = jclass("meka.classifiers.multilabel.Evaluation").testClassifier(self.jobject, data.jobject)
+        return Result(jobject=jobj).confidence_matrix()
+
+    def distributions_for_instances(self, data, header: Instances = None, chunk_size: int = 10000) -> np.ndarray:
+        """
+        Predicts the confidences (multi-label) or class values (multi-target) for all rows at once.
+        The rows get predicted in chunks, either via the BatchPredictor interface (if implemented)
+        or with the loop running in the JVM, and the predictions get transferred as whole arrays.
+
+        :param data: the prepared dataset or the N x F feature matrix (numpy or scipy CSR)
+        :type data: Instances or np.ndarray
+        :param header: the prepared training data (or its header), required for feature matrices
+        :type header: Instances
+        :param chunk_size: the number of rows to predict per call
+        :type chunk_size: int
+        :return: the N x L matrix (only the first L values per row, in case the classifier returns more)
+        :rtype: np.ndarray
+        """
+        if isinstance(data, Instances):
+            num_rows = data.num_instances
+            num_labels = data.class_index
+        else:
+            if header is None:
+                raise ValueError("Header required for predicting feature matrices!")
+            num_rows = data.shape[0]
+            num_labels = header.class_index
+        result = np.zeros((num_rows, num_labels), dtype=np.float64)
+        for start in range(0, num_rows, chunk_size):
+            num = min(chunk_size, num_rows - start)
+            if not isinstance(data, Instances):
+                chunk = to_instances(data[start:start + num], header=header, chunk_size=chunk_size)
+            elif (start == 0) and (num == num_rows):
+                chunk = data
+            else:
+                chunk = Instances(jclass("weka.core.Instances")(data.jobject, start, num))
+            result[start:start + num] = self._distributions_for_chunk(chunk)[:, :num_labels]
+        return result
@@ -0,0 +1,72 @@
+import numpy as np
+from jpype import JArray, JDouble, JInt
+
+
+def java_matrix_to_numpy(jmatrix, num_cols: int, dtype=np.float64) -> np.ndarray:
+    """
+    Turns a rectangular Java matrix (2-dim primitive array) into a contiguous numpy matrix.
+    The values get transferred in a single bulk copy via the buffer protocol, only ragged
+    matrices fall back to copying row by row.
+
+    :param jmatrix: the Java matrix, e.g., double[][] or int[][]
+    :type jmatrix: JPype object
+    :param num_cols: the number of columns, used when the matrix is empty or ragged
+    :type num_cols: int
+    :param dtype: the numpy type of the generated matrix
+    :return: the matrix
+    :rtype: np.ndarray
+    """
+    if (jmatrix is None) or (len(jmatrix) == 0):
+        return np.zeros((0, num_cols), dtype=dtype)
+    try:
+        result = np.asarray(memoryview(jmatrix))
+    except (BufferError, TypeError, ValueError):
+        result = np.zeros((len(jmatrix), num_cols), dtype=dtype)
+        for i, row in enumerate(jmatrix):
+            result[i, :len(row)] = memoryview(row)
+    return result.astype(dtype, copy=False)
+
+
+def java_rows_to_numpy(jrows, num_cols: int, jtype=JDouble, dtype=np.float64, rows: slice = None) -> np.ndarray:
+    """
+    Turns a Java list of primitive arrays (e.g., ArrayList<double[]>) into a numpy matrix.
+    The list gets converted into a Java matrix first, which then gets transferred in one go.
+
+    :param jrows: the Java list with the rows
+    :type jrows: JPype object
+    :param num_cols: the number of columns, used when the list is empty
+    :type num_cols: int
+    :param jtype: the primitive Java type of the row arrays, e.g., JDouble or JInt
+    :param dtype: the numpy type of the generated matrix
+    :param rows: the optional rows to export, only the selected range gets transferred
+    :type rows: slice
+    :return: the matrix
+    :rtype: np.ndarray
+    """
+    step = None
+    if rows is not None:
+        start, stop, step = rows.indices(jrows.size())
+        if step < 0:
+            start, stop = stop + 1, start + 1
+        if start >= stop:
+            return np.zeros((0, num_cols), dtype=dtype)
+        jrows = jrows.subList(start, stop)
+    jmatrix = jrows.toArray(JArray(jtype, 2)(0))
+    result = java_matrix_to_numpy(jmatrix, num_cols, dtype=dtype)
+    if step not in (None, 1):
+        result = result[::step] if step > 0 else result[::-1][::-step]
+    return result
+
+
+def numpy_to_java_matrix(matrix: np.ndarray, jtype=JDouble):
+    """
+    Turns the numpy matrix into a Java matrix (2-dim primitive array) using a bulk transfer.
+
+    :param matrix: the matrix to convert
+    :type matrix: np.ndarray
+    :param jtype: the primitive Java type to use, e.g., JDouble or JInt
+    :return: the Java matrix
+    :rtype: JPype object
+    """
+    dtype = np.int32 if jtype is JInt else np.float64
+    return JArray(jtype, 2)(np.ascontiguousarray(matrix, dtype=dtype))
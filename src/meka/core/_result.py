@@ -1,8 +1,11 @@
 import numpy as np
 from typing import List, Set, Any, Dict
-from jpype import JClass
+from jpype import JDouble, JInt
 from weka.core.classes import JavaObject
 from weka.core.dataset import Instance, Instances
+from .jclasses import jclass
+from ._arrays import java_matrix_to_numpy, java_rows_to_numpy, numpy_to_java_matrix
+from .mlutils import label_matrix
 
 
 class Result(JavaObject):
@@ -24,9 +27,9 @@ class Result(JavaObject):
         :type L: int
         """
         if (N is not None) and (L is not None):
-            jobject = JClass("meka.core.Result")(N, L)
+            jobject = jclass("meka.core.Result")(N, L)
         elif N is not None:
-            jobject = JClass("meka.core.Result")(N)
+            jobject = jclass("meka.core.Result")(N)
         super().__init__(jobject=jobject)
 
     def __len__(self):
@@ -49,6 +52,34 @@ class Result(JavaObject):
         """
         self.jobject.addResult(pred, real.jobject)
 
+    def add_results(self, confidences: np.ndarray, real, chunk_size: int = 10000):
+        """
+        Adds the entries of a whole batch. The rows get transferred as Java matrices in chunks,
+        avoiding a Python/Java round trip per row.
+
+        :param confidences: the N x L matrix with the prediction confidences
+        :type confidences: np.ndarray
+        :param real: the N x L matrix with the ground truth or the (prepared) Instances with the ground truth
+        :type real: np.ndarray or Instances
+        :param chunk_size: the number of rows to transfer at a time
+        :type chunk_size: int
+        """
+        confidences = np.asarray(confidences, dtype=np.float64)
+        if isinstance(real, Instances):
+            truth = label_matrix(real, dtype=np.int32)
+        else:
+            truth = np.asarray(real, dtype=np.int32)
+        if (confidences.ndim != 2) or (confidences.shape != truth.shape):
+            raise ValueError("Confidences and ground truth must be matrices of the same shape: %s != %s"
+                             % (str(confidences.shape), str(truth.shape)))
+        if (self.num_labels > 0) and (confidences.shape[1] != self.num_labels):
+            raise ValueError("Expected %d labels, but got: %d" % (self.num_labels, confidences.shape[1]))
+        arrays = jclass("java.util.Arrays")
+        for start in range(0, len(confidences), chunk_size):
+            end = start + chunk_size
+            self.jobject.predictions.addAll(arrays.asList(numpy_to_java_matrix(confidences[start:end], JDouble)))
+            self.jobject.actuals.addAll(arrays.asList(numpy_to_java_matrix(truth[start:end], JInt)))
+
     def row_true(self, i: int) -> List[int]:
         """
         Retrieve the true values for the i-th instance.
@@ -100,7 +131,7 @@ class Result(JavaObject):
 
     def all_predictions(self, t: float = None):
         """
-        Returns all prediction confidences in an L * N matrix (2d array). Optionally according to threshold t.
+        Returns all prediction confidences in an N x L matrix (2d array). Optionally according to threshold t.
 
         :param t: the optional threshold
         :type t: float
@@ -108,19 +139,61 @@ class Result(JavaObject):
         :rtype: np.ndarray
         """
         if t is None:
-            m = self.jobject.allPredictions()
+            return java_matrix_to_numpy(self.jobject.allPredictions(), self.num_labels)
         else:
-            m = self.jobject.allPredictions(t)
-        return np.asarray(m)
+            return java_matrix_to_numpy(self.jobject.allPredictions(t), self.num_labels, dtype=np.int32)
 
     def all_true_values(self):
         """
-        Retrieve all true values in an L x N matrix.
+        Retrieve all true values in an N x L matrix.
 
         :return: the matrix
         :rtype: np.ndarray
         """
-        return np.asarray(self.jobject.allTrueValues())
+        return java_matrix_to_numpy(self.jobject.allTrueValues(), self.num_labels, dtype=np.int32)
+
+    @property
+    def num_labels(self) -> int:
+        """
+        Returns the number of labels (L) of this Result.
+
+        :return: the number of labels
+        :rtype: int
+        """
+        return self.jobject.L
+
+    def confidence_matrix(self, dtype=np.float64, rows: slice = None, cols=None) -> np.ndarray:
+        """
+        Exports the prediction confidences as contiguous N x L matrix, using a single bulk transfer
+        rather than walking the Java arrays element by element.
+
+        :param dtype: the floating point type to use, e.g., np.float32 or np.float64
+        :param rows: the optional rows to export, only these get transferred from the JVM
+        :type rows: slice
+        :param cols: the optional columns (labels) to export, any numpy index (slice, list of indices, mask)
+        :return: the confidence matrix
+        :rtype: np.ndarray
+        """
+        result = java_rows_to_numpy(self.jobject.predictions, self.num_labels, jtype=JDouble, dtype=dtype, rows=rows)
+        if cols is not None:
+            result = np.ascontiguousarray(result[:, cols])
+        return result
+
+    def truth_matrix(self, rows: slice = None, cols=None) -> np.ndarray:
+        """
+        Exports the true values as contiguous N x L matrix of type uint8, using a single bulk transfer
+        rather than walking the Java arrays element by element.
+
+        :param rows: the optional rows to export, only these get transferred from the JVM
+        :type rows: slice
+        :param cols: the optional columns (labels) to export, any numpy index (slice, list of indices, mask)
+        :return: the truth matrix
+        :rtype: np.ndarray
+        """
+        result = java_rows_to_numpy(self.jobject.actuals, self.num_labels, jtype=JInt, dtype=np.uint8, rows=rows)
+        if cols is not None:
+            result = np.ascontiguousarray(result[:, cols])
+        return result
 
     def available_metrics(self) -> Set[str]:
         """
@@ -193,7 +266,7 @@ class Result(JavaObject):
         :return: the value
         :rtype: str
         """
-        return self.jobject.getValue(cat)
+        return self.jobject.getInfo(cat)
 
     def set_model(self, key: str, val: str):
         """
@@ -231,7 +304,7 @@ class Result(JavaObject):
         :return: the stats
         :rtype: dict
         """
-        return JClass("meka.core.Result").getStats(r.jobject, vop)
+        return jclass("meka.core.Result").getStats(r.jobject, vop)
 
     @classmethod
     def result_as_string(cls, r: 'Result', num_decimals: int = 3) -> str:
@@ -245,7 +318,7 @@ class Result(JavaObject):
         :return: the generated output
         :rtype: str
         """
-        return JClass("meka.core.Result").getResultAsString(r.jobject, num_decimals)
+        return jclass("meka.core.Result").getResultAsString(r.jobject, num_decimals)
 
     @classmethod
     def predictions_as_instances(cls, r: 'Result') -> Instances:
@@ -258,7 +331,7 @@ class Result(JavaObject):
         :return: the generated data
         :rtype: Instances
         """
-        return Instances(jobject=JClass("meka.core.Result").getPredictionsAsInstances(r.jobject))
+        return Instances(jobject=jclass("meka.core.Result").getPredictionsAsInstances(r.jobject))
 
     @classmethod
     def results_as_instances(cls, metrics: List[Dict[str, Any]]) -> Instances:
@@ -270,4 +343,4 @@ class Result(JavaObject):
         :return: the generated data
         :rtype: Instances
         """
-        return Instances(JClass("meka.core.Result").getResultsAsInstances(metrics))
+        return Instances(jclass("meka.core.Result").getResultsAsInstances(metrics))
@@ -0,0 +1,217 @@
+import json
+import os
+import struct
+import numpy as np
+from typing import Any, Dict, Iterable
+from weka.core.dataset import Attribute, Instances
+from .mlutils import add_rows, instance_weights, load_batches
+
+MAGIC = b"MEKABIN1"
+""" the signature at the start of binary dataset files. """
+
+EXTENSION = ".mekabin"
+""" the default file extension of binary dataset files. """
+
+ALIGNMENT = 64
+""" the alignment of the value matrix within the file. """
+
+_PREAMBLE = struct.Struct("<8sQQQ")
+""" magic, number of rows, number of attributes, length of JSON header. """
+
+
+def _attribute_to_dict(att: Attribute) -> Dict[str, Any]:
+    """
+    Turns the attribute into its JSON representation.
+
+    :param att: the attribute to convert
+    :type att: Attribute
+    :return: the dictionary
+    :rtype: dict
+    """
+    if att.is_date:
+        return {"name": att.name, "type": "date", "format": att.date_format}
+    if att.is_nominal:
+        return {"name": att.name, "type": "nominal", "values": list(att.values)}
+    if att.is_numeric:
+        return {"name": att.name, "type": "numeric"}
+    raise ValueError("Unsupported attribute type for binary format: %s (%s)" % (att.name, att.type_str()))
+
+
+def _dict_to_attribute(d: Dict[str, Any]) -> Attribute:
+    """
+    Turns the JSON representation back into an attribute.
+
+    :param d: the dictionary to convert
+    :type d: dict
+    :return: the attribute
+    :rtype: Attribute
+    """
+    if d["type"] == "date":
+        return Attribute.create_date(d["name"], d["format"])
+    if d["type"] == "nominal":
+        return Attribute.create_nominal(d["name"], d["values"])
+    return Attribute.create_numeric(d["name"])
+
+
+def _header(data: Instances, weights: bool = True) -> bytes:
+    """
+    Generates the JSON header (relation, number of labels, attributes and whether the weights
+    follow the values), padded so that the values start at an aligned offset.
+
+    :param data: the prepared dataset to generate the header for
+    :type data: Instances
+    :param weights: whether the weights follow the values
+    :type weights: bool
+    :return: the header
+    :rtype: bytes
+    """
+    header = {
+        "relation": data.relationname,
+        "num_labels": data.class_index,
+        "attributes": [_attribute_to_dict(data.attribute(j)) for j in range(data.num_attributes)],
+        "weights": weights,
+    }
+    result = json.dumps(header).encode("utf-8")
+    padding = (-(_PREAMBLE.size + len(result))) % ALIGNMENT
+    return result + b" " * padding
+
+
+def _rows(data: Instances) -> np.ndarray:
+    """
+    Extracts the internal values of the dataset as N x A matrix, one transfer per attribute.
+
+    :param data: the dataset to get the values from
+    :type data: Instances
+    :return: the matrix
+    :rtype: np.ndarray
+    """
+    result = np.empty((data.num_instances, data.num_attributes), dtype="<f8")
+    for j in range(data.num_attributes):
+        result[:, j] = np.asarray(memoryview(data.jobject.attributeToDoubleArray(j)))
+    return result
+
+
+def _write(path: str, batches: Iterable[Instances]):
+    """
+    Writes the batches of the (prepared) dataset to the binary file. The weights of the rows and the
+    number of rows in the preamble get written once all batches have been written; the weights get
+    omitted if all of them are 1.0.
+
+    :param path: the file to write to
+    :type path: str
+    :param batches: the batches of the dataset, all sharing the same header
+    :type batches: Iterable
+    """
+    tmp = path + ".tmp"
+    num_rows = 0
+    header = None
+    num_attributes = 0
+    weights = []
+    with open(tmp, "wb") as fp:
+        for batch in batches:
+            if header is None:
+                header = _header(batch, weights=False)
+                num_attributes = batch.num_attributes
+                fp.write(_PREAMBLE.pack(MAGIC, 0, num_attributes, len(header)))
+                fp.write(header)
+            fp.write(_rows(batch).tobytes())
+            weights.append(instance_weights(batch))
+            num_rows += batch.num_instances
+        if header is None:
+            raise ValueError("No data to write!")
+        weights = np.concatenate(weights)
+        if not np.all(weights == 1.0):
+            fp.write(weights.tobytes())
+            # "true" is shorter than "false", i.e., the header (and the alignment) stays the same length
+            header = _header(batch, weights=True).ljust(len(header))
+        fp.seek(0)
+        fp.write(_PREAMBLE.pack(MAGIC, num_rows, num_attributes, len(header)))
+        fp.write(header)
+    os.replace(tmp, path)
+
+
+def save_binary(data: Instances, path: str):
+    """
+    Saves the prepared dataset in the binary format: a JSON header with the relation name,
+    the number of labels and the attribute metadata, followed by the N x A matrix of values
+    (labels first, then features) and the N weights of the rows (unless all 1.0) as little-endian float64.
+
+    :param data: the prepared dataset to save
+    :type data: Instances
+    :param path: the file to save the dataset to
+    :type path: str
+    """
+    _write(path, [data])
+
+
+def arff_to_binary(src: str, dst: str = None, batch_size: int = 10000) -> str:
+    """
+    Converts the dataset file (ARFF or any other format Weka can load incrementally) into the binary format,
+    keeping only a single batch of rows in memory.
+
+    :param src: the dataset to convert
+    :type src: str
+    :param dst: the binary file to write, uses the source file with the binary extension if None
+    :type dst: str
+    :param batch_size: the number of rows to convert at a time
+    :type batch_size: int
+    :return: the binary file
+    :rtype: str
+    """
+    if dst is None:
+        dst = os.path.splitext(src)[0] + EXTENSION
+    _write(dst, load_batches(src, batch_size=batch_size))
+    return dst
+
+
+def is_binary(path: str) -> bool:
+    """
+    Checks whether the file is a binary dataset file.
+
+    :param path: the file to check
+    :type path: str
+    :return: True if binary dataset file
+    :rtype: bool
+    """
+    try:
+        with open(path, "rb") as fp:
+            return fp.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def load_binary(path: str, chunk_size: int = 10000) -> Instances:
+    """
+    Loads a dataset in binary format. The values get memory-mapped and transferred to the
+    JVM in chunks of whole arrays, with the weights of the rows (if stored, otherwise 1.0) passed on
+    when constructing the rows. The class index gets set to the stored number of labels.
+
+    :param path: the binary file to load
+    :type path: str
+    :param chunk_size: the number of rows to transfer at a time
+    :type chunk_size: int
+    :return: the prepared dataset
+    :rtype: Instances
+    """
+    with open(path, "rb") as fp:
+        magic, num_rows, num_attributes, header_len = _PREAMBLE.unpack(fp.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError("Not a binary dataset file: %s" % path)
+        header = json.loads(fp.read(header_len).decode("utf-8"))
+    atts = [_dict_to_attribute(x) for x in header["attributes"]]
+    if len(atts) != num_attributes:
+        raise ValueError("Header describes %d attributes, but expected %d: %s" % (len(atts), num_attributes, path))
+    if not 0 < header.get("num_labels", 0) < num_attributes:
+        raise ValueError("Invalid number of labels in header: %s (%s)" % (str(header.get("num_labels")), path))
+    result = Instances.create_instances(header["relation"], atts, num_rows)
+    if num_rows > 0:
+        offset = _PREAMBLE.size + header_len
+        values = np.memmap(path, dtype="<f8", mode="r", offset=offset, shape=(num_rows, num_attributes))
+        weights = None
+        if header.get("weights", False):
+            weights = np.memmap(path, dtype="<f8", mode="r", offset=offset + values.nbytes, shape=(num_rows,))
+        add_rows(result, values, chunk_size=chunk_size, weights=weights)
+        del values, weights
+    # the stored data is prepared already (labels first), re-preparing would move negative -C labels again
+    result.class_index = header["num_labels"]
+    return result
@@ -0,0 +1,424 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+from jpype import JArray
+from weka.core.dataset import Instances
+from .jclasses import jclass
+from .mlutils import fingerprint, label_matrix
+
+MAX_MANAGERS = 8
+""" the maximum number of fold managers kept by FoldManager.get (each one references its dataset and,
+unless already in fold order, a copy sorted by fold). """
+
+
+def fold_sizes(num_rows: int, num_folds: int) -> np.ndarray:
+    """
+    Returns the number of rows per fold, like Weka's testCV: the first num_rows % num_folds folds
+    contain one row more than the others.
+
+    :param num_rows: the number of rows
+    :type num_rows: int
+    :param num_folds: the number of folds
+    :type num_folds: int
+    :return: the sizes
+    :rtype: np.ndarray
+    """
+    result = np.full(num_folds, num_rows // num_folds, dtype=np.int64)
+    result[:num_rows % num_folds] += 1
+    return result
+
+
+def weka_order(num_rows: int, seed: Optional[int] = 1) -> np.ndarray:
+    """
+    Returns the order of the rows after randomizing them like Weka's Instances.randomize(new Random(seed)),
+    i.e., a Fisher-Yates shuffle driven by java.util.Random. Without a seed, the rows keep their order.
+
+    :param num_rows: the number of rows
+    :type num_rows: int
+    :param seed: the seed of the random number generator, no shuffling if None
+    :type seed: int
+    :return: the (original) row index per position
+    :rtype: np.ndarray
+    """
+    if seed is None:
+        return np.arange(num_rows, dtype=np.int64)
+    result = list(range(num_rows))
+    # java.util.Random: 48-bit linear congruential generator
+    mask = (1 << 48) - 1
+    state = (seed ^ 0x5DEECE66D) & mask
+    for j in range(num_rows - 1, 0, -1):
+        bound = j + 1
+        # Random.nextInt(bound)
+        while True:
+            state = (state * 0x5DEECE66D + 0xB) & mask
+            bits = state >> 17
+            if (bound & -bound) == bound:
+                k = (bound * bits) >> 31
+                break
+            k = bits % bound
+            if bits - k + (bound - 1) < (1 << 31):
+                break
+        result[j], result[k] = result[k], result[j]
+    return np.array(result, dtype=np.int64)
+
+
+def random_folds(num_rows: int, num_folds: int, seed: Optional[int] = 1) -> np.ndarray:
+    """
+    Assigns the rows to the same folds as Weka's cross-validation, i.e., the folds of trainCV/testCV
+    after randomizing the rows with the seed (see weka_order). Without a seed, the rows get split into
+    contiguous blocks (i.e., the same folds as trainCV/testCV of the unrandomized data).
+
+    :param num_rows: the number of rows
+    :type num_rows: int
+    :param num_folds: the number of folds
+    :type num_folds: int
+    :param seed: the seed for randomizing the rows, no randomization if None
+    :type seed: int
+    :return: the fold (0-based) per row
+    :rtype: np.ndarray
+    """
+    result = np.empty(num_rows, dtype=np.int64)
+    result[weka_order(num_rows, seed=seed)] = np.repeat(np.arange(num_folds, dtype=np.int64),
+                                                         fold_sizes(num_rows, num_folds))
+    return result
+
+
+def _allocate(total: int, need: np.ndarray, priority: np.ndarray) -> np.ndarray:
+    """
+    Splits the rows across the folds proportionally to their need (largest remainder method), with the
+    remaining rows going to the folds with the largest fractional shares and then the highest priority.
+
+    :param total: the number of rows to split
+    :type total: int
+    :param need: the number of rows each fold still needs (negative values count as zero)
+    :type need: np.ndarray
+    :param priority: the tie breaker (and fallback if no fold needs rows), e.g., the overall number of rows needed
+    :type priority: np.ndarray
+    :return: the number of rows per fold
+    :rtype: np.ndarray
+    """
+    need = np.clip(need, 0, None)
+    if need.sum() <= 0:
+        need = np.clip(priority, 0, None)
+    if need.sum() <= 0:
+        need = np.ones(len(need))
+    share = need * (total / need.sum())
+    result = np.floor(share).astype(np.int64)
+    rest = total - int(result.sum())
+    if rest > 0:
+        result[np.lexsort((-priority, -(share - result)))[:rest]] += 1
+    return result
+
+
+def _pack_rows(y: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Packs the rows of the boolean matrix into bits (row-major), converting it in chunks of rows.
+
+    :param y: the N x L boolean matrix
+    :type y: np.ndarray
+    :param chunk_size: the number of rows to convert at a time
+    :type chunk_size: int
+    :return: the N x ceil(L/8) matrix
+    :rtype: np.ndarray
+    """
+    result = np.empty((y.shape[0], (y.shape[1] + 7) // 8), dtype=np.uint8)
+    for start in range(0, y.shape[0], chunk_size):
+        result[start:start + chunk_size] = np.packbits(np.ascontiguousarray(y[start:start + chunk_size]), axis=1)
+    return result
+
+
+def stratified_folds(y: np.ndarray, num_folds: int, seed: Optional[int] = 1, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Assigns the rows to folds using iterative stratification for multi-label data (Sechidis et al., 2011),
+    processing a whole label at a time rather than a row at a time: the labels get processed from the
+    rarest to the most frequent one (among the rows not yet assigned), with the rows containing the label
+    getting shuffled and split across the folds proportionally to how many examples of the label each fold
+    still needs (ties going to the folds that need the most rows overall). Rows without labels get
+    distributed to fill up the folds.
+
+    Each step scans a single label column (contiguous in a column-major matrix) and updates the label
+    counts of the newly assigned rows from a bit-packed row-major copy of the labels, i.e., the work
+    is proportional to N x L overall.
+
+    :param y: the N x L label matrix, e.g., from label_matrix(data, dtype=bool, order="F")
+    :type y: np.ndarray
+    :param num_folds: the number of folds
+    :type num_folds: int
+    :param seed: the seed for shuffling the rows, uses 0 if None
+    :type seed: int
+    :param chunk_size: the number of rows to unpack at a time when updating the label counts
+    :type chunk_size: int
+    :return: the fold (0-based) per row
+    :rtype: np.ndarray
+    """
+    rng = np.random.default_rng(0 if seed is None else seed)
+    y = np.asarray(y)
+    if y.dtype != np.bool_:
+        y = y != 0
+    y = np.asfortranarray(y)
+    num_rows, num_labels = y.shape
+    packed = _pack_rows(y, chunk_size=chunk_size)
+    result = np.full(num_rows, -1, dtype=np.int64)
+    unassigned = np.ones(num_rows, dtype=bool)
+    desired = fold_sizes(num_rows, num_folds).astype(np.float64)
+    totals = np.count_nonzero(y, axis=0).astype(np.int64)
+    remaining = totals.copy()
+    folds = np.arange(num_folds)
+    while np.any(remaining > 0):
+        label = int(np.argmin(np.where(remaining > 0, remaining, np.iinfo(np.int64).max)))
+        column = y[:, label]
+        rows = np.flatnonzero(column & unassigned)
+        have = np.bincount(result[column & ~unassigned], minlength=num_folds)
+        counts = _allocate(len(rows), totals[label] / num_folds - have, desired)
+        for start in range(0, len(rows), chunk_size):
+            chunk = packed[rows[start:start + chunk_size]]
+            remaining -= np.unpackbits(chunk, axis=1, count=num_labels).sum(axis=0, dtype=np.int64)
+        shuffled = rng.permutation(rows)
+        result[shuffled] = np.repeat(folds, counts)
+        unassigned[rows] = False
+        desired -= counts
+    rows = rng.permutation(np.flatnonzero(unassigned))
+    result[rows] = np.repeat(folds, _allocate(len(rows), desired, desired))
+    return result
+
+
+class FoldManager:
+    """
+    Computes the assignment of the rows of a dataset to cross-validation folds once and provides
+    the train/test splits of the folds, either as row indices or as datasets. The dataset gets
+    sorted by fold once, so that the splits are contiguous ranges that get copied in the JVM
+    (and cached) rather than generated from scratch for each classifier. The cached datasets are
+    shared, i.e., they must not get modified.
+
+    Without stratification (or precomputed assignments), the folds are the ones of Weka's cross-validation,
+    i.e., the splits equal trainCV/testCV of the dataset randomized with the seed (see weka_order).
+
+    Use FoldManager.get to share the folds of the same dataset, seed and number of folds across calls.
+    """
+
+    _managers = OrderedDict()
+    """ the managers kept by get, with (fingerprint, folds, seed, stratify) as key. """
+
+    _managers_lock = threading.Lock()
+
+    def __init__(self, data: Instances, num_folds: int = 10, seed: Optional[int] = 1, stratify: bool = False,
+                 keep: bool = True, assignments: np.ndarray = None):
+        """
+        Initializes the manager and computes the fold assignments.
+
+        :param data: the prepared dataset to split
+        :type data: Instances
+        :param num_folds: the number of folds (>= 2)
+        :type num_folds: int
+        :param seed: the seed for assigning the rows to folds, contiguous folds if None (and not stratified)
+        :type seed: int
+        :param stratify: whether to use iterative stratification on the labels (multi-label data)
+        :type stratify: bool
+        :param keep: whether to cache the train/test datasets of the folds
+        :type keep: bool
+        :param assignments: the precomputed fold (0-based) per row, e.g., from stratified_folds; determines
+                            the number of folds and ignores seed/stratify
+        :type assignments: np.ndarray
+        """
+        if assignments is not None:
+            assignments = np.asarray(assignments, dtype=np.int64)
+            if len(assignments) != data.num_instances:
+                raise ValueError("Expected %d fold assignments, got: %d" % (data.num_instances, len(assignments)))
+            num_folds = int(assignments.max()) + 1
+        if num_folds < 2:
+            raise ValueError("At least two folds required, got: %d" % num_folds)
+        if num_folds > data.num_instances:
+            raise ValueError("More folds than rows: %d > %d" % (num_folds, data.num_instances))
+        self.data = data
+        self.num_folds = num_folds
+        self.seed = seed
+        self.stratify = stratify
+        self.keep = keep
+        if assignments is not None:
+            self.assignments = assignments
+            self._order = np.argsort(self.assignments, kind="stable")
+        elif stratify:
+            self.assignments = stratified_folds(label_matrix(data, dtype=bool, order="F"), num_folds, seed=seed)
+            self._order = np.argsort(self.assignments, kind="stable")
+        else:
+            # the rows in the order of Weka's randomized data, i.e., the splits equal trainCV/testCV
+            self._order = weka_order(data.num_instances, seed=seed)
+            self.assignments = np.empty(data.num_instances, dtype=np.int64)
+            self.assignments[self._order] = np.repeat(np.arange(num_folds, dtype=np.int64),
+                                                      fold_sizes(data.num_instances, num_folds))
+        self._bounds = np.concatenate([[0], np.cumsum(np.bincount(self.assignments, minlength=num_folds))])
+        self._sorted = None
+        self._splits = dict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, data: Instances, num_folds: int = 10, seed: Optional[int] = 1,
+            stratify: bool = False, keep: bool = False) -> 'FoldManager':
+        """
+        Returns the manager for the dataset (identified by its fingerprint), number of folds, seed and
+        stratification, creating it if necessary. The MAX_MANAGERS most recently used managers are kept,
+        each referencing its dataset and the copy sorted by fold; the train/test datasets of the folds
+        only get kept as well with keep=True (i.e., num_folds times the size of the dataset per manager).
+        The fingerprint of a dataset that a kept manager already references doesn't get computed again
+        (as long as its number of rows doesn't change), i.e., datasets must not get modified once they
+        have been split.
+
+        :param data: the prepared dataset to split
+        :type data: Instances
+        :param num_folds: the number of folds (>= 2)
+        :type num_folds: int
+        :param seed: the seed for assigning the rows to folds, contiguous folds if None (and not stratified)
+        :type seed: int
+        :param stratify: whether to use iterative stratification on the labels (multi-label data)
+        :type stratify: bool
+        :param keep: whether a newly created manager caches the train/test datasets of the folds
+        :type keep: bool
+        :return: the manager
+        :rtype: FoldManager
+        """
+        key = (cls._fingerprint(data), num_folds, seed, stratify)
+        with cls._managers_lock:
+            if key in cls._managers:
+                cls._managers.move_to_end(key)
+                return cls._managers[key]
+        result = FoldManager(data, num_folds=num_folds, seed=seed, stratify=stratify, keep=keep)
+        with cls._managers_lock:
+            result = cls._managers.setdefault(key, result)
+            cls._managers.move_to_end(key)
+            while len(cls._managers) > MAX_MANAGERS:
+                cls._managers.popitem(last=False)
+        return result
+
+    @classmethod
+    def _fingerprint(cls, data: Instances) -> str:
+        """
+        Returns the fingerprint of the dataset, reusing the one of a kept manager for the same Java dataset object.
+
+        :param data: the dataset to get the fingerprint for
+        :type data: Instances
+        :return: the fingerprint
+        :rtype: str
+        """
+        jobject = data.jobject
+        num_rows = data.num_instances
+        with cls._managers_lock:
+            for key, manager in cls._managers.items():
+                if (manager.data.jobject is jobject) and (len(manager.assignments) == num_rows):
+                    return key[0]
+        return fingerprint(data)
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes all the managers kept by get.
+        """
+        with cls._managers_lock:
+            cls._managers.clear()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of folds.
+
+        :return: the number of folds
+        :rtype: int
+        """
+        return self.num_folds
+
+    def __iter__(self) -> Iterator[Tuple[Instances, Instances]]:
+        """
+        Iterates over the train/test splits of the folds.
+
+        :return: the iterator
+        :rtype: Iterator
+        """
+        for fold in range(self.num_folds):
+            yield self.split(fold)
+
+    def indices(self, fold: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (sorted) row indices of the train and test set of the fold.
+
+        :param fold: the fold (0-based)
+        :type fold: int
+        :return: the tuple of train and test indices
+        :rtype: tuple
+        """
+        mask = self.assignments == fold
+        return np.flatnonzero(~mask), np.flatnonzero(mask)
+
+    def _sorted_data(self) -> Instances:
+        """
+        Returns the dataset with the rows sorted by fold (the dataset itself if already sorted). The rows get
+        obtained from the JVM as a single array and added back in fold order in a single call.
+
+        :return: the sorted dataset
+        :rtype: Instances
+        """
+        if self._sorted is None:
+            if np.array_equal(self._order, np.arange(len(self._order))):
+                self._sorted = self.data
+            else:
+                result = Instances.template_instances(self.data, self.data.num_instances)
+                rows = list(self.data.jobject.toArray())
+                ordered = JArray(jclass("weka.core.Instance"))([rows[i] for i in self._order.tolist()])
+                result.jobject.addAll(jclass("java.util.Arrays").asList(ordered))
+                self._sorted = result
+        return self._sorted
+
+    def _copy(self, ranges) -> Instances:
+        """
+        Copies the row ranges of the sorted dataset into a new dataset.
+
+        :param ranges: the list of start/end tuples
+        :type ranges: list
+        :return: the dataset
+        :rtype: Instances
+        """
+        data = self._sorted_data()
+        result = Instances.template_instances(data, sum(end - start for start, end in ranges))
+        for start, end in ranges:
+            if end > start:
+                result.jobject.addAll(data.jobject.subList(start, end))
+        return result
+
+    def split(self, fold: int) -> Tuple[Instances, Instances]:
+        """
+        Returns the train and test set of the fold.
+
+        :param fold: the fold (0-based)
+        :type fold: int
+        :return: the tuple of train and test set
+        :rtype: tuple
+        """
+        with self._lock:
+            if fold in self._splits:
+                return self._splits[fold]
+            start = int(self._bounds[fold])
+            end = int(self._bounds[fold + 1])
+            result = (self._copy([(0, start), (end, self.data.num_instances)]), self._copy([(start, end)]))
+            if self.keep:
+                self._splits[fold] = result
+            return result
+
+    def train(self, fold: int) -> Instances:
+        """
+        Returns the training set of the fold.
+
+        :param fold: the fold (0-based)
+        :type fold: int
+        :return: the training set
+        :rtype: Instances
+        """
+        return self.split(fold)[0]
+
+    def test(self, fold: int) -> Instances:
+        """
+        Returns the test set of the fold.
+
+        :param fold: the fold (0-based)
+        :type fold: int
+        :return: the test set
+        :rtype: Instances
+        """
+        return self.split(fold)[1]
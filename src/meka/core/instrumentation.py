@@ -0,0 +1,395 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .jclasses import jclass
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTS = 1000000
+""" the maximum number of trace events to keep. """
+
+TOOL_NAME = "pymeka"
+""" the name under which the JNI call counting registers with sys.monitoring (Python 3.12+). """
+
+WRAPPED_DUNDERS = ["__init__", "__getitem__", "__iter__", "__next__", "__len__"]
+""" the special methods that get instrumented as well. """
+
+_lock = threading.Lock()
+_local = threading.local()
+_enabled = False
+_patched = []
+_methods = dict()
+_allocations = dict()
+_events = []
+_jni_total = 0
+_jni_enabled = False
+_tool_id = None
+_start_time = 0
+_gc_start = dict()
+
+
+def _targets() -> List[type]:
+    """
+    Returns the wrapper classes to instrument.
+
+    :return: the classes
+    :rtype: list
+    """
+    from meka.core import Result
+    from meka.classifiers import MultiXClassifier, MultiLabelClassifier, MultiTargetClassifier, Evaluation, \
+        IncrementalEvaluation
+    import meka.experiment as experiment
+    result = [Result, MultiXClassifier, MultiLabelClassifier, MultiTargetClassifier, Evaluation, IncrementalEvaluation]
+    for name in sorted(dir(experiment)):
+        item = getattr(experiment, name)
+        if isinstance(item, type) and item.__module__.startswith("meka.experiment"):
+            result.append(item)
+    return result
+
+
+def _stack() -> List[list]:
+    """
+    Returns the stack of active wrapper methods of the current thread.
+
+    :return: the stack of [name, jni calls] entries
+    :rtype: list
+    """
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _record(name: str, start: int, duration: int, jni_calls: int):
+    """
+    Records the call of a wrapper method.
+
+    :param name: the name of the method
+    :type name: str
+    :param start: the start time (perf_counter_ns)
+    :type start: int
+    :param duration: the duration in nanoseconds
+    :type duration: int
+    :param jni_calls: the number of JNI calls made directly by the method
+    :type jni_calls: int
+    """
+    with _lock:
+        stats = _methods.get(name)
+        if stats is None:
+            stats = {"calls": 0, "total_ns": 0, "max_ns": 0, "jni_calls": 0}
+            _methods[name] = stats
+        stats["calls"] += 1
+        stats["total_ns"] += duration
+        stats["max_ns"] = max(stats["max_ns"], duration)
+        stats["jni_calls"] += jni_calls
+        if len(_events) < MAX_EVENTS:
+            _events.append((name, start, duration, threading.get_ident(), jni_calls))
+
+
+def _wrap(func, name: str, allocation: bool = False):
+    """
+    Wraps the function to record calls, durations and JNI calls.
+
+    :param func: the function to wrap
+    :param name: the name to record the calls under
+    :type name: str
+    :param allocation: whether to count an allocation of the instance's class with each call (for constructors);
+                       only the outermost constructor of an instance counts, not the ones of the superclasses it calls
+    :type allocation: bool
+    :return: the wrapped function
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if allocation:
+            # the constructors of the superclasses run on the same instance as the outermost one
+            if not hasattr(_local, "initializing"):
+                _local.initializing = []
+            if (len(_local.initializing) == 0) or (_local.initializing[-1] is not args[0]):
+                cls = type(args[0]).__name__
+                with _lock:
+                    _allocations[cls] = _allocations.get(cls, 0) + 1
+            _local.initializing.append(args[0])
+        stack = _stack()
+        entry = [name, 0]
+        stack.append(entry)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter_ns() - start
+            stack.pop()
+            if allocation:
+                _local.initializing.pop()
+            _record(name, start, duration, entry[1])
+    return wrapper
+
+
+def _patch(cls: type):
+    """
+    Replaces the methods, class/static methods and properties defined by the class with instrumented ones.
+
+    :param cls: the class to instrument
+    :type cls: type
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("__") and (attr not in WRAPPED_DUNDERS):
+            continue
+        name = cls.__name__ + "." + attr
+        if isinstance(value, classmethod):
+            wrapped = classmethod(_wrap(value.__func__, name))
+        elif isinstance(value, staticmethod):
+            wrapped = staticmethod(_wrap(value.__func__, name))
+        elif isinstance(value, property):
+            wrapped = property(None if value.fget is None else _wrap(value.fget, name),
+                               None if value.fset is None else _wrap(value.fset, name + "="),
+                               value.fdel, value.__doc__)
+        elif callable(value) and not isinstance(value, type):
+            wrapped = _wrap(value, name, allocation=(attr == "__init__"))
+        else:
+            continue
+        _patched.append((cls, attr, value))
+        setattr(cls, attr, wrapped)
+
+
+_JNI_TYPES = ()
+""" the JPype types whose calls cross into the JVM. """
+
+
+def _on_call(code, offset, func, arg0):
+    """
+    Counts calls of Java methods and constructors (sys.monitoring callback).
+    """
+    global _jni_total
+    if isinstance(func, _JNI_TYPES):
+        _jni_total += 1
+        stack = getattr(_local, "stack", None)
+        if stack:
+            stack[-1][1] += 1
+
+
+def _enable_jni() -> bool:
+    """
+    Starts counting JNI calls via sys.monitoring (requires Python 3.12+).
+
+    :return: True if counting
+    :rtype: bool
+    """
+    global _tool_id, _JNI_TYPES
+    if not hasattr(sys, "monitoring"):
+        logger.warning("Counting JNI calls requires Python 3.12+, not available on Python %s" % sys.version.split()[0])
+        return False
+    import _jpype
+    _JNI_TYPES = (_jpype._JMethod, _jpype._JClass)
+    mon = sys.monitoring
+    for tool_id in range(mon.PROFILER_ID, 6):
+        if mon.get_tool(tool_id) is None:
+            _tool_id = tool_id
+            break
+    if _tool_id is None:
+        logger.warning("No free sys.monitoring tool ID available, not counting JNI calls")
+        return False
+    mon.use_tool_id(_tool_id, TOOL_NAME)
+    mon.register_callback(_tool_id, mon.events.CALL, _on_call)
+    mon.set_events(_tool_id, mon.events.CALL)
+    return True
+
+
+def _disable_jni():
+    """
+    Stops counting JNI calls.
+    """
+    global _tool_id
+    if _tool_id is None:
+        return
+    mon = sys.monitoring
+    mon.set_events(_tool_id, 0)
+    mon.register_callback(_tool_id, mon.events.CALL, None)
+    mon.free_tool_id(_tool_id)
+    _tool_id = None
+
+
+def _gc_counts() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the collection counts/times of the JVM's garbage collectors.
+
+    :return: the count and time (msec) per collector
+    :rtype: dict
+    """
+    result = dict()
+    for bean in jclass("java.lang.management.ManagementFactory").getGarbageCollectorMXBeans():
+        result[str(bean.getName())] = {"count": int(bean.getCollectionCount()), "time_ms": int(bean.getCollectionTime())}
+    return result
+
+
+def jvm_stats() -> Dict[str, Any]:
+    """
+    Returns the JVM's heap usage and the garbage collections since instrumentation got enabled
+    (or since the JVM started, if not enabled).
+
+    :return: the statistics ("heap" with used/committed/max bytes, "gc" with count/time per collector)
+    :rtype: dict
+    """
+    heap = jclass("java.lang.management.ManagementFactory").getMemoryMXBean().getHeapMemoryUsage()
+    gc = _gc_counts()
+    for name, values in gc.items():
+        start = _gc_start.get(name)
+        if start is not None:
+            values["count"] -= start["count"]
+            values["time_ms"] -= start["time_ms"]
+    return {
+        "heap": {"used": int(heap.getUsed()), "committed": int(heap.getCommitted()), "max": int(heap.getMax())},
+        "gc": gc,
+    }
+
+
+def is_enabled() -> bool:
+    """
+    Returns whether instrumentation is enabled.
+
+    :return: True if enabled
+    :rtype: bool
+    """
+    return _enabled
+
+
+def enable(jni: bool = True):
+    """
+    Enables the instrumentation of the wrapper classes (Result, Evaluation, IncrementalEvaluation, the
+    classifiers and the meka.experiment classes). Records calls and durations per method and allocations
+    per class. Requires the JVM to be running.
+
+    :param jni: whether to count the JNI calls as well (Python 3.12+, slows down execution)
+    :type jni: bool
+    """
+    global _enabled, _jni_enabled, _start_time
+    if _enabled:
+        return
+    for cls in _targets():
+        _patch(cls)
+    _jni_enabled = _enable_jni() if jni else False
+    _gc_start.clear()
+    _gc_start.update(_gc_counts())
+    _start_time = time.perf_counter_ns()
+    _enabled = True
+
+
+def disable():
+    """
+    Disables the instrumentation, restoring the original methods. The recorded data is kept until reset() is called.
+    """
+    global _enabled, _jni_enabled
+    if not _enabled:
+        return
+    _disable_jni()
+    _jni_enabled = False
+    for cls, attr, value in reversed(_patched):
+        setattr(cls, attr, value)
+    _patched.clear()
+    _enabled = False
+
+
+def reset():
+    """
+    Removes all recorded data.
+    """
+    global _jni_total, _start_time
+    with _lock:
+        _methods.clear()
+        _allocations.clear()
+        _events.clear()
+        _jni_total = 0
+        _start_time = time.perf_counter_ns()
+    if _enabled:
+        _gc_start.clear()
+        _gc_start.update(_gc_counts())
+
+
+def report() -> Dict[str, Any]:
+    """
+    Returns the recorded data.
+
+    :return: the "methods" (calls, total/max msec, JNI calls), "allocations" per class, the total
+             "jni_calls" (None if not counted) and the "jvm" statistics
+    :rtype: dict
+    """
+    with _lock:
+        methods = dict()
+        for name, stats in _methods.items():
+            methods[name] = {
+                "calls": stats["calls"],
+                "total_ms": stats["total_ns"] / 1e6,
+                "mean_ms": stats["total_ns"] / stats["calls"] / 1e6,
+                "max_ms": stats["max_ns"] / 1e6,
+                "jni_calls": stats["jni_calls"] if _jni_enabled or (_jni_total > 0) else None,
+            }
+        result = {
+            "methods": methods,
+            "allocations": dict(_allocations),
+            "jni_calls": _jni_total if _jni_enabled or (_jni_total > 0) else None,
+        }
+    try:
+        result["jvm"] = jvm_stats()
+    except Exception as e:
+        logger.warning("Failed to obtain JVM statistics: %s" % str(e))
+        result["jvm"] = None
+    return result
+
+
+def summary(limit: int = None) -> str:
+    """
+    Generates a table of the recorded methods, sorted by total time.
+
+    :param limit: the maximum number of methods to include, all if None
+    :type limit: int
+    :return: the table
+    :rtype: str
+    """
+    data = report()
+    lines = ["%-60s %8s %12s %10s %10s" % ("Method", "Calls", "Total (ms)", "Mean (ms)", "JNI calls")]
+    items = sorted(data["methods"].items(), key=lambda x: x[1]["total_ms"], reverse=True)
+    if limit is not None:
+        items = items[:limit]
+    for name, stats in items:
+        lines.append("%-60s %8d %12.3f %10.3f %10s" % (name, stats["calls"], stats["total_ms"], stats["mean_ms"],
+                                                       "-" if stats["jni_calls"] is None else str(stats["jni_calls"])))
+    if len(data["allocations"]) > 0:
+        lines.append("")
+        lines.append("%-60s %8s" % ("Wrapper allocations", "Count"))
+        for name, count in sorted(data["allocations"].items(), key=lambda x: x[1], reverse=True):
+            lines.append("%-60s %8d" % (name, count))
+    if data["jni_calls"] is not None:
+        lines.append("")
+        lines.append("Total JNI calls: %d" % data["jni_calls"])
+    if data["jvm"] is not None:
+        heap = data["jvm"]["heap"]
+        lines.append("")
+        lines.append("JVM heap: used=%d committed=%d max=%d" % (heap["used"], heap["committed"], heap["max"]))
+        for name, values in data["jvm"]["gc"].items():
+            lines.append("GC %s: count=%d time=%dms" % (name, values["count"], values["time_ms"]))
+    return "\n".join(lines)
+
+
+def chrome_trace(path: str = None) -> Optional[Dict[str, Any]]:
+    """
+    Exports the recorded calls in the Chrome trace event format (chrome://tracing, Perfetto).
+
+    :param path: the JSON file to write the trace to, returns the trace if None
+    :type path: str
+    :return: the trace if no path supplied
+    :rtype: dict
+    """
+    pid = os.getpid()
+    with _lock:
+        events = [{"name": name, "cat": "pymeka", "ph": "X", "ts": (start - _start_time) / 1000.0,
+                   "dur": duration / 1000.0, "pid": pid, "tid": tid, "args": {"jni_calls": jni_calls}}
+                  for name, start, duration, tid, jni_calls in _events]
+    result = {"traceEvents": events, "displayTimeUnit": "ms"}
+    if path is None:
+        return result
+    with open(path, "w") as fp:
+        json.dump(result, fp)
+    return None
@@ -0,0 +1,32 @@
+from typing import Dict
+from jpype import JClass
+
+_classes: Dict[str, JClass] = dict()
+""" the resolved Java classes. """
+
+
+def jclass(name: str) -> JClass:
+    """
+    Returns the Java class with the specified name. The class gets resolved only once (after the JVM
+    has been started) and then served from the registry.
+
+    :param name: the name of the class, e.g., meka.core.Result
+    :type name: str
+    :return: the class
+    :rtype: JClass
+    """
+    result = _classes.get(name)
+    if result is None:
+        result = JClass(name)
+        _classes[name] = result
+    return result
+
+
+def resolved() -> Dict[str, JClass]:
+    """
+    Returns the classes resolved so far.
+
+    :return: the classes, with their names as keys
+    :rtype: dict
+    """
+    return dict(_classes)
@@ -17,10 +17,20 @@
 import jpype
 from jpype import JClass
 import os
+import fnmatch
 import glob
+import hashlib
+import json
 import logging
+import platform
 import requests
-import tempfile
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
 from zipfile import ZipFile
 import weka.core.jvm as weka_jvm
 
@@ -37,6 +47,33 @@ MEKA_URL = "https://github.com/Waikato/meka/releases/download/meka-1.9.8/meka-re
 ENV_MEKA_URL = "MEKA_URL"
 """ environment variable for overriding the default download URL. """
 
+ENV_MEKA_SHA256 = "MEKA_SHA256"
+""" environment variable with the expected SHA-256 checksum of the Meka release zip. """
+
+ENV_MEKA_CACHE = "MEKA_CACHE"
+""" environment variable for overriding the default directory for caching downloads/extracted jars. """
+
+BUFFER_SIZE = 1024 * 1024
+""" the buffer size for downloading/extracting. """
+
+PROFILE_FULL = "full"
+""" classpath profile that uses all the bundled jars. """
+
+PROFILE_HEADLESS_MINIMAL = "headless-minimal"
+""" classpath profile that omits GUI, build tool and other platforms' native jars. """
+
+HEADLESS_MINIMAL_EXCLUDES = [
+    "flatlaf-*", "fcms-widgets-*", "jfilechooser-bookmarks-*", "simple-directory-chooser-*", "jclipboardhelper-*",
+    "rsyntaxtextarea-*", "jshell-scripting-*", "jfreechart-*", "jcommon-*",
+    "scala-*", "scalatest-*",
+    "maven-*", "plexus-*", "wagon-*", "doxia-*", "classworlds-*", "junit-*",
+    "*-examples.jar",
+]
+""" the jar name patterns that the headless-minimal profile excludes. """
+
+startup_timings = dict()
+""" the durations (in seconds) of the steps of the last JVM start up. """
+
 
 # logging setup
 logging.basicConfig()
@@ -56,52 +93,517 @@ def lib_dir():
     return rootdir + os.sep + "lib"
 
 
-def install_meka():
+def meka_cache_dir():
+    """
+    Returns the directory for caching the downloaded Meka release and the extracted jars, shared by
+    all installations on the host. Uses the MEKA_CACHE environment variable or ~/.cache/pymeka.
+    Creates it if necessary.
+
+    :return: the path to the cache directory
+    :rtype: str
+    """
+    result = os.environ.get(ENV_MEKA_CACHE, os.path.join(os.path.expanduser("~"), ".cache", "pymeka"))
+    os.makedirs(result, exist_ok=True)
+    return result
+
+
+def _sha256(path):
+    """
+    Computes the SHA-256 checksum of the file.
+
+    :param path: the file to compute the checksum for
+    :type path: str
+    :return: the checksum (hex digest)
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(BUFFER_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@contextmanager
+def _locked(path):
+    """
+    Holds an exclusive lock on the file (created if necessary) while in the context. The lock gets
+    released by the operating system if the process dies.
+
+    :param path: the lock file
+    :type path: str
+    """
+    with open(path, "a+") as fp:
+        try:
+            import fcntl
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            while True:
+                try:
+                    msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        yield
+
+
+def _is_valid_zip(path):
+    """
+    Checks whether the file is a complete zip file with intact content (CRCs).
+
+    :param path: the file to check
+    :type path: str
+    :return: True if valid
+    :rtype: bool
+    """
+    try:
+        with ZipFile(path, "r") as zf:
+            return zf.testzip() is None
+    except Exception:
+        return False
+
+
+def _download(url, out_dir):
+    """
+    Downloads the URL into the directory, unless already present. Partial downloads get resumed
+    using HTTP range requests. Concurrent downloads of the same URL are serialized with a lock file.
+    The download only gets moved into place if it is a valid zip file, otherwise it gets removed.
+
+    :param url: the URL to download
+    :type url: str
+    :param out_dir: the directory to download to
+    :type out_dir: str
+    :return: the path of the downloaded file
+    :rtype: str
+    """
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + "-" + os.path.basename(urlparse(url).path)
+    target = os.path.join(out_dir, name)
+    if os.path.exists(target):
+        logger.info("Using cached download: %s" % target)
+        return target
+    with _locked(target + ".lock"):
+        if os.path.exists(target):
+            logger.info("Using download completed by other process: %s" % target)
+            return target
+        partial = target + ".part"
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        headers = dict()
+        if offset > 0:
+            logger.info("Resuming download at %d bytes" % offset)
+            headers["Range"] = "bytes=%d-" % offset
+        with requests.get(url, stream=True, headers=headers, timeout=60) as r:
+            complete = (offset > 0) and (r.status_code == 416)  # partial download is already complete
+            if not complete:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    offset = 0
+                with open(partial, "ab" if offset > 0 else "wb") as fp:
+                    for chunk in r.iter_content(chunk_size=BUFFER_SIZE):
+                        if chunk:  # filter out keep-alive new chunks
+                            fp.write(chunk)
+        if not _is_valid_zip(partial):
+            os.remove(partial)
+            raise Exception("Downloaded file is not a valid zip file: %s" % url)
+        os.replace(partial, target)
+    return target
+
+
+def _extract_jar(zip_path, name, out_dir):
+    """
+    Extracts the jar from the zip file into the directory, streaming its content.
+
+    :param zip_path: the zip file
+    :type zip_path: str
+    :param name: the name of the jar in the zip file
+    :type name: str
+    :param out_dir: the directory to extract to
+    :type out_dir: str
+    """
+    with ZipFile(zip_path, "r") as zf:
+        with zf.open(name) as src, open(os.path.join(out_dir, os.path.basename(name)), "wb") as dst:
+            shutil.copyfileobj(src, dst, BUFFER_SIZE)
+
+
+def _extract_jars(zip_path, out_dir):
+    """
+    Extracts the jars from the "lib" directory in the zip file into the directory, unless the directory
+    has been completed already. The jars get extracted in parallel into a temporary directory first,
+    which then gets renamed, i.e., concurrent installations never see a partial extraction.
+
+    :param zip_path: the zip file
+    :type zip_path: str
+    :param out_dir: the directory for the jars
+    :type out_dir: str
+    """
+    if os.path.exists(os.path.join(out_dir, ".complete")):
+        logger.info("Using cached jars: %s" % out_dir)
+        return
+    with ZipFile(zip_path, "r") as zf:
+        names = [x for x in zf.namelist() if ("/lib/" in x) and x.endswith(".jar")]
+    tmp_dir = out_dir + ".tmp-%d" % os.getpid()
+    os.makedirs(tmp_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(_extract_jar, zip_path, name, tmp_dir) for name in names]
+        for future, name in zip(futures, names):
+            future.result()
+            logger.info("Extracted: %s" % os.path.basename(name))
+    open(os.path.join(tmp_dir, ".complete"), "w").close()
+    try:
+        os.replace(tmp_dir, out_dir)
+    except OSError:
+        # another process completed the extraction in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def install_meka(url=None, sha256=None):
     """
-    Downloads and installs the Meka jars in the lib directory.
+    Downloads and installs the Meka jars in the lib directory. The release zip and the extracted jars get
+    cached (see meka_cache_dir), i.e., subsequent installations on the same host require no downloading
+    or extracting. URLs that don't start with "http" are treated as local zip files.
+
+    :param url: the URL or path of the Meka release zip, uses MEKA_URL environment variable or default URL if None
+    :type url: str
+    :param sha256: the expected SHA-256 checksum of the zip, uses MEKA_SHA256 environment variable if None (no check if not set)
+    :type sha256: str
     """
-    url = os.environ.get(ENV_MEKA_URL, MEKA_URL)
-    logger.info("Downloading Meka from: %s" % url)
+    if url is None:
+        url = os.environ.get(ENV_MEKA_URL, MEKA_URL)
+    if sha256 is None:
+        sha256 = os.environ.get(ENV_MEKA_SHA256)
+    cache = meka_cache_dir()
     if url.startswith("http"):
-        r = requests.get(url, stream=True)
-        tmp = tempfile.mktemp(suffix=".zip")
-        with open(tmp, 'wb') as fp:
-            for chunk in r.iter_content(chunk_size=1024):
-                if chunk:  # filter out keep-alive new chunks
-                    fp.write(chunk)
+        logger.info("Downloading Meka from: %s" % url)
+        downloads = os.path.join(cache, "downloads")
+        os.makedirs(downloads, exist_ok=True)
+        zip_path = _download(url, downloads)
     else:
-        tmp = url
+        zip_path = url
+
+    digest = _sha256(zip_path)
+    logger.info("SHA-256 of %s: %s" % (zip_path, digest))
+    if (sha256 is not None) and (digest.lower() != sha256.lower()):
+        if zip_path != url:
+            os.remove(zip_path)
+        raise Exception("SHA-256 mismatch for %s: expected %s, got %s" % (url, sha256, digest))
+
+    jars_dir = os.path.join(cache, "meka", digest)
+    os.makedirs(os.path.dirname(jars_dir), exist_ok=True)
+    _extract_jars(zip_path, jars_dir)
+
     out_dir = lib_dir()
-    with ZipFile(tmp, "r") as zf:
-        for name in zf.namelist():
-            if ("/lib/" in name) and name.endswith(".jar"):
-                jar_name = os.path.basename(name)
-                logger.info("Extracting: %s" % jar_name)
-                jar_path = os.path.join(out_dir, jar_name)
-                with open(jar_path, "wb") as fp:
-                    fp.write(zf.read(name))
+    for name in os.listdir(jars_dir):
+        if not name.endswith(".jar"):
+            continue
+        logger.info("Installing: %s" % name)
+        jar_path = os.path.join(out_dir, name)
+        if os.path.exists(jar_path):
+            os.remove(jar_path)
+        try:
+            os.link(os.path.join(jars_dir, name), jar_path)
+        except OSError:
+            shutil.copyfile(os.path.join(jars_dir, name), jar_path)
+
+
+def cache_dir():
+    """
+    Returns the directory for cached files (classpath manifests, etc). Uses the ".cache" directory inside
+    the "lib" directory if writable, otherwise a directory for this installation in the user's cache
+    directory (see meka_cache_dir). Creates it if necessary.
+
+    :return: the path to the cache directory, None if no writable directory available
+    :rtype: str
+    """
+    result = lib_dir() + os.sep + ".cache"
+    try:
+        os.makedirs(result, exist_ok=True)
+        if os.access(result, os.W_OK):
+            return result
+    except OSError:
+        pass
+    try:
+        result = os.path.join(meka_cache_dir(), "lib-" + hashlib.sha256(lib_dir().encode("utf-8")).hexdigest()[:16])
+        os.makedirs(result, exist_ok=True)
+        if os.access(result, os.W_OK):
+            return result
+    except OSError:
+        pass
+    logger.debug("No writable cache directory available")
+    return None
+
+
+def _native_platform():
+    """
+    Returns the platform identifier as used by the netlib native jars, e.g., linux-x86_64.
+
+    :return: the platform
+    :rtype: str
+    """
+    system = {"Linux": "linux", "Darwin": "osx", "Windows": "win"}.get(platform.system(), platform.system().lower())
+    machine = platform.machine().lower()
+    if machine in ["x86_64", "amd64"]:
+        machine = "x86_64"
+    elif machine in ["i386", "i686", "x86"]:
+        machine = "i686"
+    elif machine.startswith("arm"):
+        machine = "armhf"
+    return system + "-" + machine
+
+
+def filter_jars(jars, profile=PROFILE_FULL):
+    """
+    Filters the jars according to the classpath profile.
+
+    :param jars: the jars to filter
+    :type jars: list
+    :param profile: the classpath profile (PROFILE_FULL or PROFILE_HEADLESS_MINIMAL)
+    :type profile: str
+    :return: the jars to use
+    :rtype: list
+    """
+    result = [x for x in jars if os.path.basename(x).lower().find("-src.") == -1]
+    if profile == PROFILE_FULL:
+        return result
+    if profile != PROFILE_HEADLESS_MINIMAL:
+        raise ValueError("Unknown classpath profile: %s" % profile)
+    native = "-" + _native_platform() + "-"
+    filtered = []
+    for jar in result:
+        name = os.path.basename(jar)
+        if any(fnmatch.fnmatch(name, pattern) for pattern in HEADLESS_MINIMAL_EXCLUDES):
+            continue
+        if name.startswith("netlib-native_") and (native not in name):
+            continue
+        filtered.append(jar)
+    return filtered
+
+
+def _manifest_path(profile):
+    """
+    Returns the path of the cached classpath manifest for the profile.
+
+    :param profile: the classpath profile
+    :type profile: str
+    :return: the path of the manifest, None if no cache directory available
+    :rtype: str
+    """
+    cache = cache_dir()
+    if cache is None:
+        return None
+    return cache + os.sep + "classpath-" + profile + ".json"
+
+
+def _lib_state():
+    """
+    Returns the modification time of the "lib" directory, which changes whenever jars get added,
+    removed or renamed.
+
+    :return: the modification time (nanoseconds), None if not available
+    :rtype: int
+    """
+    try:
+        return os.stat(lib_dir()).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_manifest(profile):
+    """
+    Reads the cached classpath manifest, if still valid (same profile and the "lib" directory
+    hasn't been modified since, i.e., no jars added, removed or renamed).
+
+    :param profile: the classpath profile
+    :type profile: str
+    :return: the jars, None if no valid manifest available
+    :rtype: list
+    """
+    path = _manifest_path(profile)
+    if (path is None) or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as fp:
+            manifest = json.load(fp)
+    except Exception:
+        return None
+    if manifest.get("profile") != profile:
+        return None
+    state = _lib_state()
+    if (state is None) or (manifest.get("lib_mtime") != state):
+        return None
+    if len(manifest.get("jars", [])) == 0:
+        return None
+    return manifest["jars"]
+
+
+def _write_manifest(profile, jars):
+    """
+    Writes the classpath manifest for the profile.
+
+    :param profile: the classpath profile
+    :type profile: str
+    :param jars: the jars of the profile
+    :type jars: list
+    """
+    path = _manifest_path(profile)
+    if path is None:
+        return
+    manifest = {"profile": profile, "lib_mtime": _lib_state(), "jars": jars}
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(tmp, "w") as fp:
+            json.dump(manifest, fp)
+        os.replace(tmp, path)
+    except Exception:
+        logger.warning("Failed to write classpath manifest: %s" % path, exc_info=True)
 
 
-def add_bundled_jars(cp):
+def add_bundled_jars(cp, profile=PROFILE_FULL, use_manifest=True):
     """
-    Adds the bundled jars to the JVM's classpath.
+    Adds the bundled jars to the JVM's classpath. The manifest gets skipped if no writable
+    cache directory is available.
 
     :param cp: the list to append the classpath to
     :type cp: list
+    :param profile: the classpath profile (PROFILE_FULL or PROFILE_HEADLESS_MINIMAL)
+    :type profile: str
+    :param use_manifest: whether to use the cached classpath manifest rather than listing the "lib" directory
+    :type use_manifest: bool
+    """
+    jars = None
+    if use_manifest:
+        jars = _read_manifest(profile)
+        if jars is not None:
+            logger.debug("Using cached classpath manifest: %s" % _manifest_path(profile))
+
+    if jars is None:
+        # determine lib directory with jars
+        libdir = lib_dir()
+
+        # download Meka first?
+        jars = list(glob.glob(libdir + os.sep + "*.jar"))
+        if len(jars) == 0:
+            install_meka()
+            jars = list(glob.glob(libdir + os.sep + "*.jar"))
+
+        jars = filter_jars(sorted(jars), profile=profile)
+        if use_manifest:
+            _write_manifest(profile, jars)
+
+    for jar in jars:
+        cp.append(str(jar))
+
+
+def _cds_archive(classpath):
+    """
+    Returns the path of the class-data-sharing archive for the classpath and the default JVM.
+    The name consists of a key derived from the JVM and the classpath entries (one archive per
+    classpath) and a hash of their sizes and timestamps, i.e., any change to the jars results in
+    a new archive for the same key.
+
+    :param classpath: the classpath of the JVM
+    :type classpath: list
+    :return: the path of the archive, None if no cache directory available
+    :rtype: str
     """
-    # determine lib directory with jars
-    libdir = lib_dir()
+    cache = cache_dir()
+    if cache is None:
+        return None
+    key = hashlib.sha256()
+    state = hashlib.sha256()
+    items = list(classpath)
+    try:
+        items.insert(0, jpype.getDefaultJVMPath())
+    except Exception:
+        logger.warning("Failed to determine default JVM path", exc_info=True)
+    for item in items:
+        key.update((str(item) + "|").encode("utf-8"))
+        if os.path.exists(item):
+            st = os.stat(item)
+            state.update(("%d|%d|" % (st.st_size, st.st_mtime_ns)).encode("utf-8"))
+    return cache + os.sep + "meka-" + key.hexdigest()[:16] + "-" + state.hexdigest()[:16] + ".jsa"
+
+
+def cds_args(classpath):
+    """
+    Generates the JVM arguments for using the class-data-sharing (AppCDS) archive for the classpath.
+    If the archive does not exist yet, the JVM gets instructed to create it when exiting (Java 13+),
+    otherwise to use it. Outdated archives of the same classpath get removed, archives of other
+    classpaths (e.g., other profiles) are left alone. Without a writable cache directory, no
+    class-data-sharing gets used. Unsupported options get ignored by the JVM.
+
+    :param classpath: the classpath of the JVM
+    :type classpath: list
+    :return: the JVM arguments
+    :rtype: list
+    """
+    archive = _cds_archive(classpath)
+    if archive is None:
+        logger.debug("No writable cache directory, not using CDS")
+        return []
+    prefix = archive[:archive.rindex("-") + 1]
+    for path in glob.glob(glob.escape(prefix) + "*.jsa"):
+        if path != archive:
+            logger.debug("Removing outdated CDS archive: %s" % path)
+            try:
+                os.remove(path)
+            except Exception:
+                logger.warning("Failed to remove outdated CDS archive: %s" % path, exc_info=True)
+    result = ["-XX:+IgnoreUnrecognizedVMOptions", "-Xshare:auto"]
+    if os.path.exists(archive):
+        logger.debug("Using CDS archive: %s" % archive)
+        result.append("-XX:SharedArchiveFile=" + archive)
+    else:
+        logger.debug("Creating CDS archive at exit: %s" % archive)
+        result.append("-XX:ArchiveClassesAtExit=" + archive)
+    return result
 
-    # download Meka first?
-    jars = list(glob.glob(libdir + os.sep + "*.jar"))
-    if len(jars) == 0:
-        install_meka()
 
-    # add jars from lib directory
-    jars = list(glob.glob(libdir + os.sep + "*.jar"))
-    for l in jars:
-        if l.lower().find("-src.") == -1:
-            cp.append(str(l))
+def clear_cds():
+    """
+    Removes all class-data-sharing archives.
+    """
+    cache = cache_dir()
+    if cache is None:
+        return
+    for path in glob.glob(cache + os.sep + "meka-*.jsa"):
+        try:
+            os.remove(path)
+        except OSError:
+            logger.warning("Failed to remove CDS archive: %s" % path, exc_info=True)
+
+
+def benchmark_startup(runs=5, cds=True, **kwargs):
+    """
+    Measures the time it takes to start up the JVM, using separate Python processes. The first run is
+    a cold start (without class-data-sharing archive if cds=True), all subsequent ones are warm starts.
+
+    :param runs: the number of start ups to perform (>= 2)
+    :type runs: int
+    :param cds: whether to use class-data-sharing
+    :type cds: bool
+    :param kwargs: additional (literal) keyword arguments for the start method
+    :return: the timings in seconds ("cold", "warm" as mean of the warm starts, "runs" with all timings)
+    :rtype: dict
+    """
+    if cds:
+        clear_cds()
+    options = dict(kwargs)
+    options["cds"] = cds
+    options["logging_level"] = logging.WARNING
+    code = "import time\n" \
+           "start = time.time()\n" \
+           "import meka.core.jvm as jvm\n" \
+           "jvm.start(**%s)\n" \
+           "print(time.time() - start)\n" \
+           "jvm.stop()\n" % repr(options)
+    timings = []
+    for i in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+        logger.info("Start up %d/%d: %.3f sec" % (i + 1, runs, timings[-1]))
+    result = {"cold": timings[0], "runs": timings}
+    if len(timings) > 1:
+        result["warm"] = sum(timings[1:]) / (len(timings) - 1)
+    return result
 
 
 def add_system_classpath(cp):
@@ -120,7 +622,7 @@ def add_system_classpath(cp):
 
 
 def start(class_path=None, bundled=True, packages=False, system_cp=False, max_heap_size=None, system_info=False,
-          auto_install=False, logging_level=logging.DEBUG):
+          auto_install=False, logging_level=logging.DEBUG, profile=PROFILE_FULL, cds=False):
     """
     Initializes the jpype connection (starts up the JVM).
 
@@ -140,6 +642,10 @@ def start(class_path=None, bundled=True, packages=False, system_cp=False, max_he
     :type auto_install: bool
     :param logging_level: the logging level to use for this module, e.g., logging.DEBUG or logging.INFO
     :type logging_level: int
+    :param profile: the classpath profile for the bundled jars, PROFILE_FULL or PROFILE_HEADLESS_MINIMAL (omits GUI, build tool and other platforms' native jars)
+    :type profile: str
+    :param cds: whether to create/use a class-data-sharing archive for the classpath (requires Java 13+), speeds up subsequent start ups
+    :type cds: bool
     """
     global started
     global with_package_support
@@ -151,6 +657,8 @@ def start(class_path=None, bundled=True, packages=False, system_cp=False, max_he
         logger.info("JVM already running, call jvm.stop() first")
         return
 
+    startup_timings.clear()
+    start_time = time.time()
     full_cp = []
 
     # add user-defined jars first
@@ -161,13 +669,14 @@ def start(class_path=None, bundled=True, packages=False, system_cp=False, max_he
 
     if bundled:
         logger.debug("Adding bundled jars")
-        add_bundled_jars(full_cp)
+        add_bundled_jars(full_cp, profile=profile)
 
     if system_cp:
         logger.debug("Adding system classpath")
         add_system_classpath(full_cp)
 
     logger.debug("Classpath=" + str(full_cp))
+    startup_timings["classpath"] = time.time() - start_time
 
     args = []
 
@@ -202,7 +711,14 @@ def start(class_path=None, bundled=True, packages=False, system_cp=False, max_he
     # headless mode
     args.append("-Djava.awt.headless=true")
 
+    # class-data-sharing
+    if cds:
+        args.extend(cds_args(full_cp))
+
+    step_time = time.time()
     jpype.startJVM(*args, classpath=full_cp, convertStrings=True)
+    startup_timings["startJVM"] = time.time() - step_time
+    logger.debug("jpype.startJVM took %.3f sec" % startup_timings["startJVM"])
     started = True
     weka_jvm.started = True
 
@@ -212,7 +728,11 @@ def start(class_path=None, bundled=True, packages=False, system_cp=False, max_he
         env.add_variable("WEKA_HOME", weka_home)
 
     # initialize package manager
+    step_time = time.time()
     JClass("weka.core.WekaPackageManager").loadPackages(False)
+    startup_timings["loadPackages"] = time.time() - step_time
+    logger.debug("WekaPackageManager.loadPackages took %.3f sec" % startup_timings["loadPackages"])
+    startup_timings["total"] = time.time() - start_time
 
     # output system info
     if system_info:
@@ -0,0 +1,345 @@
+import math
+import numpy as np
+from typing import Dict, Union
+from ._result import Result
+
+
+def parse_threshold(threshold: str, num_labels: int) -> np.ndarray:
+    """
+    Parses the threshold string as stored in the "Threshold" info of a Result, either a single
+    value (e.g., "0.3") or one value per label (e.g., "[0.3, 0.4, 0.1]").
+
+    :param threshold: the threshold string
+    :type threshold: str
+    :param num_labels: the number of labels
+    :type num_labels: int
+    :return: the threshold per label
+    :rtype: np.ndarray
+    """
+    threshold = threshold.strip()
+    if threshold.startswith("["):
+        values = [float(x) for x in threshold[1:-1].split(",") if len(x.strip()) > 0]
+        return np.asarray(values, dtype=np.float64)
+    return np.full(num_labels, float(threshold))
+
+
+def threshold_predictions(confidences: np.ndarray, threshold: Union[float, np.ndarray] = 0.5) -> np.ndarray:
+    """
+    Turns the confidences into binary predictions, a label is predicted if its confidence
+    reaches the threshold.
+
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param threshold: the global threshold or one threshold per label
+    :type threshold: float or np.ndarray
+    :return: the N x L prediction matrix
+    :rtype: np.ndarray
+    """
+    return (np.asarray(confidences) >= threshold).astype(np.uint8)
+
+
+def hamming_loss(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """
+    Computes the fraction of incorrectly predicted labels.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :return: the loss
+    :rtype: float
+    """
+    return float(np.mean(np.asarray(y_true, dtype=bool) != np.asarray(y_pred, dtype=bool)))
+
+
+def exact_match(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """
+    Computes the fraction of rows for which all labels were predicted correctly.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :return: the score
+    :rtype: float
+    """
+    return float(np.mean(np.all(np.asarray(y_true, dtype=bool) == np.asarray(y_pred, dtype=bool), axis=1)))
+
+
+def jaccard_index(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """
+    Computes the Jaccard index (Meka's "Accuracy"), averaged over the rows. Rows with neither
+    relevant nor predicted labels score 1.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :return: the score
+    :rtype: float
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    y_pred = np.asarray(y_pred, dtype=bool)
+    inter = np.count_nonzero(y_true & y_pred, axis=1)
+    union = np.count_nonzero(y_true | y_pred, axis=1)
+    scores = np.divide(inter, union, out=np.ones(len(union)), where=union > 0)
+    return float(np.mean(scores))
+
+
+def _f1(tp: np.ndarray, fp: np.ndarray, fn: np.ndarray, zero_division: float) -> np.ndarray:
+    """
+    Computes the F1 measure from the (vectors of) counts.
+
+    :param tp: the true positives
+    :type tp: np.ndarray
+    :param fp: the false positives
+    :type fp: np.ndarray
+    :param fn: the false negatives
+    :type fn: np.ndarray
+    :param zero_division: the value to use if there are neither relevant nor predicted labels
+    :type zero_division: float
+    :return: the F1 scores
+    :rtype: np.ndarray
+    """
+    tp = np.asarray(tp, dtype=np.float64)
+    denom = 2.0 * tp + fp + fn
+    return np.divide(2.0 * tp, denom, out=np.full(np.shape(denom), zero_division, dtype=np.float64), where=denom > 0)
+
+
+def _counts(y_true: np.ndarray, y_pred: np.ndarray, axis: int):
+    """
+    Computes the true positives, false positives and false negatives along the axis.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :param axis: the axis to count along (0 = per label, 1 = per row, None = overall)
+    :return: the tuple of TP, FP, FN
+    :rtype: tuple
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    y_pred = np.asarray(y_pred, dtype=bool)
+    tp = np.count_nonzero(y_true & y_pred, axis=axis)
+    fp = np.count_nonzero(~y_true & y_pred, axis=axis)
+    fn = np.count_nonzero(y_true & ~y_pred, axis=axis)
+    return tp, fp, fn
+
+
+def f1_micro(y_true: np.ndarray, y_pred: np.ndarray, zero_division: float = 0.0) -> float:
+    """
+    Computes the F1 measure over all labels and rows (micro average).
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :param zero_division: the value to use if there are neither relevant nor predicted labels
+    :type zero_division: float
+    :return: the score
+    :rtype: float
+    """
+    return float(_f1(*_counts(y_true, y_pred, None), zero_division))
+
+
+def f1_macro_label(y_true: np.ndarray, y_pred: np.ndarray, zero_division: float = 0.0) -> float:
+    """
+    Computes the F1 measure per label and averages them.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :param zero_division: the value to use for labels with neither relevant nor predicted rows
+    :type zero_division: float
+    :return: the score
+    :rtype: float
+    """
+    return float(np.mean(_f1(*_counts(y_true, y_pred, 0), zero_division)))
+
+
+def f1_macro_example(y_true: np.ndarray, y_pred: np.ndarray, zero_division: float = 0.0) -> float:
+    """
+    Computes the F1 measure per row and averages them.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param y_pred: the N x L prediction matrix
+    :type y_pred: np.ndarray
+    :param zero_division: the value to use for rows with neither relevant nor predicted labels
+    :type zero_division: float
+    :return: the score
+    :rtype: float
+    """
+    return float(np.mean(_f1(*_counts(y_true, y_pred, 1), zero_division)))
+
+
+def log_loss(y_true: np.ndarray, confidences: np.ndarray, limit: float = None) -> float:
+    """
+    Computes the log loss between the confidences and the ground truth, averaged over all
+    labels and rows. The loss per value is capped at the limit.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param limit: the maximum loss per value, uses log(L) if None ("lim. L")
+    :type limit: float
+    :return: the loss
+    :rtype: float
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    if limit is None:
+        limit = math.log(y_true.shape[1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loss = -(y_true * np.log(confidences) + (1.0 - y_true) * np.log(1.0 - confidences))
+    loss[y_true == confidences] = 0.0
+    loss = np.nan_to_num(loss, nan=0.0, posinf=limit)
+    return float(np.mean(np.minimum(loss, limit)))
+
+
+def _tie_runs(values: np.ndarray):
+    """
+    Sorts each row in ascending order and determines for every sorted position the first and
+    last position of the run of tied values it belongs to.
+
+    :param values: the matrix to sort row-wise
+    :type values: np.ndarray
+    :return: the tuple of sort order, run starts and run ends (all matrices of the same shape as values)
+    :rtype: tuple
+    """
+    order = np.argsort(values, axis=1, kind="stable")
+    svalues = np.take_along_axis(values, order, axis=1)
+    n = values.shape[1]
+    pos = np.broadcast_to(np.arange(n), values.shape)
+    first = np.ones(values.shape, dtype=bool)
+    first[:, 1:] = svalues[:, 1:] != svalues[:, :-1]
+    last = np.ones(values.shape, dtype=bool)
+    last[:, :-1] = first[:, 1:]
+    start = np.maximum.accumulate(np.where(first, pos, 0), axis=1)
+    end = np.minimum.accumulate(np.where(last, pos, n - 1)[:, ::-1], axis=1)[:, ::-1]
+    return order, start, end
+
+
+def ranking_loss(y_true: np.ndarray, confidences: np.ndarray) -> float:
+    """
+    Computes the fraction of (relevant, irrelevant) label pairs per row in which the irrelevant label
+    gets ranked above the relevant one, averaged over the rows. Like Meka's L_RankLoss, the labels get
+    ranked by their position in a stable ascending sort of the confidences, i.e., ties are broken by
+    the label index. Rows that have only relevant or only irrelevant labels contribute a loss of 0.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :return: the loss
+    :rtype: float
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    num_labels = y_true.shape[1]
+    order = np.argsort(confidences, axis=1, kind="stable")
+    ysorted = np.take_along_axis(y_true, order, axis=1).astype(np.int64)
+    # number of irrelevant labels at a later position than each relevant one
+    neg_after = np.cumsum((1 - ysorted)[:, ::-1], axis=1)[:, ::-1]
+    wrong = np.sum(neg_after * ysorted, axis=1)
+    num_pos = ysorted.sum(axis=1)
+    pairs = num_pos * (num_labels - num_pos)
+    loss = np.divide(wrong, pairs, out=np.zeros(len(pairs)), where=pairs > 0)
+    return float(np.mean(loss))
+
+
+def one_error(y_true: np.ndarray, confidences: np.ndarray) -> float:
+    """
+    Computes the fraction of rows in which the label with the highest confidence is not relevant.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :return: the error
+    :rtype: float
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    top = np.argmax(np.asarray(confidences), axis=1)
+    return float(np.mean(~y_true[np.arange(len(top)), top]))
+
+
+def auc_per_label(y_true: np.ndarray, confidences: np.ndarray) -> np.ndarray:
+    """
+    Computes the area under the ROC curve for each label (Mann-Whitney statistic, ties count half).
+    Labels without relevant or without irrelevant rows get NaN.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :return: the AUC per label
+    :rtype: np.ndarray
+    """
+    y_true = np.asarray(y_true, dtype=bool).T
+    confidences = np.asarray(confidences, dtype=np.float64).T
+    num_rows = y_true.shape[1]
+    order, start, end = _tie_runs(confidences)
+    ysorted = np.take_along_axis(y_true, order, axis=1)
+    ranks = (start + end) / 2.0 + 1.0
+    rank_sum = np.sum(ranks * ysorted, axis=1)
+    num_pos = np.count_nonzero(y_true, axis=1).astype(np.float64)
+    pairs = num_pos * (num_rows - num_pos)
+    return np.divide(rank_sum - num_pos * (num_pos + 1.0) / 2.0, pairs,
+                     out=np.full(len(pairs), np.nan), where=pairs > 0)
+
+
+def evaluate(y_true: np.ndarray, confidences: np.ndarray, threshold: Union[float, np.ndarray] = 0.5) -> Dict[str, float]:
+    """
+    Computes the standard multi-label metrics, using the same names as Meka's evaluation statistics.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param threshold: the global threshold or one threshold per label
+    :type threshold: float or np.ndarray
+    :return: the metrics
+    :rtype: dict
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    y_pred = threshold_predictions(confidences, threshold).astype(bool)
+    result = dict()
+    result["Number of test instances"] = float(len(y_true))
+    result["Accuracy"] = jaccard_index(y_true, y_pred)
+    result["Jaccard index"] = result["Accuracy"]
+    result["Jaccard distance"] = 1.0 - result["Accuracy"]
+    result["Hamming loss"] = hamming_loss(y_true, y_pred)
+    result["Hamming score"] = 1.0 - result["Hamming loss"]
+    result["Exact match"] = exact_match(y_true, y_pred)
+    result["ZeroOne loss"] = 1.0 - result["Exact match"]
+    result["One error"] = one_error(y_true, confidences)
+    result["Rank loss"] = ranking_loss(y_true, confidences)
+    result["Log Loss (lim. L)"] = log_loss(y_true, confidences)
+    result["Log Loss (lim. D)"] = log_loss(y_true, confidences, limit=math.log(len(y_true)))
+    result["F1 (micro averaged)"] = f1_micro(y_true, y_pred)
+    result["F1 (macro averaged by example)"] = f1_macro_example(y_true, y_pred)
+    result["F1 (macro averaged by label)"] = f1_macro_label(y_true, y_pred)
+    auc = auc_per_label(y_true, confidences)
+    result["AUROC (macro averaged)"] = float(np.nanmean(auc)) if np.any(~np.isnan(auc)) else float("nan")
+    return result
+
+
+def evaluate_result(result: Result, threshold: Union[float, np.ndarray] = None) -> Dict[str, float]:
+    """
+    Computes the standard multi-label metrics for the predictions stored in the Result.
+
+    :param result: the result with the predictions and ground truth
+    :type result: Result
+    :param threshold: the global threshold or one threshold per label, uses the "Threshold" info of the Result if None (or 0.5 if not available)
+    :type threshold: float or np.ndarray
+    :return: the metrics
+    :rtype: dict
+    """
+    if threshold is None:
+        info = result.get_info("Threshold")
+        threshold = 0.5 if info is None else parse_threshold(info, result.num_labels)
+    return evaluate(result.truth_matrix(), result.confidence_matrix(), threshold=threshold)
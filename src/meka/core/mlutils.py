@@ -1,5 +1,11 @@
-from jpype import JClass
-from weka.core.dataset import Instances
+import hashlib
+import numpy as np
+from typing import Iterator, List
+from jpype import JArray, JDouble, JInt
+from weka.core.converters import Loader, loader_for_file
+from weka.core.dataset import Attribute, Instances
+from .jclasses import jclass
+from ._arrays import numpy_to_java_matrix
 
 
 def prepare_data(data: Instances):
@@ -9,4 +15,238 @@ def prepare_data(data: Instances):
     :param data: the data to prepare
     :type data: Instances
     """
-    JClass("meka.core.MLUtils").prepareData(data.jobject)
+    jclass("meka.core.MLUtils").prepareData(data.jobject)
+
+
+def label_matrix(data: Instances, dtype=np.uint8, order: str = "C") -> np.ndarray:
+    """
+    Extracts the label values of the prepared data as N x L matrix. The label columns get
+    transferred as whole arrays, one call per label.
+
+    :param data: the prepared data (the class index determines the number of labels)
+    :type data: Instances
+    :param dtype: the numpy type of the matrix
+    :param order: the memory layout of the matrix, "C" (row-major) or "F" (column-major, contiguous labels)
+    :type order: str
+    :return: the label matrix
+    :rtype: np.ndarray
+    """
+    num_labels = data.class_index
+    result = np.zeros((data.num_instances, num_labels), dtype=dtype, order=order)
+    for j in range(num_labels):
+        values = np.asarray(memoryview(data.jobject.attributeToDoubleArray(j)))
+        result[:, j] = np.rint(np.nan_to_num(values, nan=0.0))
+    return result
+
+
+def instance_weights(data: Instances) -> np.ndarray:
+    """
+    Returns the weights of the rows of the dataset, obtaining all the rows from the JVM in a single call.
+
+    :param data: the dataset to get the weights from
+    :type data: Instances
+    :return: the weights
+    :rtype: np.ndarray
+    """
+    return np.array([x.weight() for x in data.jobject.toArray()], dtype="<f8")
+
+
+def fingerprint(data: Instances) -> str:
+    """
+    Computes a content hash of the dataset, i.e., of its header (incl. relation name), all the
+    attribute values and the weights of the rows. Each attribute gets transferred as a whole array.
+
+    :param data: the dataset to compute the hash for
+    :type data: Instances
+    :return: the hexadecimal SHA-256 digest
+    :rtype: str
+    """
+    result = hashlib.sha256()
+    result.update(str(jclass("weka.core.Instances")(data.jobject, 0).toString()).encode("utf-8"))
+    result.update(np.int64(data.num_instances).tobytes())
+    for j in range(data.num_attributes):
+        values = np.asarray(memoryview(data.jobject.attributeToDoubleArray(j)))
+        result.update(np.ascontiguousarray(values).tobytes())
+    result.update(instance_weights(data).tobytes())
+    return result.hexdigest()
+
+
+def _is_sparse(matrix) -> bool:
+    """
+    Checks whether the matrix is a scipy sparse matrix (scipy is optional).
+
+    :param matrix: the matrix to check
+    :return: True if sparse
+    :rtype: bool
+    """
+    try:
+        import scipy.sparse
+        return scipy.sparse.issparse(matrix)
+    except ImportError:
+        return False
+
+
+def create_header(num_features: int, num_labels: int, relation: str = "data",
+                  feature_names: List[str] = None, label_names: List[str] = None) -> Instances:
+    """
+    Creates an empty, prepared dataset with the labels (nominal 0/1 attributes) first, followed by
+    the numeric features. The number of labels is encoded in the relation name ("relation: -C L").
+
+    :param num_features: the number of features
+    :type num_features: int
+    :param num_labels: the number of labels
+    :type num_labels: int
+    :param relation: the name of the dataset
+    :type relation: str
+    :param feature_names: the names of the features, uses "x0", "x1", etc if None
+    :type feature_names: list
+    :param label_names: the names of the labels, uses "y0", "y1", etc if None
+    :type label_names: list
+    :return: the empty dataset
+    :rtype: Instances
+    """
+    if label_names is None:
+        label_names = ["y%d" % j for j in range(num_labels)]
+    if feature_names is None:
+        feature_names = ["x%d" % i for i in range(num_features)]
+    atts = [Attribute.create_nominal(name, ["0", "1"]) for name in label_names]
+    atts.extend(Attribute.create_numeric(name) for name in feature_names)
+    result = Instances.create_instances("%s: -C %d" % (relation, num_labels), atts, 0)
+    prepare_data(result)
+    return result
+
+
+def to_instances(x, y=None, relation: str = "data", feature_names: List[str] = None,
+                 label_names: List[str] = None, header: Instances = None, chunk_size: int = 10000) -> Instances:
+    """
+    Creates a prepared dataset from the feature matrix (numpy or scipy CSR) and the N x L label matrix.
+    The rows get transferred to the JVM in chunks as whole primitive arrays; sparse feature matrices
+    generate SparseInstance rows. Only one chunk gets converted at a time, i.e., the memory overhead on
+    top of the final dataset is bounded by the chunk size.
+
+    :param x: the N x F feature matrix (dense or CSR)
+    :param y: the N x L label matrix, all zeros if None (requires header)
+    :type y: np.ndarray
+    :param relation: the name of the dataset (when generating the header)
+    :type relation: str
+    :param feature_names: the names of the features (when generating the header), uses "x0", "x1", etc if None
+    :type feature_names: list
+    :param label_names: the names of the labels (when generating the header), uses "y0", "y1", etc if None
+    :type label_names: list
+    :param header: the prepared dataset to use as template, e.g., the training data of a model, generates a header if None
+    :type header: Instances
+    :param chunk_size: the number of rows to transfer at a time
+    :type chunk_size: int
+    :return: the dataset
+    :rtype: Instances
+    """
+    sparse = _is_sparse(x)
+    if not sparse:
+        x = np.asarray(x, dtype=np.float64)
+    if (y is not None) and not _is_sparse(y):
+        y = np.asarray(y, dtype=np.float64)
+    num_rows, num_features = x.shape
+    if header is None:
+        if y is None:
+            raise ValueError("Label matrix required if no header supplied!")
+        num_labels = y.shape[1]
+        result = create_header(num_features, num_labels, relation=relation,
+                               feature_names=feature_names, label_names=label_names)
+    else:
+        num_labels = header.class_index
+        result = Instances.template_instances(header, num_rows)
+    if y is None:
+        y = np.zeros((num_rows, num_labels))
+    if (y.shape[0] != num_rows) or (y.shape[1] != num_labels):
+        raise ValueError("Label matrix must have shape %s, but has: %s" % (str((num_rows, num_labels)), str(y.shape)))
+    if result.num_attributes != num_labels + num_features:
+        raise ValueError("Expected %d features, but got: %d" % (result.num_attributes - num_labels, num_features))
+
+    jdata = result.jobject
+    if sparse:
+        import scipy.sparse
+        arrays = jclass("java.util.Arrays")
+        sparse_instance = jclass("weka.core.SparseInstance")
+        num_attributes = result.num_attributes
+        for start in range(0, num_rows, chunk_size):
+            chunk = scipy.sparse.hstack([scipy.sparse.csr_matrix(y[start:start + chunk_size]),
+                                         x[start:start + chunk_size]], format="csr")
+            chunk.sort_indices()
+            values = JArray(JDouble)(chunk.data.astype(np.float64))
+            indices = JArray(JInt)(chunk.indices.astype(np.int32))
+            indptr = chunk.indptr
+            for i in range(chunk.shape[0]):
+                jdata.add(sparse_instance(1.0, arrays.copyOfRange(values, int(indptr[i]), int(indptr[i + 1])),
+                                          arrays.copyOfRange(indices, int(indptr[i]), int(indptr[i + 1])),
+                                          num_attributes))
+    else:
+        if _is_sparse(y):
+            y = y.toarray()
+        for start in range(0, num_rows, chunk_size):
+            add_rows(result, np.hstack([np.asarray(y[start:start + chunk_size], dtype=np.float64),
+                                        x[start:start + chunk_size]]), chunk_size=chunk_size)
+    return result
+
+
+def add_rows(data: Instances, values: np.ndarray, chunk_size: int = 10000, weights: np.ndarray = None):
+    """
+    Appends the rows of the matrix (internal values, i.e., indices for nominal attributes and NaN for
+    missing values) to the dataset as dense instances, transferring them in chunks of whole arrays.
+
+    :param data: the dataset to append the rows to
+    :type data: Instances
+    :param values: the N x A matrix, with A being the number of attributes of the dataset
+    :type values: np.ndarray
+    :param chunk_size: the number of rows to transfer at a time
+    :type chunk_size: int
+    :param weights: the N weights of the rows, 1.0 for all rows if None
+    :type weights: np.ndarray
+    """
+    if values.shape[1] != data.num_attributes:
+        raise ValueError("Expected %d columns, but got: %d" % (data.num_attributes, values.shape[1]))
+    if (weights is not None) and (len(weights) != len(values)):
+        raise ValueError("Expected %d weights, but got: %d" % (len(values), len(weights)))
+    dense_instance = jclass("weka.core.DenseInstance")
+    jdata = data.jobject
+    for start in range(0, len(values), chunk_size):
+        chunk = np.asarray(values[start:start + chunk_size], dtype=np.float64)
+        if weights is None:
+            for row in numpy_to_java_matrix(chunk):
+                jdata.add(dense_instance(1.0, row))
+        else:
+            for weight, row in zip(weights[start:start + chunk_size].tolist(), numpy_to_java_matrix(chunk)):
+                jdata.add(dense_instance(weight, row))
+
+
+def load_batches(path: str, batch_size: int = 1000, loader: Loader = None) -> Iterator[Instances]:
+    """
+    Loads the dataset incrementally and returns it as prepared batches, i.e., only a single batch
+    is kept in memory at a time.
+
+    :param path: the file to load
+    :type path: str
+    :param batch_size: the (maximum) number of rows per batch
+    :type batch_size: int
+    :param loader: the loader to use, determined from the file extension if None (must support incremental loading)
+    :type loader: Loader
+    :return: the batches
+    :rtype: Iterator
+    """
+    if loader is None:
+        loader = loader_for_file(path)
+        if loader is None:
+            raise ValueError("Failed to determine loader for: %s" % path)
+    structure = loader.load_file(path, incremental=True)
+    prepare_data(structure)
+    jloader = loader.jobject
+    batch = Instances.template_instances(structure, batch_size)
+    while True:
+        inst = jloader.getNextInstance(structure.jobject)
+        if inst is None:
+            break
+        batch.jobject.add(inst)
+        if batch.num_instances >= batch_size:
+            yield batch
+            batch = Instances.template_instances(structure, batch_size)
+    if batch.num_instances > 0:
+        yield batch
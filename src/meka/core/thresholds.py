@@ -0,0 +1,234 @@
+import numpy as np
+from typing import Callable, Tuple, Union
+from weka.core.dataset import Instances
+from .jclasses import jclass
+from ._result import Result
+from .metrics import f1_micro
+from .mlutils import label_matrix
+
+MIN_THRESHOLD = 0.00001
+""" the smallest threshold that PCut calibration returns (like Meka). """
+
+STRATEGIES = ["PCut1", "PCutL", "RCut", "Search1", "SearchL"]
+""" the available calibration strategies (any number is used as fixed threshold). """
+
+
+def _cut(svalues: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+    Determines the thresholds that select the top k values of each column.
+
+    :param svalues: the matrix with each column sorted in descending order
+    :type svalues: np.ndarray
+    :param k: the number of values to select per column
+    :type k: np.ndarray
+    :return: the threshold per column
+    :rtype: np.ndarray
+    """
+    num_rows = svalues.shape[0]
+    cols = np.arange(svalues.shape[1])
+    upper = svalues[np.clip(k - 1, 0, num_rows - 1), cols]
+    lower = svalues[np.clip(k, 0, num_rows - 1), cols]
+    result = (upper + lower) / 2.0
+    result = np.where(k <= 0, np.nextafter(svalues[0], np.inf), result)
+    result = np.where(k >= num_rows, svalues[-1], result)
+    return result
+
+
+def pcut1(confidences: np.ndarray, cardinality: float) -> float:
+    """
+    Calibrates a single threshold, so that the label cardinality of the predictions matches the supplied one.
+
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param cardinality: the label cardinality to aim for, e.g., the one of the training set
+    :type cardinality: float
+    :return: the threshold
+    :rtype: float
+    """
+    confidences = np.asarray(confidences, dtype=np.float64)
+    svalues = -np.sort(-confidences.ravel())[:, None]
+    k = np.array([int(round(cardinality * len(confidences)))])
+    return float(max(_cut(svalues, k)[0], MIN_THRESHOLD))
+
+
+def pcutl(confidences: np.ndarray, frequencies: np.ndarray) -> np.ndarray:
+    """
+    Calibrates one threshold per label, so that the relative frequency of each predicted label
+    matches the supplied one.
+
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param frequencies: the relative frequency per label to aim for, e.g., the ones of the training set
+    :type frequencies: np.ndarray
+    :return: the threshold per label
+    :rtype: np.ndarray
+    """
+    confidences = np.asarray(confidences, dtype=np.float64)
+    svalues = -np.sort(-confidences, axis=0)
+    k = np.rint(np.asarray(frequencies, dtype=np.float64) * len(confidences)).astype(np.int64)
+    return np.maximum(_cut(svalues, k), MIN_THRESHOLD)
+
+
+def rcut(confidences: np.ndarray, k: int) -> np.ndarray:
+    """
+    Predicts the k labels with the highest confidences for each row (rank cut).
+
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param k: the number of labels to predict per row
+    :type k: int
+    :return: the N x L prediction matrix
+    :rtype: np.ndarray
+    """
+    confidences = np.asarray(confidences, dtype=np.float64)
+    result = np.zeros(confidences.shape, dtype=np.uint8)
+    k = min(max(int(k), 0), confidences.shape[1])
+    if k > 0:
+        top = np.argpartition(-confidences, k - 1, axis=1)[:, :k]
+        np.put_along_axis(result, top, 1, axis=1)
+    return result
+
+
+def search_threshold(y_true: np.ndarray, confidences: np.ndarray, metric: Callable = f1_micro,
+                     candidates: np.ndarray = None, maximize: bool = True) -> float:
+    """
+    Searches the single threshold that optimizes the metric.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :param metric: the metric to optimize, a function of ground truth and prediction matrix (see meka.core.metrics)
+    :type metric: callable
+    :param candidates: the thresholds to try, uses 0.00, 0.01, ..., 1.00 if None
+    :type candidates: np.ndarray
+    :param maximize: whether to maximize or minimize the metric
+    :type maximize: bool
+    :return: the best threshold
+    :rtype: float
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    if candidates is None:
+        candidates = np.linspace(0.0, 1.0, 101)
+    scores = np.array([metric(y_true, confidences >= t) for t in candidates])
+    best = np.argmax(scores) if maximize else np.argmin(scores)
+    return float(candidates[best])
+
+
+def search_label_thresholds(y_true: np.ndarray, confidences: np.ndarray) -> np.ndarray:
+    """
+    Determines the threshold per label that maximizes the F1 measure of that label. All possible
+    cut points are evaluated at once by sorting the confidences of each label.
+
+    :param y_true: the N x L ground truth matrix
+    :type y_true: np.ndarray
+    :param confidences: the N x L confidence matrix
+    :type confidences: np.ndarray
+    :return: the threshold per label
+    :rtype: np.ndarray
+    """
+    y_true = np.asarray(y_true, dtype=bool)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    num_rows = len(confidences)
+    order = np.argsort(-confidences, axis=0, kind="stable")
+    svalues = np.take_along_axis(confidences, order, axis=0)
+    tp = np.cumsum(np.take_along_axis(y_true, order, axis=0), axis=0)
+    num_pos = tp[-1]
+    # predicting the top k rows: F1 = 2 * TP / (k + P), only valid between distinct confidences
+    k = np.arange(1, num_rows + 1)[:, None]
+    f1 = 2.0 * tp / (k + num_pos)
+    valid = np.ones(confidences.shape, dtype=bool)
+    valid[:-1] = svalues[:-1] != svalues[1:]
+    f1[~valid] = -1.0
+    best = np.argmax(f1, axis=0) + 1
+    best[num_pos == 0] = 0
+    return _cut(svalues, best)
+
+
+def _threshold_to_string(threshold: Union[float, np.ndarray]) -> str:
+    """
+    Turns the threshold(s) into the format used by the "Threshold" info of a Result.
+
+    :param threshold: the global threshold or one threshold per label
+    :type threshold: float or np.ndarray
+    :return: the string representation
+    :rtype: str
+    """
+    if np.ndim(threshold) == 0:
+        return str(float(threshold))
+    return "[" + ", ".join(str(float(x)) for x in threshold) + "]"
+
+
+def calibrate(result: Result, strategy: str = "PCut1", cardinality: float = None, frequencies: np.ndarray = None,
+              metric: Callable = f1_micro, vop: str = None,
+              train: Instances = None) -> Tuple[Union[float, np.ndarray], Result]:
+    """
+    Calibrates the threshold(s) on the confidences stored in the Result, without having to re-evaluate the
+    classifier. The confidences and the ground truth get exported from the JVM only once.
+
+    Strategies: PCut1 (single threshold matching the label cardinality), PCutL (one threshold per label matching
+    the label frequencies), RCut (predicts the round(cardinality) highest ranked labels per row), Search1 (single
+    threshold optimizing the metric), SearchL (one threshold per label optimizing the F1 per label) or a number
+    (fixed threshold). PCut1, PCutL and RCut require the label cardinality/frequencies of the training data,
+    either supplied directly or computed from the training data; the ones of the result's ground truth
+    (i.e., the test labels) never get used. Search1 and SearchL optimize on the result's ground truth.
+
+    :param result: the result with the confidences and ground truth
+    :type result: Result
+    :param strategy: the calibration strategy
+    :type strategy: str
+    :param cardinality: the label cardinality of the training data for PCut1/RCut, computed from train if None
+    :type cardinality: float
+    :param frequencies: the label frequencies of the training data for PCutL, computed from train if None
+    :type frequencies: np.ndarray
+    :param metric: the metric to optimize with Search1, a function of ground truth and prediction matrix
+    :type metric: callable
+    :param vop: the verbosity option for computing Meka's statistics for the new Result, skipped if None
+    :type vop: str
+    :param train: the (prepared) training data to compute missing cardinality/frequencies from
+    :type train: Instances
+    :return: the tuple of threshold(s) and the re-thresholded Result (for RCut: the top ranked labels as 0/1 confidences and the rank)
+    :rtype: tuple
+    """
+    missing = ((strategy in ["PCut1", "RCut"]) and (cardinality is None)) \
+        or ((strategy == "PCutL") and (frequencies is None))
+    if missing:
+        if train is None:
+            raise ValueError("Strategy %s requires the label %s or the training data!"
+                             % (strategy, "frequencies" if strategy == "PCutL" else "cardinality"))
+        y = label_matrix(train, dtype=np.float64)
+        if cardinality is None:
+            cardinality = float(np.mean(np.sum(y, axis=1))) if len(y) > 0 else 0.0
+        if frequencies is None:
+            frequencies = np.mean(y, axis=0) if len(y) > 0 else np.zeros(y.shape[1])
+    confidences = result.confidence_matrix()
+    truth = result.truth_matrix()
+
+    if strategy == "PCut1":
+        threshold = pcut1(confidences, cardinality)
+    elif strategy == "PCutL":
+        threshold = pcutl(confidences, frequencies)
+    elif strategy == "RCut":
+        threshold = int(round(cardinality))
+        confidences = rcut(confidences, threshold).astype(np.float64)
+    elif strategy == "Search1":
+        threshold = search_threshold(truth, confidences, metric=metric)
+    elif strategy == "SearchL":
+        threshold = search_label_thresholds(truth, confidences)
+    else:
+        try:
+            threshold = float(strategy)
+        except ValueError:
+            raise ValueError("Unknown threshold strategy: %s (available: %s or a number)"
+                             % (strategy, ", ".join(STRATEGIES)))
+
+    calibrated = Result(N=len(confidences), L=confidences.shape[1])
+    calibrated.add_results(confidences, truth)
+    info = result.get_info("Type")
+    calibrated.set_info("Type", "ML" if info is None else info)
+    calibrated.set_info("Threshold", "0.5" if strategy == "RCut" else _threshold_to_string(threshold))
+    if vop is not None:
+        calibrated.jobject.output = jclass("meka.core.Result").getStats(calibrated.jobject, vop)
+    return threshold, calibrated
+
@@ -1,7 +1,50 @@
-from ._datasetproviders import DatasetProvider, LocalDatasetProvider, MultiDatasetProvider
-from ._evaluators import Evaluator
-from ._evaluationstatistics import EvaluationStatistics
-from ._evaluationstatisticshandlers import EvaluationStatisticsHandler
-from ._statisticsexporters import EvaluationStatisticsExporter
-from ._filehandlers import ExperimentFileHandler
-from ._experiments import Experiment
+import importlib
+
+_classes = {
+    "DatasetProvider": "._datasetproviders",
+    "LocalDatasetProvider": "._datasetproviders",
+    "MultiDatasetProvider": "._datasetproviders",
+    "DatasetCache": "._prefetching",
+    "PrefetchingDatasetProvider": "._prefetching",
+    "Evaluator": "._evaluators",
+    "EvaluationStatistics": "._evaluationstatistics",
+    "EvaluationStatisticsHandler": "._evaluationstatisticshandlers",
+    "SQLiteEvaluationStatisticsHandler": "._sqlitehandler",
+    "EvaluationStatisticsExporter": "._statisticsexporters",
+    "ExperimentFileHandler": "._filehandlers",
+    "ExperimentCheckpoint": "._checkpoints",
+    "Experiment": "._experiments",
+    "EvaluationFarm": "._farm",
+    "ParameterSearch": "._search",
+    "GridSearch": "._search",
+    "RandomSearch": "._search",
+    "SuccessiveHalving": "._search",
+}
+""" the classes and the submodules they get imported from on first use. """
+
+__all__ = list(_classes)
+
+
+def __getattr__(name: str):
+    """
+    Imports the class from its submodule on first access (PEP 562).
+
+    :param name: the name of the class
+    :type name: str
+    :return: the class
+    """
+    if name not in _classes:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    result = getattr(importlib.import_module(_classes[name], __name__), name)
+    globals()[name] = result
+    return result
+
+
+def __dir__():
+    """
+    Returns the names of the module, including the lazily imported classes.
+
+    :return: the names
+    :rtype: list
+    """
+    return sorted(set(globals()) | set(__all__))
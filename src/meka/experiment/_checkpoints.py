@@ -0,0 +1,127 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ExperimentCheckpoint:
+    """
+    Records the completed units of work of an experiment, i.e., (classifier command-line, relation, fold),
+    in a JSON lines file. Each unit gets written to disk as soon as it completes, so that a restarted
+    experiment can skip all the units that were already completed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the checkpoint, loading any previously completed units from the file.
+
+        :param path: the file to store the completed units in
+        :type path: str
+        """
+        self.path = path
+        self._completed = dict()
+        self._load()
+
+    def _load(self):
+        """
+        Loads the completed units from the file, if it exists. An incomplete last line (e.g., from a crash
+        while writing) gets removed from the file, so that new units get appended on a line of their own.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as fp:
+            content = fp.read()
+            end = content.rfind(b"\n") + 1
+            if end < len(content):
+                fp.truncate(end)
+        for line in content[:end].decode("utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            key = self.key(entry["classifier"], entry["relation"], entry.get("fold"))
+            self._completed[key] = entry.get("statistics")
+
+    @classmethod
+    def key(cls, cmdline: str, relation: str, fold: int = None) -> Tuple:
+        """
+        Generates the key for the unit of work.
+
+        :param cmdline: the command-line of the classifier
+        :type cmdline: str
+        :param relation: the relation name (or path) of the dataset
+        :type relation: str
+        :param fold: the fold, None if the unit covers all folds
+        :type fold: int
+        :return: the key
+        :rtype: tuple
+        """
+        return cmdline, relation, fold
+
+    def is_completed(self, cmdline: str, relation: str, fold: int = None) -> bool:
+        """
+        Checks whether the unit of work has been completed already.
+
+        :param cmdline: the command-line of the classifier
+        :type cmdline: str
+        :param relation: the relation name (or path) of the dataset
+        :type relation: str
+        :param fold: the fold, None if the unit covers all folds
+        :type fold: int
+        :return: True if completed
+        :rtype: bool
+        """
+        return self.key(cmdline, relation, fold) in self._completed
+
+    def mark_completed(self, cmdline: str, relation: str, fold: int = None, statistics: List[Dict[str, Any]] = None):
+        """
+        Records the unit of work as completed and flushes it to disk immediately.
+
+        :param cmdline: the command-line of the classifier
+        :type cmdline: str
+        :param relation: the relation name (or path) of the dataset
+        :type relation: str
+        :param fold: the fold, None if the unit covers all folds
+        :type fold: int
+        :param statistics: the optional statistics to store alongside
+        :type statistics: list
+        """
+        entry = {"classifier": cmdline, "relation": relation, "fold": fold}
+        if statistics is not None:
+            entry["statistics"] = statistics
+        with open(self.path, "a") as fp:
+            fp.write(json.dumps(entry) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        self._completed[self.key(cmdline, relation, fold)] = statistics
+
+    def statistics(self, cmdline: str, relation: str, fold: int = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the statistics stored with the completed unit of work.
+
+        :param cmdline: the command-line of the classifier
+        :type cmdline: str
+        :param relation: the relation name (or path) of the dataset
+        :type relation: str
+        :param fold: the fold, None if the unit covers all folds
+        :type fold: int
+        :return: the statistics, None if not completed or no statistics stored
+        :rtype: list
+        """
+        return self._completed.get(self.key(cmdline, relation, fold))
+
+    def __len__(self) -> int:
+        """
+        Returns the number of completed units.
+
+        :return: the number of units
+        :rtype: int
+        """
+        return len(self._completed)
+
+    def clear(self):
+        """
+        Removes all completed units, deleting the file.
+        """
+        self._completed = dict()
+        if os.path.exists(self.path):
+            os.remove(self.path)
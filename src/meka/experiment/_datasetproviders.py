@@ -1,7 +1,27 @@
 from typing import Optional, Iterator, List
-from jpype import JClass
 from weka.core.classes import OptionHandler
+from weka.core.converters import load_any_file
 from weka.core.dataset import Instances
+from meka.core.jclasses import jclass
+from meka.core.binaryformat import is_binary, load_binary
+from meka.core.mlutils import prepare_data
+
+
+def load_dataset(path: str) -> Instances:
+    """
+    Loads and prepares the dataset, either in binary format (see meka.core.binaryformat) or any
+    format supported by Weka.
+
+    :param path: the dataset to load
+    :type path: str
+    :return: the prepared dataset
+    :rtype: Instances
+    """
+    if is_binary(path):
+        return load_binary(path)
+    result = load_any_file(path)
+    prepare_data(result)
+    return result
 
 
 class DatasetProvider(OptionHandler, Iterator[Instances]):
@@ -17,10 +37,20 @@ class DatasetProvider(OptionHandler, Iterator[Instances]):
         :type options:  list
         """
         if classname is not None:
-            jobject = JClass(classname)()
+            jobject = jclass(classname)()
         if jobject is not None:
             self.enforce_type(jobject, "meka.experiment.datasetproviders.DatasetProvider")
-        super().__init__(jobject=jobject, optons=options)
+        super().__init__(jobject=jobject, options=options)
+
+    def is_python_only(self) -> bool:
+        """
+        Returns whether the datasets can only be provided in Python (e.g., binary files), i.e., the provider
+        can only be used with Python entry points like Experiment.run_resumable, but not by Experiment.run.
+
+        :return: True if Python only
+        :rtype: bool
+        """
+        return False
 
     def initialize(self) -> Optional[str]:
         """
@@ -61,6 +91,11 @@ class DatasetProvider(OptionHandler, Iterator[Instances]):
 
 
 class LocalDatasetProvider(DatasetProvider):
+    """
+    Provides local dataset files. If any of the files is in binary format (see meka.core.binaryformat),
+    the datasets get loaded in Python rather than by the Java provider, i.e., the provider can only be
+    used with Python entry points like Experiment.run_resumable (see is_python_only).
+    """
 
     def __init__(self, jobject=None, options: List[str] = None):
         """
@@ -73,7 +108,10 @@ class LocalDatasetProvider(DatasetProvider):
         classname = "meka.experiment.datasetproviders.LocalDatasetProvider"
         if jobject is not None:
             self.enforce_type(jobject, classname)
+            classname = None
         super().__init__(jobject=jobject, classname=classname, options=options)
+        self._paths = None
+        self._index = 0
 
     @property
     def datasets(self) -> List[str]:
@@ -83,6 +121,8 @@ class LocalDatasetProvider(DatasetProvider):
         :return: the datasets
         :rtype: list
         """
+        if self._paths is not None:
+            return list(self._paths)
         items = self.jobject.getDatasets()
         return [str(x) for x in items]
 
@@ -94,11 +134,61 @@ class LocalDatasetProvider(DatasetProvider):
         :param paths: the datasets to use
         :type paths: list
         """
+        paths = [str(x) for x in paths]
+        if any(is_binary(x) for x in paths):
+            self._paths = paths
+        else:
+            self._paths = None
         items = []
         for path in paths:
-            items.append(JClass("java.io.File")(path))
+            items.append(jclass("java.io.File")(path))
         self.jobject.setDatasets(items)
 
+    def is_python_only(self) -> bool:
+        """
+        Returns whether the datasets can only be provided in Python, i.e., any of them is in binary format.
+
+        :return: True if Python only
+        :rtype: bool
+        """
+        return self._paths is not None
+
+    def initialize(self) -> Optional[str]:
+        """
+        Initializes the provider to start providing datasets from scratch.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._paths is None:
+            return super().initialize()
+        self._index = 0
+        return None
+
+    def __next__(self) -> Instances:
+        """
+        Returns the next item of the iterator object.
+
+        :return: the next item
+        """
+        if self._paths is None:
+            return super().__next__()
+        if self._index >= len(self._paths):
+            raise StopIteration()
+        self._index += 1
+        return load_dataset(self._paths[self._index - 1])
+
+    def finish(self) -> Optional[str]:
+        """
+        Gets called after the experiment finishes.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._paths is None:
+            return super().finish()
+        return None
+
 
 class MultiDatasetProvider(DatasetProvider):
 
@@ -113,6 +203,7 @@ class MultiDatasetProvider(DatasetProvider):
         classname = "meka.experiment.datasetproviders.MultiDatasetProvider"
         if jobject is not None:
             self.enforce_type(jobject, classname)
+            classname = None
         super().__init__(jobject=jobject, classname=classname, options=options)
 
     @property
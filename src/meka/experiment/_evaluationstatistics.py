@@ -1,11 +1,14 @@
+import numbers
+import numpy as np
 from collections.abc import Mapping
-from typing import Optional, Any, Iterator
+from typing import Optional, Any, Iterator, Dict, List, Tuple
 
-from jpype import JClass
 from weka.classifiers import Classifier
-from weka.core.classes import JavaObject
+from jpype import JDouble, JObject, JString
+from weka.core.classes import JavaObject, from_commandline
 from weka.core.dataset import Instances
 
+from meka.core.jclasses import jclass
 from meka.core import Result
 
 
@@ -37,10 +40,10 @@ class EvaluationStatistics(JavaObject, Mapping):
                     _relation = relation
                 elif dataset is not None:
                     _relation = dataset.relationname
-                jobject = JClass("meka.experiment.evaluationstatistics.EvaluationStatistics")(
+                jobject = jclass("meka.experiment.evaluationstatistics.EvaluationStatistics")(
                     classifier.jobject, _relation, result.jobject)
             else:
-                jobject = JClass("meka.experiment.evaluationstatistics.EvaluationStatistics")()
+                jobject = jclass("meka.experiment.evaluationstatistics.EvaluationStatistics")()
         super().__init__(jobject=jobject)
 
     @property
@@ -85,8 +88,12 @@ class EvaluationStatistics(JavaObject, Mapping):
 
         :param key: the key to get the associated value for
         :return: the associated value
+        :raises KeyError: if the key is not present
         """
-        self.jobject.get(key)
+        value = self.jobject.get(key)
+        if (value is None) and not self.jobject.containsKey(key):
+            raise KeyError(key)
+        return value
 
     def __iter__(self) -> Iterator:
         """
@@ -105,3 +112,120 @@ class EvaluationStatistics(JavaObject, Mapping):
         :rtype: int
         """
         return self.jobject.size()
+
+    @classmethod
+    def unpack(cls, stats: Mapping) -> Tuple[Optional[str], Optional[str], List[str], np.ndarray]:
+        """
+        Splits the statistics into command-line, relation, metric names and values. The keys and values of an
+        EvaluationStatistics object get transferred as whole arrays. Plain dictionaries (e.g., generated by
+        EvaluationFarm) get split as well, skipping non-numeric values other than "Classifier"/"Relation".
+
+        :param stats: the statistics to split
+        :type stats: EvaluationStatistics or dict
+        :return: the tuple of command-line, relation, metric names and values
+        :rtype: tuple
+        """
+        if isinstance(stats, EvaluationStatistics):
+            jobj = stats.jobject
+            cmdline = jobj.getCommandLine()
+            relation = jobj.getRelation()
+            keys = [str(x) for x in jobj.keySet().toArray()]
+            values = np.array(jobj.values().toArray(), dtype=np.float64)
+            return None if cmdline is None else str(cmdline), None if relation is None else str(relation), keys, values
+        keys = []
+        values = []
+        for k, v in stats.items():
+            if (k in ("Classifier", "Relation")) or not isinstance(v, numbers.Number):
+                continue
+            keys.append(k)
+            values.append(v)
+        return stats.get("Classifier"), stats.get("Relation"), keys, np.array(values, dtype=np.float64)
+
+    @classmethod
+    def to_dict(cls, stats: Mapping) -> Dict[str, Any]:
+        """
+        Turns the statistics into a JSON-serializable dictionary of metrics plus "Classifier" and "Relation",
+        the same format EvaluationFarm generates (see unpack).
+
+        :param stats: the statistics to convert
+        :type stats: EvaluationStatistics or dict
+        :return: the dictionary
+        :rtype: dict
+        """
+        cmdline, relation, keys, values = cls.unpack(stats)
+        result = {k: float(v) for k, v in zip(keys, values)}
+        result["Classifier"] = cmdline
+        result["Relation"] = relation
+        return result
+
+    @classmethod
+    def from_dict(cls, values: Mapping, classifier=None) -> 'EvaluationStatistics':
+        """
+        Turns a dictionary as generated by to_dict back into statistics.
+
+        :param values: the dictionary to convert
+        :type values: dict
+        :param classifier: the classifier (Java object) to store, instantiated from "Classifier" if None
+        :return: the statistics
+        :rtype: EvaluationStatistics
+        """
+        cmdline = values.get("Classifier")
+        if (classifier is None) and (cmdline is not None):
+            classifier = from_commandline(cmdline).jobject
+        relation = values.get("Relation")
+        # a typed relation selects the (classifier, relation, result) constructor, even if null
+        relation = JObject(None, JString) if relation is None else JString(relation)
+        jobject = jclass("meka.experiment.evaluationstatistics.EvaluationStatistics")(classifier, relation, None)
+        _, _, keys, array = cls.unpack(values)
+        for k, v in zip(keys, array):
+            jobject.put(k, JDouble(float(v)))
+        return EvaluationStatistics(jobject=jobject)
+
+    @classmethod
+    def to_columns(cls, statistics: List[Mapping]) -> Dict[str, np.ndarray]:
+        """
+        Turns the statistics into columns in a single pass (see unpack). Also accepts plain dictionaries,
+        e.g., the ones generated by EvaluationFarm.
+
+        :param statistics: the statistics to convert
+        :type statistics: list
+        :return: the "Classifier" and "Relation" columns (object arrays) and one float array per metric (NaN if missing)
+        :rtype: dict
+        """
+        classifiers = []
+        relations = []
+        rows = []
+        metrics = dict()
+        for stats in statistics:
+            classifier, relation, keys, values = cls.unpack(stats)
+            classifiers.append(classifier)
+            relations.append(relation)
+            for k in keys:
+                if k not in metrics:
+                    metrics[k] = len(metrics)
+            rows.append((np.array([metrics[k] for k in keys], dtype=np.int64), values))
+
+        matrix = np.full((len(rows), len(metrics)), np.nan)
+        for i, (indices, values) in enumerate(rows):
+            matrix[i, indices] = values
+        result = {"Classifier": np.array(classifiers, dtype=object), "Relation": np.array(relations, dtype=object)}
+        for k, j in metrics.items():
+            result[k] = matrix[:, j]
+        return result
+
+    @classmethod
+    def to_frame(cls, statistics: List[Mapping]):
+        """
+        Turns the statistics into a pandas DataFrame with "Classifier" and "Relation" as index columns.
+        If pandas is not installed, the columns of to_columns get returned instead.
+
+        :param statistics: the statistics to convert
+        :type statistics: list
+        :return: the DataFrame (or the dictionary of numpy arrays)
+        """
+        columns = cls.to_columns(statistics)
+        try:
+            import pandas as pd
+        except ImportError:
+            return columns
+        return pd.DataFrame(columns).set_index(["Classifier", "Relation"])
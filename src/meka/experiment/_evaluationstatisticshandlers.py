@@ -1,6 +1,8 @@
 from typing import Optional, List
 
-from weka.core.classes import OptionHandler
+from weka.core.classes import OptionHandler, is_instance_of
+from weka.core.dataset import Instances
+from meka.classifiers import MultiLabelClassifier
 
 from ._evaluationstatistics import EvaluationStatistics
 
@@ -16,6 +18,44 @@ class EvaluationStatisticsHandler(OptionHandler):
         """
         return self.jobject.isThreadSafe()
 
+    def is_incremental(self) -> bool:
+        """
+        Returns whether the handler stores statistics incrementally (see append). Other handlers
+        (re)write all their statistics with every call of write.
+
+        :return: True if incremental
+        :rtype: bool
+        """
+        return is_instance_of(self.jobject, "meka.experiment.evaluationstatistics.IncrementalEvaluationStatisticsHandler")
+
+    def requires(self, classifier: MultiLabelClassifier, dataset: Instances) -> bool:
+        """
+        Returns whether the classifier/dataset combination still needs evaluating, i.e., the handler
+        doesn't store any statistics for it. Always True for handlers that aren't incremental.
+
+        :param classifier: the classifier to check
+        :type classifier: MultiLabelClassifier
+        :param dataset: the dataset to check
+        :type dataset: Instances
+        :return: True if not stored yet
+        :rtype: bool
+        """
+        if not self.is_incremental():
+            return True
+        return self.jobject.requires(classifier.jobject, dataset.jobject)
+
+    def append(self, statistics: List[EvaluationStatistics]) -> Optional[str]:
+        """
+        Adds the given statistics to the ones already stored (incremental handlers only).
+
+        :param statistics: the statistics to add
+        :type statistics: list
+        :return: None if successfully stored, otherwise error message
+        :rtype: str
+        """
+        items = [x.jobject for x in statistics]
+        return self.jobject.append(items)
+
     def initialize(self) -> Optional[str]:
         """
         Initializes the handler.
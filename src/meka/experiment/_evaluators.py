@@ -1,8 +1,9 @@
 from typing import Optional, List
-from jpype import JClass
-from weka.core.classes import OptionHandler
+from weka.core.classes import OptionHandler, Random, is_instance_of
 from weka.core.dataset import Instances
-from meka.classifiers import MultiLabelClassifier
+from meka.core.jclasses import jclass
+from meka.core.folds import FoldManager
+from meka.classifiers import MultiLabelClassifier, Evaluation, ModelCache
 from  ._evaluationstatistics import EvaluationStatistics
 
 
@@ -11,7 +12,8 @@ class Evaluator(OptionHandler):
     Interface for classes that evaluate on a dataset.
     """
 
-    def __init__(self, jobject=None, classname: str = None, options: List[str] = None):
+    def __init__(self, jobject=None, classname: str = None, options: List[str] = None, model_cache: ModelCache = None,
+                 cache_folds: bool = False):
         """
         Initializes the experiment.
 
@@ -20,12 +22,21 @@ class Evaluator(OptionHandler):
         :type classname: str
         :param options: the options for the evaluator
         :type options:  list
+        :param model_cache: the optional cache for trained models (CrossValidation and TrainTestSplit only)
+        :type model_cache: ModelCache
+        :param cache_folds: whether to obtain the folds from FoldManager.get (CrossValidation only), which shares
+                            the fold assignments across classifiers evaluated on the same dataset (the splits
+                            are the same as without caching)
+        :type cache_folds: bool
         """
         if classname is not None:
-            jobject = JClass(classname)()
+            jobject = jclass(classname)()
         if jobject is not None:
             self.enforce_type(jobject, "meka.experiment.evaluators.Evaluator")
         super().__init__(jobject, options=options)
+        self.model_cache = model_cache
+        self.cache_folds = cache_folds
+        self._randomized = None
 
     def initialize(self) -> Optional[str]:
         """
@@ -47,9 +58,142 @@ class Evaluator(OptionHandler):
         :return: the list of generated statistics
         :rtype: list
         """
+        if (self.model_cache is not None) or self.cache_folds:
+            if is_instance_of(self.jobject, "meka.experiment.evaluators.CrossValidation"):
+                return self._evaluate_cv(classifier, dataset)
+            if is_instance_of(self.jobject, "meka.experiment.evaluators.TrainTestSplit"):
+                return self._evaluate_split(classifier, dataset)
         items = self.jobject.evaluate(classifier.jobject, dataset.jobject)
         return [EvaluationStatistics(jobject=x) for x in items]
 
+    def _randomize(self, dataset: Instances) -> Instances:
+        """
+        Randomizes a copy of the dataset, unless the evaluator preserves the order.
+
+        :param dataset: the dataset to randomize
+        :type dataset: Instances
+        :return: the (randomized) dataset
+        :rtype: Instances
+        """
+        if self.jobject.getPreserveOrder():
+            return dataset
+        result = Instances.copy_instances(dataset)
+        result.randomize(Random(self.jobject.getSeed()))
+        return result
+
+    def _evaluate_cv(self, classifier: MultiLabelClassifier, dataset: Instances) -> List[EvaluationStatistics]:
+        """
+        Performs the cross-validation of the CrossValidation evaluator, obtaining the models and/or folds from the cache.
+
+        :param classifier: the classifier to evaluate
+        :type classifier: MultiLabelClassifier
+        :param dataset: the dataset to evaluate on
+        :type dataset: Instances
+        :return: the statistics per fold
+        :rtype: list
+        """
+        result = []
+        num_folds = self.jobject.getNumFolds()
+        folds = None
+        if self.cache_folds:
+            data = dataset
+            seed = None if self.jobject.getPreserveOrder() else self.jobject.getSeed()
+            folds = FoldManager.get(dataset, num_folds=num_folds, seed=seed)
+        else:
+            data = self._randomize(dataset)
+        copies = MultiLabelClassifier.make_copies(classifier, num_folds)
+        for fold in range(num_folds):
+            if folds is not None:
+                train, test = folds.split(fold)
+            else:
+                train = data.train_cv(num_folds, fold)
+                test = data.test_cv(num_folds, fold)
+            result.append(self._evaluate_fold(copies[fold], classifier, train, test, data, fold))
+        return result
+
+    def _evaluate_fold(self, copy: MultiLabelClassifier, classifier: MultiLabelClassifier, train: Instances,
+                       test: Instances, data: Instances, fold: int) -> EvaluationStatistics:
+        """
+        Evaluates the copy of the classifier on a single fold of the CrossValidation evaluator.
+
+        :param copy: the copy of the classifier to train
+        :type copy: MultiLabelClassifier
+        :param classifier: the classifier to store in the statistics
+        :type classifier: MultiLabelClassifier
+        :param train: the training set of the fold
+        :type train: Instances
+        :param test: the test set of the fold
+        :type test: Instances
+        :param data: the full dataset
+        :type data: Instances
+        :param fold: the 0-based fold
+        :type fold: int
+        :return: the statistics of the fold
+        :rtype: EvaluationStatistics
+        """
+        res = Evaluation.evaluate_model(copy, train, test, top=self.jobject.getThreshold(),
+                                        vop=self.jobject.getVerbosity(), cache=self.model_cache)
+        stats = EvaluationStatistics(classifier=classifier, result=res, dataset=data)
+        stats.jobject.put("Fold", jclass("java.lang.Integer")(fold + 1))
+        return stats
+
+    @property
+    def num_folds(self) -> Optional[int]:
+        """
+        Returns the number of folds that evaluate_fold can evaluate individually.
+
+        :return: the number of folds of the CrossValidation evaluator, None for other evaluators
+        :rtype: int
+        """
+        if is_instance_of(self.jobject, "meka.experiment.evaluators.CrossValidation"):
+            return self.jobject.getNumFolds()
+        return None
+
+    def evaluate_fold(self, classifier: MultiLabelClassifier, dataset: Instances, fold: int) -> List[EvaluationStatistics]:
+        """
+        Evaluates a single fold of the CrossValidation evaluator, using the same train/test split as evaluate,
+        i.e., the dataset gets randomized with the evaluator's seed (unless it preserves the order) and split with
+        train_cv/test_cv. The randomized dataset is kept for the subsequent folds of the same dataset.
+
+        :param classifier: the classifier to evaluate (a copy gets trained)
+        :type classifier: MultiLabelClassifier
+        :param dataset: the dataset to evaluate on
+        :type dataset: Instances
+        :param fold: the 0-based fold to evaluate
+        :type fold: int
+        :return: the statistics of the fold
+        :rtype: list
+        """
+        num_folds = self.num_folds
+        if num_folds is None:
+            raise ValueError("Only CrossValidation can evaluate individual folds: %s" % self.classname)
+        if (self._randomized is None) or (self._randomized[0] is not dataset.jobject):
+            self._randomized = (dataset.jobject, self._randomize(dataset))
+        data = self._randomized[1]
+        train = data.train_cv(num_folds, fold)
+        test = data.test_cv(num_folds, fold)
+        copy = MultiLabelClassifier.make_copies(classifier, 1)[0]
+        return [self._evaluate_fold(copy, classifier, train, test, data, fold)]
+
+    def _evaluate_split(self, classifier: MultiLabelClassifier, dataset: Instances) -> List[EvaluationStatistics]:
+        """
+        Performs the train/test split evaluation of the TrainTestSplit evaluator, obtaining the model from the cache.
+
+        :param classifier: the classifier to evaluate
+        :type classifier: MultiLabelClassifier
+        :param dataset: the dataset to evaluate on
+        :type dataset: Instances
+        :return: the statistics
+        :rtype: list
+        """
+        data = self._randomize(dataset)
+        train_size = int(data.num_instances * self.jobject.getTrainPercentage() / 100.0)
+        train = Instances(jclass("weka.core.Instances")(data.jobject, 0, train_size))
+        test = Instances(jclass("weka.core.Instances")(data.jobject, train_size, data.num_instances - train_size))
+        res = Evaluation.evaluate_model(classifier, train, test, top=self.jobject.getThreshold(),
+                                        vop=self.jobject.getVerbosity(), cache=self.model_cache)
+        return [EvaluationStatistics(classifier=classifier, result=res, dataset=data)]
+
     def stop(self):
         """
         Stops the evaluation, if possible.
@@ -1,11 +1,12 @@
-from typing import List, Optional
-from jpype import JClass
+from typing import List, Optional, Union
 from weka.core.classes import OptionHandler
-from meka.classifiers import MultiLabelClassifier
+from meka.core.jclasses import jclass
+from meka.classifiers import MultiLabelClassifier, ModelCache
 from ._datasetproviders import DatasetProvider
 from ._evaluators import Evaluator
 from ._evaluationstatisticshandlers import EvaluationStatisticsHandler
 from ._evaluationstatistics import EvaluationStatistics
+from ._checkpoints import ExperimentCheckpoint
 
 
 class Experiment(OptionHandler):
@@ -24,10 +25,11 @@ class Experiment(OptionHandler):
         :type options:  list
         """
         if classname is not None:
-            jobject = JClass(classname)()
+            jobject = jclass(classname)()
         if jobject is not None:
             self.enforce_type(jobject, "meka.experiment.Experiment")
         super().__init__(jobject, options=options)
+        self._datasetprovider = None
 
     @property
     def notes(self) -> str:
@@ -74,12 +76,16 @@ class Experiment(OptionHandler):
     @property
     def datasetprovider(self) -> DatasetProvider:
         """
-        Returns the dataset provider in use.
+        Returns the dataset provider in use. The provider that was set gets returned as is (e.g., a
+        LocalDatasetProvider with binary files), as long as the Java experiment still uses it.
 
         :return: the dataset provider
         :rtype: DatasetProvider
         """
-        return DatasetProvider(self.jobject.getDatasetProvider())
+        jobject = self.jobject.getDatasetProvider()
+        if (self._datasetprovider is not None) and self._datasetprovider.jobject.equals(jobject):
+            return self._datasetprovider
+        return DatasetProvider(jobject)
 
     @datasetprovider.setter
     def datasetprovider(self, provider: DatasetProvider):
@@ -89,6 +95,7 @@ class Experiment(OptionHandler):
         :param provider: the dataset provider to use
         :type provider: DatasetProvider
         """
+        self._datasetprovider = provider
         self.jobject.setDatasetProvider(provider.jobject)
 
     @property
@@ -152,13 +159,99 @@ class Experiment(OptionHandler):
 
     def run(self) -> Optional[str]:
         """
-        Runs the experiment.
+        Runs the experiment in Java. Providers that can only be used in Python (e.g., with binary files,
+        see DatasetProvider.is_python_only) require run_resumable instead.
 
         :return: None if successfully run, otherwise error message
         :rtype: str
         """
+        provider = self.datasetprovider
+        if provider.is_python_only():
+            return "Dataset provider can only be used in Python, use run_resumable instead: %s" % provider.classname
         return self.jobject.run()
 
+    def run_resumable(self, checkpoint: Union[str, ExperimentCheckpoint], model_cache: ModelCache = None,
+                      handler=None, provider=None) -> Optional[str]:
+        """
+        Runs the experiment in Python, one classifier/dataset/fold combination at a time (the folds of the
+        CrossValidation evaluator get evaluated individually, see Evaluator.evaluate_fold; other evaluators
+        evaluate the whole classifier/dataset combination as a single unit). Each unit gets recorded in the
+        checkpoint along with its statistics as soon as it completes. Units already recorded in the checkpoint
+        get skipped, i.e., an interrupted experiment can be resumed by running it again with the same checkpoint.
+
+        Incremental handlers (e.g., SQLiteEvaluationStatisticsHandler) receive the statistics of each unit as
+        soon as it completes; the stored statistics of skipped units only get passed on if the handler doesn't
+        contain the classifier/dataset combination (see requires), e.g., if it starts out empty after
+        initialize. All other handlers rewrite their output with each write, hence they receive the statistics
+        of all units (skipped and evaluated ones) in a single write at the end.
+
+        :param checkpoint: the checkpoint (or the file to store it in) to record the completed units in
+        :type checkpoint: str or ExperimentCheckpoint
+        :param model_cache: the optional cache for the trained models, see Evaluator
+        :type model_cache: ModelCache
+        :param handler: the statistics handler to use instead of the experiment's one, e.g., SQLiteEvaluationStatisticsHandler
+        :type handler: EvaluationStatisticsHandler
+        :param provider: the dataset provider to use instead of the experiment's one, e.g., PrefetchingDatasetProvider
+        :type provider: DatasetProvider
+        :return: None if successfully run, otherwise error message
+        :rtype: str
+        """
+        if isinstance(checkpoint, str):
+            checkpoint = ExperimentCheckpoint(checkpoint)
+        if provider is None:
+            provider = self.datasetprovider
+        evaluator = self.evaluator
+        evaluator.model_cache = model_cache
+        if handler is None:
+            handler = self.statisticshandler
+        for component in [provider, evaluator, handler]:
+            msg = component.initialize()
+            if msg is not None:
+                return msg
+
+        classifiers = self.classifiers
+        num_folds = evaluator.num_folds
+        folds = [None] if num_folds is None else list(range(num_folds))
+        incremental = handler.is_incremental()
+        collected = []
+        for data in provider:
+            relation = data.relationname
+            for classifier in classifiers:
+                cmdline = classifier.to_commandline()
+                stored = incremental and not handler.requires(classifier, data)
+                for fold in folds:
+                    if checkpoint.is_completed(cmdline, relation, fold):
+                        if stored:
+                            continue
+                        stats = [EvaluationStatistics.from_dict(x, classifier=classifier.jobject)
+                                 for x in checkpoint.statistics(cmdline, relation, fold) or []]
+                        completed = True
+                    else:
+                        if fold is None:
+                            stats = evaluator.evaluate(classifier, data)
+                        else:
+                            stats = evaluator.evaluate_fold(classifier, data, fold)
+                        completed = False
+                    if incremental:
+                        msg = handler.append(stats)
+                        if msg is not None:
+                            return msg
+                    else:
+                        collected.extend(stats)
+                    if not completed:
+                        checkpoint.mark_completed(cmdline, relation, fold,
+                                                  statistics=[EvaluationStatistics.to_dict(x) for x in stats])
+
+        if not incremental:
+            msg = handler.write(collected)
+            if msg is not None:
+                return msg
+        for component in [provider, handler]:
+            msg = component.finish()
+            if msg is not None:
+                return msg
+        return None
+
     @property
     def is_running(self) -> bool:
         """
@@ -0,0 +1,233 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Tuple, Union
+import meka.core.jvm as jvm
+from weka.core.classes import from_commandline
+from meka.core.folds import FoldManager
+from meka.classifiers import MultiLabelClassifier, Evaluation, ModelCache
+from ._evaluationstatistics import EvaluationStatistics
+from ._checkpoints import ExperimentCheckpoint
+from ._datasetproviders import load_dataset
+
+_worker_folds = dict()
+""" the folds cache of a worker process (only the most recently used dataset). """
+
+_worker_started = None
+""" the queue a worker process reports the tasks it starts to. """
+
+
+def _start_worker(jvm_options: Dict[str, Any], started=None):
+    """
+    Starts the JVM of a worker process.
+
+    :param jvm_options: the keyword arguments for meka.core.jvm.start
+    :type jvm_options: dict
+    :param started: the queue to report started tasks to
+    :type started: multiprocessing.SimpleQueue
+    """
+    global _worker_started
+    _worker_started = started
+    jvm.start(**jvm_options)
+
+
+def _load_folds(path: str, num_folds: int, seed: int) -> FoldManager:
+    """
+    Loads and prepares the dataset and splits it into folds. Keeps the folds of the last dataset
+    in memory, so that the dataset doesn't get loaded and split again for the other classifiers/folds.
+
+    :param path: the dataset to load
+    :type path: str
+    :param num_folds: the number of folds
+    :type num_folds: int
+    :param seed: the seed for assigning the rows to folds, contiguous folds if None
+    :type seed: int
+    :return: the folds
+    :rtype: FoldManager
+    """
+    key = (path, num_folds, seed)
+    if key not in _worker_folds:
+        _worker_folds.clear()
+        _worker_folds[key] = FoldManager(load_dataset(path), num_folds=num_folds, seed=seed)
+    return _worker_folds[key]
+
+
+def _evaluate_task(task: Tuple) -> Dict[str, Any]:
+    """
+    Evaluates a single (classifier, dataset, fold) task in a worker process.
+
+    :param task: the tuple of classifier command-line, dataset path, fold, number of folds, top, vop, seed,
+                 model cache directory, maximum model cache size
+    :type task: tuple
+    :return: the statistics (plus "Classifier", "Relation" and "Fold"), or the "Error" if the evaluation failed
+    :rtype: dict
+    """
+    cmdline, path, fold, num_folds, top, vop, seed, cache_dir, cache_size = task
+    if _worker_started is not None:
+        _worker_started.put(task)
+    try:
+        cache = None if cache_dir is None else ModelCache(cache_dir, max_size=cache_size)
+        folds = _load_folds(path, num_folds, seed)
+        data = folds.data
+        classifier = MultiLabelClassifier(jobject=from_commandline(cmdline).jobject)
+        train, test = folds.split(fold)
+        result = Evaluation.evaluate_model(classifier, train, test, top=top, vop=vop, cache=cache)
+        stats = EvaluationStatistics(classifier=classifier, result=result, dataset=data)
+        values = {str(k): float(stats.jobject.get(k)) for k in stats.jobject.keySet()}
+        values["Classifier"] = cmdline
+        values["Relation"] = data.relationname
+        values["Fold"] = fold
+        return values
+    except Exception as e:
+        return {"Classifier": cmdline, "Relation": path, "Fold": fold, "Error": str(e)}
+
+
+class EvaluationFarm:
+    """
+    Evaluates (classifier, dataset, fold) combinations on a pool of worker processes, each running
+    its own JVM. An out-of-memory situation or crash only affects a single worker.
+    """
+
+    def __init__(self, num_workers: int = None, max_heap_size: str = None, jvm_options: Dict[str, Any] = None,
+                 num_folds: int = 10, top: str = "PCut1", vop: str = "3", seed: int = 1, max_retries: int = 1,
+                 model_cache_dir: str = None, model_cache_size: int = None):
+        """
+        Initializes the farm.
+
+        :param num_workers: the number of worker processes, one per CPU core if None
+        :type num_workers: int
+        :param max_heap_size: the maximum heap size of each worker JVM (-Xmx parameter, eg 512m or 4g)
+        :type max_heap_size: str
+        :param jvm_options: additional keyword arguments for meka.core.jvm.start in the workers
+        :type jvm_options: dict
+        :param num_folds: the number of cross-validation folds per dataset
+        :type num_folds: int
+        :param top: Threshold OPtion (pertains to multi-label data only)
+        :type top: str
+        :param vop: Verbosity OPtion (which measures do we want to calculate/output)
+        :type vop: str
+        :param seed: the seed for assigning the rows of the datasets to folds (see FoldManager), contiguous folds if None
+        :type seed: int
+        :param max_retries: how often to resubmit tasks that were lost due to a crashed worker
+        :type max_retries: int
+        :param model_cache_dir: the directory for caching the trained models (shared by all workers), no caching if None
+        :type model_cache_dir: str
+        :param model_cache_size: the maximum size in bytes of the model cache, unlimited if None
+        :type model_cache_size: int
+        """
+        self.num_workers = os.cpu_count() if num_workers is None else num_workers
+        self.jvm_options = dict() if jvm_options is None else dict(jvm_options)
+        if max_heap_size is not None:
+            self.jvm_options["max_heap_size"] = max_heap_size
+        self.num_folds = num_folds
+        self.top = top
+        self.vop = vop
+        self.seed = seed
+        self.max_retries = max_retries
+        self.model_cache_dir = model_cache_dir
+        self.model_cache_size = model_cache_size
+
+    def tasks(self, classifiers: List[Union[str, Any]], datasets: List[str]) -> List[Tuple]:
+        """
+        Generates the tasks for all the combinations of classifiers, datasets and folds.
+
+        :param classifiers: the classifiers (command-lines or classifier objects) to evaluate
+        :type classifiers: list
+        :param datasets: the paths of the datasets to evaluate on
+        :type datasets: list
+        :return: the tasks
+        :rtype: list
+        """
+        result = []
+        cmdlines = [x if isinstance(x, str) else x.to_commandline() for x in classifiers]
+        for path in datasets:
+            for cmdline in cmdlines:
+                for fold in range(self.num_folds):
+                    result.append((cmdline, path, fold, self.num_folds, self.top, self.vop, self.seed,
+                                   self.model_cache_dir, self.model_cache_size))
+        return result
+
+    def run(self, classifiers: List[Union[str, Any]], datasets: List[str],
+            checkpoint: Union[str, ExperimentCheckpoint] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates all the combinations of classifiers, datasets and folds, returning the statistics of
+        each fold as soon as it is available.
+
+        :param classifiers: the classifiers (command-lines or classifier objects) to evaluate
+        :type classifiers: list
+        :param datasets: the paths of the datasets to evaluate on
+        :type datasets: list
+        :param checkpoint: the optional checkpoint (or file) for recording completed folds, see run_tasks(...)
+        :type checkpoint: str or ExperimentCheckpoint
+        :return: the statistics per fold (plus "Classifier", "Relation" and "Fold"), failed tasks contain an "Error"
+        :rtype: Iterator
+        """
+        return self.run_tasks(self.tasks(classifiers, datasets), checkpoint=checkpoint)
+
+    def run_tasks(self, tasks: List[Tuple], checkpoint: Union[str, ExperimentCheckpoint] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates the tasks, returning the statistics of each task as soon as it is available.
+        With a checkpoint, each successfully evaluated task gets recorded (using the dataset path as relation)
+        along with its statistics. Tasks already recorded get skipped and their stored statistics returned.
+        If a worker process dies, only the tasks that were running at the time count as attempts (see max_retries),
+        the other tasks of the broken pool get resubmitted as is. Stopping the iteration early cancels the
+        tasks that haven't started yet.
+
+        :param tasks: the tasks to evaluate, see tasks(...)
+        :type tasks: list
+        :param checkpoint: the optional checkpoint (or file) for recording completed tasks
+        :type checkpoint: str or ExperimentCheckpoint
+        :return: the statistics per task
+        :rtype: Iterator
+        """
+        if isinstance(checkpoint, str):
+            checkpoint = ExperimentCheckpoint(checkpoint)
+        attempts = dict()
+        pending = []
+        for task in tasks:
+            if (checkpoint is not None) and checkpoint.is_completed(task[0], task[1], task[2]):
+                for stats in checkpoint.statistics(task[0], task[1], task[2]) or []:
+                    yield stats
+            else:
+                pending.append(task)
+        context = multiprocessing.get_context("spawn")
+        while len(pending) > 0:
+            retry = []
+            started = context.SimpleQueue()
+            finished = set()
+            running = None
+            executor = ProcessPoolExecutor(max_workers=self.num_workers, mp_context=context,
+                                           initializer=_start_worker, initargs=(self.jvm_options, started))
+            try:
+                futures = {executor.submit(_evaluate_task, task): task for task in pending}
+                for future in as_completed(futures):
+                    task = futures[future]
+                    try:
+                        stats = future.result()
+                    except BrokenProcessPool as e:
+                        if running is None:
+                            # the tasks that were started, but not finished, when the pool broke
+                            running = set()
+                            while not started.empty():
+                                running.add(started.get())
+                            running -= finished
+                        # if no task got started (eg the JVM failed to start), all of them count as attempts
+                        if (len(running) > 0) and (task not in running):
+                            retry.append(task)
+                            continue
+                        attempts[task] = attempts.get(task, 0) + 1
+                        if attempts[task] <= self.max_retries:
+                            retry.append(task)
+                        else:
+                            yield {"Classifier": task[0], "Relation": task[1], "Fold": task[2],
+                                   "Error": "Worker process died: " + str(e)}
+                        continue
+                    finished.add(task)
+                    if (checkpoint is not None) and ("Error" not in stats):
+                        checkpoint.mark_completed(task[0], task[1], task[2], statistics=[stats])
+                    yield stats
+            finally:
+                # don't wait for queued tasks if the consumer stops early
+                executor.shutdown(wait=False, cancel_futures=True)
+            pending = retry
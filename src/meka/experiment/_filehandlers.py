@@ -1,7 +1,7 @@
 from typing import List, Optional
 
-from jpype import JClass
 from weka.core.classes import OptionHandler
+from meka.core.jclasses import jclass
 from ._experiments import Experiment
 
 
@@ -18,7 +18,7 @@ class ExperimentFileHandler(OptionHandler):
         :type options:  list
         """
         if classname is not None:
-            jobject = JClass(classname)()
+            jobject = jclass(classname)()
         if jobject is not None:
             self.enforce_type(jobject, "meka.experiment.filehandlers.ExperimentFileHandler")
         super().__init__(jobject, options=options)
@@ -52,7 +52,7 @@ class ExperimentFileHandler(OptionHandler):
         :return: the experiment object
         :rtype: Experiment
         """
-        jobj = self.jobject.read(JClass("java.io.File")(path))
+        jobj = self.jobject.read(jclass("java.io.File")(path))
         return Experiment(jobject=jobj)
 
     def write(self, exp: Experiment, path: str) -> Optional[str]:
@@ -66,4 +66,4 @@ class ExperimentFileHandler(OptionHandler):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        return self.jobject.write(exp.jobject, JClass("java.io.File")(path))
+        return self.jobject.write(exp.jobject, jclass("java.io.File")(path))
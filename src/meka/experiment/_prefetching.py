@@ -0,0 +1,318 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from weka.core.dataset import Instances
+from weka.core.serialization import read, write
+from ._datasetproviders import DatasetProvider, load_dataset
+
+logger = logging.getLogger(__name__)
+
+EXTENSION = ".ser"
+""" the file extension of the serialized datasets. """
+
+
+class DatasetCache:
+    """
+    Caches prepared datasets in memory (least recently used ones get evicted when exceeding the byte budget)
+    and, optionally, in serialized form on disk, which is faster to read than parsing the original file again.
+    Datasets are identified by their path, size and modification time. The cached datasets are shared, i.e.,
+    they must not get modified.
+    """
+
+    def __init__(self, max_bytes: int, cache_dir: str = None, max_disk_bytes: int = None):
+        """
+        Initializes the cache.
+
+        :param max_bytes: the (estimated) number of bytes the datasets in memory may occupy
+        :type max_bytes: int
+        :param cache_dir: the directory for storing the serialized datasets, no disk cache if None
+        :type cache_dir: str
+        :param max_disk_bytes: the maximum size of the disk cache, unlimited if None
+        :type max_disk_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def estimate_size(cls, data: Instances) -> int:
+        """
+        Estimates the memory the dataset occupies in the JVM.
+
+        :param data: the dataset to estimate the size for
+        :type data: Instances
+        :return: the number of bytes
+        :rtype: int
+        """
+        return data.num_instances * (data.num_attributes * 8 + 40)
+
+    def key(self, path: str) -> str:
+        """
+        Generates the key for the dataset file.
+
+        :param path: the dataset file
+        :type path: str
+        :return: the key
+        :rtype: str
+        """
+        stat = os.stat(path)
+        return hashlib.sha256(("%s|%d|%d" % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).encode("utf-8")).hexdigest()
+
+    def _add(self, key: str, data: Instances):
+        """
+        Adds the dataset to the memory cache and evicts the least recently used ones if necessary.
+
+        :param key: the key of the dataset
+        :type key: str
+        :param data: the dataset
+        :type data: Instances
+        """
+        with self._lock:
+            self._memory[key] = (data, self.estimate_size(data))
+            self._memory.move_to_end(key)
+            total = sum(x[1] for x in self._memory.values())
+            while (total > self.max_bytes) and (len(self._memory) > 0):
+                _, (_, size) = self._memory.popitem(last=False)
+                total -= size
+
+    def get(self, path: str) -> Optional[Instances]:
+        """
+        Returns the cached dataset, either from memory or from disk.
+
+        :param path: the dataset file
+        :type path: str
+        :return: the dataset, None if not cached
+        :rtype: Instances
+        """
+        key = self.key(path)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key][0]
+        if self.cache_dir is None:
+            return None
+        ser = os.path.join(self.cache_dir, key + EXTENSION)
+        if not os.path.exists(ser):
+            return None
+        try:
+            result = Instances(read(ser))
+        except Exception as e:
+            logger.warning("Failed to read cached dataset %s: %s" % (ser, str(e)))
+            return None
+        try:
+            os.utime(ser)
+        except OSError:
+            pass
+        self._add(key, result)
+        return result
+
+    def put(self, path: str, data: Instances):
+        """
+        Adds the prepared dataset to the cache.
+
+        :param path: the dataset file
+        :type path: str
+        :param data: the prepared dataset
+        :type data: Instances
+        """
+        key = self.key(path)
+        self._add(key, data)
+        if self.cache_dir is not None:
+            ser = os.path.join(self.cache_dir, key + EXTENSION)
+            tmp = "%s.%d.%d.tmp" % (ser, os.getpid(), threading.get_ident())
+            write(tmp, data)
+            os.replace(tmp, ser)
+            self._evict_disk()
+
+    def load(self, path: str) -> Instances:
+        """
+        Returns the cached dataset or loads, prepares and caches it.
+
+        :param path: the dataset file
+        :type path: str
+        :return: the prepared dataset
+        :rtype: Instances
+        """
+        result = self.get(path)
+        if result is None:
+            result = load_dataset(path)
+            self.put(path, result)
+        return result
+
+    def _evict_disk(self):
+        """
+        Removes the least recently used serialized datasets until the disk cache no longer exceeds its maximum size.
+        """
+        if self.max_disk_bytes is None:
+            return
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(EXTENSION):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(x[1] for x in files)
+        for mtime, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Removes all datasets from memory and disk.
+        """
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir is not None:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(EXTENSION):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+class PrefetchingDatasetProvider(Iterator[Instances]):
+    """
+    Provides prepared datasets, loading the next ones in a background thread while the current one is
+    being evaluated. The datasets are either files (optionally obtained via a DatasetCache) or come
+    from another dataset provider. Offers the same initialize/iterate/finish contract as DatasetProvider.
+    """
+
+    def __init__(self, datasets: List[str] = None, provider: DatasetProvider = None, num_prefetch: int = 2,
+                 cache: DatasetCache = None):
+        """
+        Initializes the provider.
+
+        :param datasets: the dataset files to provide
+        :type datasets: list
+        :param provider: the provider to obtain the datasets from instead
+        :type provider: DatasetProvider
+        :param num_prefetch: the number of datasets to load ahead
+        :type num_prefetch: int
+        :param cache: the optional cache for the dataset files
+        :type cache: DatasetCache
+        """
+        if (datasets is None) == (provider is None):
+            raise ValueError("Either datasets or provider must be supplied!")
+        self.datasets = None if datasets is None else list(datasets)
+        self.provider = provider
+        self.num_prefetch = max(1, num_prefetch)
+        self.cache = cache
+        self._executor = None
+        self._pending = deque()
+        self._index = 0
+
+    def initialize(self) -> Optional[str]:
+        """
+        Initializes the provider to start providing datasets from scratch and starts loading the first ones.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._stop()
+        if self.provider is not None:
+            msg = self.provider.initialize()
+            if msg is not None:
+                return msg
+        self._index = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        for i in range(self.num_prefetch):
+            self._submit()
+        return None
+
+    def _load(self, path: str) -> Instances:
+        """
+        Loads and prepares the dataset file.
+
+        :param path: the file to load
+        :type path: str
+        :return: the dataset
+        :rtype: Instances
+        """
+        if self.cache is not None:
+            return self.cache.load(path)
+        return load_dataset(path)
+
+    def _next_from_provider(self) -> Optional[Instances]:
+        """
+        Obtains the next dataset from the provider.
+
+        :return: the dataset, None if no more datasets
+        :rtype: Instances
+        """
+        try:
+            return next(self.provider)
+        except StopIteration:
+            return None
+
+    def _submit(self):
+        """
+        Starts loading the next dataset, if any.
+        """
+        if self.provider is not None:
+            self._pending.append(self._executor.submit(self._next_from_provider))
+        elif self._index < len(self.datasets):
+            self._pending.append(self._executor.submit(self._load, self.datasets[self._index]))
+            self._index += 1
+
+    def __iter__(self) -> Iterator[Instances]:
+        """
+        Returns the iterator object itself.
+
+        :return: the iterator object
+        """
+        return self
+
+    def __next__(self) -> Instances:
+        """
+        Returns the next dataset, waiting for it to finish loading if necessary.
+
+        :return: the next dataset
+        """
+        if self._executor is None:
+            msg = self.initialize()
+            if msg is not None:
+                raise Exception(msg)
+        if len(self._pending) == 0:
+            raise StopIteration()
+        result = self._pending.popleft().result()
+        if result is None:
+            self._pending.clear()
+            raise StopIteration()
+        self._submit()
+        return result
+
+    def _stop(self):
+        """
+        Stops the background loading.
+        """
+        if self._executor is not None:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending.clear()
+
+    def finish(self) -> Optional[str]:
+        """
+        Gets called after the experiment finishes, stops the background loading.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._stop()
+        if self.provider is not None:
+            return self.provider.finish()
+        return None
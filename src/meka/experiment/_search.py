@@ -0,0 +1,400 @@
+import itertools
+import logging
+import math
+import os
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from weka.core.dataset import Instances
+from meka.core.folds import FoldManager
+from meka.classifiers import MultiLabelClassifier, Evaluation, ModelCache
+from ._evaluationstatistics import EvaluationStatistics
+
+logger = logging.getLogger(__name__)
+
+LOWER_IS_BETTER = ["loss", "error", "time"]
+""" metrics containing any of these (lower case) words get minimized. """
+
+
+def options_for(space: Dict[str, Any]) -> List[str]:
+    """
+    Turns a single assignment of the search space into command-line options. A value of None or False
+    omits the option, True adds it as flag, a list gets appended after the option (e.g., for "--",
+    the options of the base classifier) and any other value gets added as string. "--" is always
+    added last.
+
+    :param space: the options and their values
+    :type space: dict
+    :return: the command-line options
+    :rtype: list
+    """
+    result = []
+    for option in sorted(space, key=lambda x: x == "--"):
+        value = space[option]
+        if (value is None) or (value is False):
+            continue
+        if value is True:
+            result.append(option)
+        elif isinstance(value, (list, tuple)):
+            result.append(option)
+            result.extend(str(x) for x in value)
+        else:
+            result.extend([option, str(value)])
+    return result
+
+
+class ParameterSearch(ABC):
+    """
+    Ancestor for searches over the options of MEKA classifiers. The candidates get cross-validated on the
+    same fold splits (the fold datasets are only generated once, see FoldManager) and the folds of all candidates are
+    evaluated in parallel. The search returns a ranked table, i.e., one dictionary per candidate with the
+    metrics averaged over the evaluated folds.
+    """
+
+    def __init__(self, classname: Union[str, List[str]], space: Dict[str, Any], metric: str = "Accuracy",
+                 maximize: bool = None, num_folds: int = 10, seed: Optional[int] = 1, top: str = "PCut1",
+                 vop: str = "3", num_threads: int = 1, cache: ModelCache = None, stratify: bool = False):
+        """
+        Initializes the search.
+
+        :param classname: the classname(s) of the classifier(s) to search the options for
+        :type classname: str or list
+        :param space: the options and the values to search (see the derived classes)
+        :type space: dict
+        :param metric: the metric to rank the candidates by, e.g., "Accuracy" or "Hamming loss"
+        :type metric: str
+        :param maximize: whether higher values of the metric are better, determined from the name if None
+        :type maximize: bool
+        :param num_folds: the number of cross-validation folds
+        :type num_folds: int
+        :param seed: the seed for randomizing the data before splitting it into folds, no randomization if None
+        :type seed: int
+        :param top: Threshold OPtion (pertains to multi-label data only)
+        :type top: str
+        :param vop: Verbosity OPtion (which measures do we want to calculate/output)
+        :type vop: str
+        :param num_threads: the number of folds to evaluate in parallel, -1 for one per CPU core
+        :type num_threads: int
+        :param cache: the optional cache for the models trained on the folds
+        :type cache: ModelCache
+        :param stratify: whether to stratify the folds on the labels (iterative stratification)
+        :type stratify: bool
+        """
+        self.classnames = [classname] if isinstance(classname, str) else list(classname)
+        self.space = dict(space)
+        self.metric = metric
+        if maximize is None:
+            maximize = not any(x in metric.lower() for x in LOWER_IS_BETTER)
+        self.maximize = maximize
+        self.num_folds = num_folds
+        self.seed = seed
+        self.top = top
+        self.vop = vop
+        self.num_threads = os.cpu_count() if num_threads < 1 else num_threads
+        self.cache = cache
+        self.stratify = stratify
+        self._data = None
+        self._folds = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def candidates(self) -> List[Tuple[str, List[str]]]:
+        """
+        Generates the candidates to evaluate.
+
+        :return: the list of classname/options tuples
+        :rtype: list
+        """
+        pass
+
+    def fold(self, data: Instances, fold: int) -> Tuple[Instances, Instances]:
+        """
+        Returns the train/test split of the fold. The splits get generated only once per dataset and
+        are shared by all the candidates, i.e., they must not get modified.
+
+        :param data: the dataset to search on
+        :type data: Instances
+        :param fold: the fold (0-based)
+        :type fold: int
+        :return: the tuple of train and test set
+        :rtype: tuple
+        """
+        with self._lock:
+            if self._data is not data:
+                self._data = data
+                self._folds = FoldManager.get(data, num_folds=self.num_folds, seed=self.seed, stratify=self.stratify)
+            folds = self._folds
+        return folds.split(fold)
+
+    def evaluate_fold(self, candidate: Tuple[str, List[str]], data: Instances, fold: int) -> Dict[str, Any]:
+        """
+        Evaluates the candidate on a single fold.
+
+        :param candidate: the classname/options tuple
+        :type candidate: tuple
+        :param data: the dataset to search on
+        :type data: Instances
+        :param fold: the fold (0-based)
+        :type fold: int
+        :return: the statistics, or the "Error" if the evaluation failed
+        :rtype: dict
+        """
+        classname, options = candidate
+        try:
+            train, test = self.fold(data, fold)
+            classifier = MultiLabelClassifier(classname=classname, options=list(options))
+            result = Evaluation.evaluate_model(classifier, train, test, top=self.top, vop=self.vop, cache=self.cache)
+            stats = EvaluationStatistics(classifier=classifier, result=result, dataset=data)
+            return {str(k): float(stats.jobject.get(k)) for k in stats.jobject.keySet()}
+        except Exception as e:
+            logger.warning("Failed to evaluate %s %s on fold %d: %s" % (classname, " ".join(options), fold, str(e)))
+            return {"Error": str(e)}
+
+    def evaluate(self, data: Instances, tasks: List[Tuple[int, int]], candidates: List[Tuple[str, List[str]]],
+                 folds: Dict[int, List[Dict[str, Any]]]):
+        """
+        Evaluates the (candidate index, fold) tasks in parallel and adds the statistics to the folds
+        recorded per candidate.
+
+        :param data: the dataset to search on
+        :type data: Instances
+        :param tasks: the tasks to evaluate
+        :type tasks: list
+        :param candidates: all the candidates
+        :type candidates: list
+        :param folds: the statistics per fold, with the candidate index as key
+        :type folds: dict
+        """
+        def run(task):
+            return task[0], self.evaluate_fold(candidates[task[0]], data, task[1])
+
+        if self.num_threads == 1:
+            results = [run(task) for task in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+                results = list(executor.map(run, tasks))
+        for index, stats in results:
+            folds.setdefault(index, []).append(stats)
+
+    def score(self, stats: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Returns the mean of the metric over the folds.
+
+        :param stats: the statistics of the evaluated folds
+        :type stats: list
+        :return: the score, None if a fold failed or the metric is missing
+        :rtype: float
+        """
+        if (len(stats) == 0) or any(("Error" in x) or (self.metric not in x) for x in stats):
+            return None
+        return float(np.mean([x[self.metric] for x in stats]))
+
+    def rank(self, indices: List[int], folds: Dict[int, List[Dict[str, Any]]]) -> List[int]:
+        """
+        Sorts the candidates, best first. Candidates evaluated on more folds come first, failed ones last.
+
+        :param indices: the indices of the candidates to sort
+        :type indices: list
+        :param folds: the statistics per fold, with the candidate index as key
+        :type folds: dict
+        :return: the sorted indices
+        :rtype: list
+        """
+        def key(index):
+            score = self.score(folds.get(index, []))
+            if score is None:
+                return 1, 0, 0.0
+            return 0, -len(folds[index]), -score if self.maximize else score
+
+        return sorted(indices, key=key)
+
+    def table(self, candidates: List[Tuple[str, List[str]]], folds: Dict[int, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Generates the ranked table of the candidates, with the metrics averaged over the evaluated folds.
+
+        :param candidates: the candidates
+        :type candidates: list
+        :param folds: the statistics per fold, with the candidate index as key
+        :type folds: dict
+        :return: one row per candidate ("Rank", "Classifier", "Options", "Folds", "Score", "Score (stdev)",
+                 the averaged metrics and the "Error" if failed), best first
+        :rtype: list
+        """
+        result = []
+        for rank, index in enumerate(self.rank(list(range(len(candidates))), folds)):
+            classname, options = candidates[index]
+            stats = folds.get(index, [])
+            row = {"Rank": rank + 1, "Classifier": " ".join([classname] + options), "Options": list(options),
+                   "Folds": len(stats)}
+            errors = [x["Error"] for x in stats if "Error" in x]
+            if len(errors) > 0:
+                row["Error"] = errors[0]
+            elif len(stats) > 0:
+                row["Score"] = self.score(stats)
+                row["Score (stdev)"] = float(np.std([x.get(self.metric, np.nan) for x in stats]))
+                for k in stats[0]:
+                    row[k] = float(np.mean([x.get(k, np.nan) for x in stats]))
+            result.append(row)
+        return result
+
+    def search(self, data: Instances) -> List[Dict[str, Any]]:
+        """
+        Cross-validates all candidates on the dataset.
+
+        :param data: the prepared dataset to search on
+        :type data: Instances
+        :return: the ranked table, see table(...)
+        :rtype: list
+        """
+        candidates = self.candidates()
+        folds = dict()
+        tasks = [(i, fold) for i in range(len(candidates)) for fold in range(self.num_folds)]
+        self.evaluate(data, tasks, candidates, folds)
+        return self.table(candidates, folds)
+
+
+class GridSearch(ParameterSearch):
+    """
+    Evaluates all combinations of classnames and option values. The space maps each option to the list
+    of its values, e.g., {"-I": [10, 50], "-P": [True, False], "-W": ["weka.classifiers.trees.J48"]}
+    (see options_for for the types of values).
+    """
+
+    def candidates(self) -> List[Tuple[str, List[str]]]:
+        """
+        Generates the candidates to evaluate.
+
+        :return: the list of classname/options tuples
+        :rtype: list
+        """
+        result = []
+        names = list(self.space)
+        for classname in self.classnames:
+            for values in itertools.product(*[self.space[x] for x in names]):
+                result.append((classname, options_for(dict(zip(names, values)))))
+        return result
+
+
+class RandomSearch(ParameterSearch):
+    """
+    Evaluates randomly sampled combinations of classnames and option values. The space maps each option
+    either to the list of values to choose from or to a function that draws a value from the supplied
+    numpy random generator, e.g., {"-I": [10, 50, 100], "-S": lambda rng: rng.integers(0, 1000)}.
+    """
+
+    def __init__(self, classname: Union[str, List[str]], space: Dict[str, Union[list, Callable]],
+                 num_candidates: int = 10, random_seed: int = 1, **kwargs):
+        """
+        Initializes the search.
+
+        :param classname: the classname(s) of the classifier(s) to search the options for
+        :type classname: str or list
+        :param space: the options and the values/functions to sample from
+        :type space: dict
+        :param num_candidates: the (maximum) number of distinct candidates to sample
+        :type num_candidates: int
+        :param random_seed: the seed for sampling the candidates
+        :type random_seed: int
+        :param kwargs: the other parameters, see ParameterSearch
+        """
+        super().__init__(classname, space, **kwargs)
+        self.num_candidates = num_candidates
+        self.random_seed = random_seed
+
+    def candidates(self) -> List[Tuple[str, List[str]]]:
+        """
+        Samples the candidates to evaluate, skipping duplicates.
+
+        :return: the list of classname/options tuples
+        :rtype: list
+        """
+        rng = np.random.default_rng(self.random_seed)
+        result = []
+        seen = set()
+        for i in range(self.num_candidates * 10):
+            if len(result) >= self.num_candidates:
+                break
+            classname = self.classnames[rng.integers(len(self.classnames))]
+            values = dict()
+            for option, choices in self.space.items():
+                if callable(choices):
+                    values[option] = choices(rng)
+                else:
+                    values[option] = choices[rng.integers(len(choices))]
+            candidate = (classname, options_for(values))
+            key = (classname, tuple(candidate[1]))
+            if key not in seen:
+                seen.add(key)
+                result.append(candidate)
+        return result
+
+
+class SuccessiveHalving(ParameterSearch):
+    """
+    Evaluates the candidates of another search with successive halving: all candidates get evaluated on
+    the first min_folds folds, only the best 1/eta of them continue on eta times as many folds, and so on
+    until the survivors have been evaluated on all folds. Poor candidates therefore get pruned after only a
+    few folds. The evaluation settings (metric, folds, threads, etc.) are the ones of the other search.
+    """
+
+    def __init__(self, search: ParameterSearch, min_folds: int = 1, eta: int = 3):
+        """
+        Initializes the search.
+
+        :param search: the search to obtain the candidates and settings from (e.g., GridSearch or RandomSearch)
+        :type search: ParameterSearch
+        :param min_folds: the number of folds to evaluate all candidates on in the first round
+        :type min_folds: int
+        :param eta: the factor by which the candidates get reduced and the folds increased per round (>= 2)
+        :type eta: int
+        """
+        super().__init__(search.classnames, search.space, metric=search.metric, maximize=search.maximize,
+                         num_folds=search.num_folds, seed=search.seed, top=search.top, vop=search.vop,
+                         num_threads=search.num_threads, cache=search.cache, stratify=search.stratify)
+        if eta < 2:
+            raise ValueError("eta must be at least 2, got: %d" % eta)
+        self.base = search
+        self.min_folds = max(1, min(min_folds, search.num_folds))
+        self.eta = eta
+
+    def candidates(self) -> List[Tuple[str, List[str]]]:
+        """
+        Returns the candidates of the other search.
+
+        :return: the list of classname/options tuples
+        :rtype: list
+        """
+        return self.base.candidates()
+
+    def search(self, data: Instances) -> List[Dict[str, Any]]:
+        """
+        Evaluates the candidates with successive halving on the dataset.
+
+        :param data: the prepared dataset to search on
+        :type data: Instances
+        :return: the ranked table, see table(...); pruned candidates are ranked after the ones evaluated on more folds
+        :rtype: list
+        """
+        candidates = self.candidates()
+        folds = dict()
+        survivors = list(range(len(candidates)))
+        done = 0
+        budget = self.min_folds
+        while True:
+            tasks = [(i, fold) for i in survivors for fold in range(done, budget)]
+            self.evaluate(data, tasks, candidates, folds)
+            done = budget
+            logger.info("Evaluated %d candidates on %d/%d folds" % (len(survivors), done, self.num_folds))
+            if done >= self.num_folds:
+                break
+            ranked = [x for x in self.rank(survivors, folds) if self.score(folds[x]) is not None]
+            survivors = ranked[:int(math.ceil(len(ranked) / self.eta))]
+            if len(survivors) == 0:
+                break
+            if len(survivors) == 1:
+                budget = self.num_folds
+            else:
+                budget = min(self.num_folds, done * self.eta)
+        return self.table(candidates, folds)
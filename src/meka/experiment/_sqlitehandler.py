@@ -0,0 +1,248 @@
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, Tuple
+from jpype import JDouble, JObject, JString
+from weka.core.classes import from_commandline
+from meka.core.jclasses import jclass
+from ._evaluationstatistics import EvaluationStatistics
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, classifier TEXT, relation TEXT)",
+    "CREATE TABLE IF NOT EXISTS statistics (run INTEGER NOT NULL REFERENCES runs(id), "
+    "classifier TEXT, relation TEXT, metric TEXT NOT NULL, value REAL)",
+    "DROP INDEX IF EXISTS idx_statistics_classifier",
+    "DROP INDEX IF EXISTS idx_statistics_relation",
+    "DROP INDEX IF EXISTS idx_statistics_run",
+    "CREATE INDEX IF NOT EXISTS idx_runs_classifier_relation ON runs(classifier, relation)",
+    "CREATE INDEX IF NOT EXISTS idx_statistics_run_metric ON statistics(run, metric)",
+    "CREATE INDEX IF NOT EXISTS idx_statistics_classifier_metric ON statistics(classifier, metric)",
+    "CREATE INDEX IF NOT EXISTS idx_statistics_relation_metric ON statistics(relation, metric)",
+    "CREATE INDEX IF NOT EXISTS idx_statistics_metric ON statistics(metric)",
+]
+""" the tables and indices of the database (replaces the single-column indices of older databases). """
+
+REQUIRES_SQL = "SELECT 1 FROM runs WHERE classifier = ? AND relation = ? LIMIT 1"
+""" the query for checking whether a classifier/relation combination is stored. """
+
+FETCH_SIZE = 1000
+""" the number of rows to fetch at a time when querying. """
+
+
+class SQLiteEvaluationStatisticsHandler:
+    """
+    Python-side statistics handler that stores the statistics in a SQLite database (one row per metric),
+    indexed by classifier command-line, relation and metric. Offers the same initialize/read/write/finish
+    contract as EvaluationStatisticsHandler, with optional filters for reading. Incremental, i.e., statistics
+    from previous runs remain in the database.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the handler.
+
+        :param path: the database file
+        :type path: str
+        """
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def is_thread_safe(self) -> bool:
+        """
+        Returns whether the handler is threadsafe.
+
+        :return: True when thread safe
+        :rtype: bool
+        """
+        return True
+
+    def is_incremental(self) -> bool:
+        """
+        Returns whether the handler stores statistics incrementally, which it always does.
+
+        :return: True if incremental
+        :rtype: bool
+        """
+        return True
+
+    def requires(self, classifier, dataset) -> bool:
+        """
+        Returns whether the classifier/dataset combination still needs evaluating, i.e., the database
+        doesn't contain any statistics for it.
+
+        :param classifier: the classifier to check
+        :type classifier: MultiLabelClassifier
+        :param dataset: the dataset to check
+        :type dataset: Instances
+        :return: True if not stored yet
+        :rtype: bool
+        """
+        with self._lock:
+            row = self._connection.execute(REQUIRES_SQL, (classifier.to_commandline(), dataset.relationname)).fetchone()
+        return row is None
+
+    def initialize(self) -> Optional[str]:
+        """
+        Initializes the handler, creating the database/tables if necessary.
+
+        :return: None if successfully initialized, otherwise error message
+        :rtype: str
+        """
+        try:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            with self._lock, self._connection:
+                for sql in SCHEMA:
+                    self._connection.execute(sql)
+        except sqlite3.Error as e:
+            return "Failed to initialize database %s: %s" % (self.path, str(e))
+        return None
+
+    def _filter(self, classifier: str = None, relation: str = None, metric: str = None) -> Tuple[str, List[str]]:
+        """
+        Generates the WHERE clause for the filters.
+
+        :param classifier: the classifier command-line to restrict to, all if None
+        :type classifier: str
+        :param relation: the relation to restrict to, all if None
+        :type relation: str
+        :param metric: the metric to restrict to, all if None
+        :type metric: str
+        :return: the tuple of clause and parameters
+        :rtype: tuple
+        """
+        clauses = []
+        params = []
+        for column, value in [("classifier", classifier), ("relation", relation), ("metric", metric)]:
+            if value is not None:
+                clauses.append(column + " = ?")
+                params.append(value)
+        if len(clauses) == 0:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _query_sql(self, classifier: str = None, relation: str = None, metric: str = None) -> Tuple[str, List[str]]:
+        """
+        Generates the SQL statement for query.
+
+        :param classifier: the classifier command-line to restrict to, all if None
+        :type classifier: str
+        :param relation: the relation to restrict to, all if None
+        :type relation: str
+        :param metric: the metric to restrict to, all if None
+        :type metric: str
+        :return: the tuple of statement and parameters
+        :rtype: tuple
+        """
+        where, params = self._filter(classifier=classifier, relation=relation, metric=metric)
+        return "SELECT run, classifier, relation, metric, value FROM statistics" + where + " ORDER BY run", params
+
+    def query(self, classifier: str = None, relation: str = None, metric: str = None) -> Iterator[Tuple]:
+        """
+        Streams the matching (run, classifier, relation, metric, value) rows from the database,
+        without loading them all into memory. The rows get fetched in batches (see FETCH_SIZE), holding the lock
+        only while fetching a batch.
+
+        :param classifier: the classifier command-line to restrict to, all if None
+        :type classifier: str
+        :param relation: the relation to restrict to, all if None
+        :type relation: str
+        :param metric: the metric to restrict to, all if None
+        :type metric: str
+        :return: the rows
+        :rtype: Iterator
+        """
+        sql, params = self._query_sql(classifier=classifier, relation=relation, metric=metric)
+        with self._lock:
+            cursor = self._connection.execute(sql, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(FETCH_SIZE)
+                if len(rows) == 0:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
+    def read(self, classifier: str = None, relation: str = None, metric: str = None) -> List[EvaluationStatistics]:
+        """
+        Reads the statistics, optionally restricted to classifier, relation and/or metric.
+        Rows without a classifier command-line get skipped.
+
+        :param classifier: the classifier command-line to restrict to, all if None
+        :type classifier: str
+        :param relation: the relation to restrict to, all if None
+        :type relation: str
+        :param metric: the metric to restrict to, all if None
+        :type metric: str
+        :return: the statistics that were read
+        :rtype: list
+        """
+        result = []
+        classifiers = dict()
+        current = None
+        current_run = None
+        for run, cmdline, rel, key, value in self.query(classifier=classifier, relation=relation, metric=metric):
+            if cmdline is None:
+                continue
+            if run != current_run:
+                if cmdline not in classifiers:
+                    classifiers[cmdline] = from_commandline(cmdline).jobject
+                # a typed relation selects the (classifier, relation, result) constructor, even if null
+                current = jclass("meka.experiment.evaluationstatistics.EvaluationStatistics")(
+                    classifiers[cmdline], JObject(None, JString) if rel is None else JString(rel), None)
+                current_run = run
+                result.append(EvaluationStatistics(jobject=current))
+            current.put(key, JDouble(float("nan") if value is None else value))
+        return result
+
+    def write(self, statistics: List[Mapping]) -> Optional[str]:
+        """
+        Stores the given statistics in a single transaction.
+
+        :param statistics: the statistics to store (EvaluationStatistics or dictionaries, e.g., from EvaluationFarm)
+        :type statistics: list
+        :return: None if successfully stored, otherwise error message
+        :rtype: str
+        """
+        try:
+            with self._lock, self._connection:
+                for stats in statistics:
+                    cmdline, relation, keys, values = EvaluationStatistics.unpack(stats)
+                    run = self._connection.execute(
+                        "INSERT INTO runs (classifier, relation) VALUES (?, ?)", (cmdline, relation)).lastrowid
+                    self._connection.executemany(
+                        "INSERT INTO statistics (run, classifier, relation, metric, value) VALUES (?, ?, ?, ?, ?)",
+                        [(run, cmdline, relation, k, float(v)) for k, v in zip(keys, values)])
+        except sqlite3.Error as e:
+            return "Failed to write statistics to %s: %s" % (self.path, str(e))
+        return None
+
+    def append(self, statistics: List[Mapping]) -> Optional[str]:
+        """
+        Adds the given statistics to the database, same as write.
+
+        :param statistics: the statistics to add
+        :type statistics: list
+        :return: None if successfully stored, otherwise error message
+        :rtype: str
+        """
+        return self.write(statistics)
+
+    def finish(self) -> Optional[str]:
+        """
+        Gets called after the experiment finished, closes the database.
+
+        :return: None if successfully finished, otherwise error message
+        :rtype: str
+        """
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except sqlite3.Error as e:
+                return "Failed to close database %s: %s" % (self.path, str(e))
+            self._connection = None
+        return None
@@ -1,6 +1,6 @@
 from typing import List, Optional
-from jpype import JClass
 from weka.core.classes import OptionHandler
+from meka.core.jclasses import jclass
 from ._evaluationstatistics import EvaluationStatistics
 
 
@@ -20,7 +20,7 @@ class EvaluationStatisticsExporter(OptionHandler):
         :type options:  list
         """
         if classname is not None:
-            jobject = JClass(classname)()
+            jobject = jclass(classname)()
         if jobject is not None:
             self.enforce_type(jobject, "meka.experiment.statisticsexporters.EvaluationStatisticsExporter")
         super().__init__(jobject, options=options)
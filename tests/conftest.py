@@ -0,0 +1,41 @@
+import glob
+import os
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def meka_jvm():
+    """
+    Starts the JVM with the bundled Meka jars, skips the test if Java or the jars are not available.
+    """
+    import jpype
+    import meka.core.jvm as jvm
+    try:
+        jpype.getDefaultJVMPath()
+    except Exception as e:
+        pytest.skip("No JVM available: %s" % str(e))
+    if len(glob.glob(os.path.join(jvm.lib_dir(), "*.jar"))) == 0:
+        pytest.skip("Meka jars not installed, see jvm.install_meka")
+    jvm.start()
+    yield jvm
+
+
+@pytest.fixture
+def multilabel_arff(tmp_path):
+    """
+    Writes a small random multi-label dataset (3 labels, 4 numeric features) in ARFF format.
+    """
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, (60, 3))
+    x = rng.random((60, 4))
+    lines = ["@relation 'synthetic: -C 3'", ""]
+    lines += ["@attribute y%d {0,1}" % j for j in range(y.shape[1])]
+    lines += ["@attribute x%d numeric" % j for j in range(x.shape[1])]
+    lines += ["", "@data"]
+    for yi, xi in zip(y, x):
+        lines.append(",".join([str(v) for v in yi] + ["%.6f" % v for v in xi]))
+    path = str(tmp_path / "synthetic.arff")
+    with open(path, "w") as fp:
+        fp.write("\n".join(lines) + "\n")
+    return path
@@ -0,0 +1,27 @@
+import os
+from meka.experiment import ExperimentCheckpoint
+
+
+def test_truncated_last_line(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = ExperimentCheckpoint(path)
+    checkpoint.mark_completed("weka.classifiers.rules.ZeroR", "rel", 0, statistics=[{"Accuracy": 0.5}])
+    with open(path, "a") as fp:
+        fp.write('{"classifier": "weka.classifiers.rules.ZeroR", "relation": "rel", "fo')
+
+    checkpoint = ExperimentCheckpoint(path)
+    assert len(checkpoint) == 1
+    assert checkpoint.is_completed("weka.classifiers.rules.ZeroR", "rel", 0)
+    checkpoint.mark_completed("weka.classifiers.rules.ZeroR", "rel", 1, statistics=[{"Accuracy": 0.7}])
+
+    checkpoint = ExperimentCheckpoint(path)
+    assert len(checkpoint) == 2
+    assert checkpoint.statistics("weka.classifiers.rules.ZeroR", "rel", 1) == [{"Accuracy": 0.7}]
+    with open(path) as fp:
+        assert len(fp.read().splitlines()) == 2
+
+
+def test_missing_file(tmp_path):
+    checkpoint = ExperimentCheckpoint(str(tmp_path / "missing.jsonl"))
+    assert len(checkpoint) == 0
+    assert not os.path.exists(checkpoint.path)
@@ -0,0 +1,43 @@
+from meka.core.jclasses import jclass
+from meka.classifiers import MultiLabelClassifier
+from meka.experiment import Experiment, Evaluator, EvaluationStatisticsHandler, LocalDatasetProvider
+
+
+def _experiment(path, stats_file):
+    result = Experiment()
+    result.classifiers = [MultiLabelClassifier(classname="meka.classifiers.multilabel.BR")]
+    provider = LocalDatasetProvider()
+    provider.datasets = [path]
+    result.datasetprovider = provider
+    evaluator = Evaluator(classname="meka.experiment.evaluators.CrossValidation")
+    evaluator.jobject.setNumFolds(3)
+    evaluator.jobject.setSeed(42)
+    result.evaluator = evaluator
+    handler = jclass("meka.experiment.evaluationstatistics.KeyValuePairs")()
+    handler.setFile(jclass("java.io.File")(stats_file))
+    result.statisticshandler = EvaluationStatisticsHandler(handler)
+    return result
+
+
+def _metrics(statistics):
+    result = []
+    for stats in statistics:
+        result.append({str(k): float(stats[k]) for k in stats if "time" not in str(k).lower()})
+    return result
+
+
+def test_run_resumable_matches_run(meka_jvm, multilabel_arff, tmp_path):
+    exp = _experiment(multilabel_arff, str(tmp_path / "run.txt"))
+    assert exp.initialize() is None
+    assert exp.run() is None
+    assert exp.finish() is None
+    expected = _metrics(exp.statisticshandler.read())
+
+    exp = _experiment(multilabel_arff, str(tmp_path / "resumable.txt"))
+    assert exp.run_resumable(str(tmp_path / "checkpoint.jsonl")) is None
+    actual = _metrics(exp.statisticshandler.read())
+
+    assert len(actual) == len(expected) == 3
+    for act, exp_ in zip(actual, expected):
+        for k in exp_:
+            assert abs(act[k] - exp_[k]) < 1e-9, k
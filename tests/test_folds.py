@@ -0,0 +1,31 @@
+import numpy as np
+from meka.core.folds import fold_sizes, random_folds, stratified_folds, weka_order
+
+
+def test_weka_order_without_seed():
+    assert np.array_equal(weka_order(7, seed=None), np.arange(7))
+
+
+def test_weka_order_is_permutation():
+    for num_rows in [1, 2, 16, 100]:
+        order = weka_order(num_rows, seed=42)
+        assert np.array_equal(np.sort(order), np.arange(num_rows))
+    assert np.array_equal(weka_order(100, seed=1), weka_order(100, seed=1))
+    assert not np.array_equal(weka_order(100, seed=1), weka_order(100, seed=2))
+
+
+def test_random_folds_are_contiguous_blocks_of_weka_order():
+    order = weka_order(23, seed=3)
+    folds = random_folds(23, 5, seed=3)
+    assert np.array_equal(folds[order], np.repeat(np.arange(5), fold_sizes(23, 5)))
+
+
+def test_random_folds_without_seed():
+    assert np.array_equal(random_folds(10, 3, seed=None), [0, 0, 0, 0, 1, 1, 1, 2, 2, 2])
+
+
+def test_stratified_folds_sizes():
+    rng = np.random.default_rng(1)
+    y = rng.random((200, 6)) < 0.2
+    folds = stratified_folds(y, 5, seed=1)
+    assert np.array_equal(np.sort(np.bincount(folds, minlength=5)), np.sort(fold_sizes(200, 5)))
@@ -0,0 +1,39 @@
+import numpy as np
+from meka.core.metrics import ranking_loss
+
+
+def meka_rank_loss(y_true, confidences):
+    """
+    Computes the ranking loss like Meka's Metrics.L_RankLoss/P_RankLoss: labels are ranked by their
+    position in a stable ascending sort of the confidences.
+    """
+    result = 0.0
+    for y, p in zip(y_true, confidences):
+        r = list(np.argsort(p, kind="stable"))
+        pos = [j for j in range(len(y)) if y[j] == 1]
+        neg = [j for j in range(len(y)) if y[j] == 0]
+        if (len(pos) == 0) or (len(neg) == 0):
+            continue
+        wrong = sum(1 for k in pos for l in neg if r.index(k) < r.index(l))
+        result += wrong / (len(pos) * len(neg))
+    return result / len(y_true)
+
+
+def test_ranking_loss_binary_confidences():
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, (50, 6))
+    p = rng.integers(0, 2, (50, 6)).astype(np.float64)
+    assert np.isclose(ranking_loss(y, p), meka_rank_loss(y, p))
+
+
+def test_ranking_loss_ties():
+    y = np.array([[1, 0, 1, 0], [0, 1, 0, 1]])
+    p = np.array([[0.5, 0.5, 0.5, 0.5], [0.2, 0.2, 0.7, 0.7]])
+    assert np.isclose(ranking_loss(y, p), meka_rank_loss(y, p))
+
+
+def test_ranking_loss_without_ties():
+    rng = np.random.default_rng(2)
+    y = rng.integers(0, 2, (40, 5))
+    p = rng.random((40, 5))
+    assert np.isclose(ranking_loss(y, p), meka_rank_loss(y, p))
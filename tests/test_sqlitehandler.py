@@ -0,0 +1,42 @@
+import pytest
+from meka.experiment._sqlitehandler import SQLiteEvaluationStatisticsHandler, REQUIRES_SQL
+
+
+@pytest.fixture
+def handler(tmp_path):
+    result = SQLiteEvaluationStatisticsHandler(str(tmp_path / "statistics.db"))
+    assert result.initialize() is None
+    statistics = []
+    for i in range(20):
+        statistics.append({"Classifier": "meka.classifiers.multilabel.BR -W %d" % i, "Relation": "rel%d" % (i % 3),
+                           "Accuracy": i / 20.0, "Hamming loss": 1.0 - i / 20.0})
+    assert result.write(statistics) is None
+    result._connection.execute("ANALYZE")
+    yield result
+    result.finish()
+
+
+def _plan(handler, sql, params):
+    return " ".join(row[-1] for row in handler._connection.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def test_requires_uses_index(handler):
+    plan = _plan(handler, REQUIRES_SQL, ("meka.classifiers.multilabel.BR -W 1", "rel1"))
+    assert "idx_runs_classifier_relation" in plan
+
+
+@pytest.mark.parametrize("column,value", [
+    ("classifier", "meka.classifiers.multilabel.BR -W 1"),
+    ("relation", "rel1"),
+    ("metric", "Accuracy"),
+])
+def test_filtered_query_uses_index(handler, column, value):
+    sql, params = handler._query_sql(**{column: value})
+    plan = _plan(handler, sql, params)
+    assert "USING" in plan and "INDEX" in plan, plan
+
+
+def test_query_rows(handler):
+    rows = list(handler.query(metric="Accuracy"))
+    assert len(rows) == 20
+    assert all(row[3] == "Accuracy" for row in rows)